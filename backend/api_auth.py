@@ -11,11 +11,12 @@ Authentifizierung und sichere Passwort-Verwaltung.
 from flask import Blueprint, request
 from typing import Dict, Any, Optional
 import logging
+import math
 from datetime import datetime
 
 from manage_api import ApiResponse, handle_api_exception, token_required
 import manage_auth
-from manage_folders import FolderManager
+from manage_folders import get_folder_manager
 
 # Logger konfigurieren
 logger = logging.getLogger(__name__)
@@ -24,7 +25,17 @@ logger = logging.getLogger(__name__)
 api_auth = Blueprint('api_auth', __name__)
 
 # FolderManager Instanz
-folder_manager = FolderManager()
+folder_manager = get_folder_manager()
+
+# Sekunden bis zum nächsten Versuch, wenn alle Plätze der Passwortprüfung belegt sind
+PASSWORD_BUSY_RETRY_AFTER = 2
+
+def _password_busy_response(message: str):
+    """503-Antwort mit Retry-After, wenn die Passwortprüfung ausgelastet ist"""
+    response, status = ApiResponse.error(message, error_code=503,
+                                         details={'retry_after': PASSWORD_BUSY_RETRY_AFTER})
+    response.headers['Retry-After'] = str(PASSWORD_BUSY_RETRY_AFTER)
+    return response, status
 
 @api_auth.route('/api/auth/login', methods=['POST'])
 def api_login() -> Dict[str, Any]:
@@ -37,12 +48,26 @@ def api_login() -> Dict[str, Any]:
     try:
         data = request.get_json()
         if not data or 'password' not in data:
-            return ApiResponse.error('Passwort erforderlich', status_code=400)
+            return ApiResponse.error('Passwort erforderlich', error_code=400)
+        
+        # Ratenbegrenzung je Client, bevor die teure Passwortprüfung startet
+        allowed, retry_after = manage_auth.check_login_rate(request.remote_addr)
+        if not allowed:
+            logger.warning(f"Login-Versuch von {request.remote_addr} wegen Ratenbegrenzung abgelehnt")
+            response, status = ApiResponse.error('Zu viele Anmeldeversuche', error_code=429,
+                                                 details={'retry_after': math.ceil(retry_after)})
+            response.headers['Retry-After'] = str(math.ceil(retry_after))
+            return response, status
         
         password = data['password']
-        if not manage_auth.check_password(password):
+        try:
+            password_ok = manage_auth.check_password(password)
+        except manage_auth.AuthBusyError as e:
+            logger.warning(f"Login abgelehnt: {e}")
+            return _password_busy_response('Anmeldung derzeit nicht möglich, bitte erneut versuchen')
+        if not password_ok:
             logger.warning('Login fehlgeschlagen: Falsches Passwort')
-            return ApiResponse.error('Falsches Passwort', status_code=401)
+            return ApiResponse.error('Falsches Passwort', error_code=401)
             
         # Token generieren
         token = manage_auth.generate_token()
@@ -67,7 +92,7 @@ def api_logout() -> Dict[str, Any]:
         Dict mit Bestätigung
     """
     try:
-        token = request.headers.get('X-Auth-Token')
+        token = manage_auth.get_request_token()
         if token:
             manage_auth.invalidate_token(token)
             logger.info('Benutzer ausgeloggt')
@@ -90,11 +115,11 @@ def api_verify_token() -> Dict[str, Any]:
         Dict mit Token-Status
     """
     try:
-        token = request.headers.get('X-Auth-Token')
+        token = manage_auth.get_request_token()
         if not token:
-            return ApiResponse.error('Kein Token gefunden', status_code=401)
+            return ApiResponse.error('Kein Token gefunden', error_code=401)
             
-        is_valid = manage_auth.verify_token(token)
+        is_valid, _ = manage_auth.verify_token(token)
         
         return ApiResponse.success(data={
             'valid': is_valid,
@@ -116,23 +141,23 @@ def api_set_password() -> Dict[str, Any]:
     try:
         data = request.get_json()
         if not data:
-            return ApiResponse.error('Keine Daten erhalten', status_code=400)
+            return ApiResponse.error('Keine Daten erhalten', error_code=400)
         
         # Setup-Modus prüfen
         is_setup = manage_auth.check_if_setup_needed()
         
         # Prüfen, ob Benutzer authentifiziert ist (außer beim Setup)
         if not is_setup:
-            token = request.headers.get('X-Auth-Token')
-            if not token or not manage_auth.verify_token(token):
+            token = manage_auth.get_request_token()
+            if not token or not manage_auth.verify_token(token)[0]:
                 logger.warning('Unautorisierter Zugriff: Passwort-Änderungsversuch')
-                return ApiResponse.error('Nicht autorisiert', status_code=401)
+                return ApiResponse.error('Nicht autorisiert', error_code=401)
         
         # Bei Ersteinrichtung
         if is_setup and 'new_password' in data:
             if not manage_auth.set_password(data['new_password']):
                 logger.error('Fehler beim Setzen des ersten Passworts')
-                return ApiResponse.error('Passwort konnte nicht gesetzt werden', status_code=500)
+                return ApiResponse.error('Passwort konnte nicht gesetzt werden', error_code=500)
                 
             # Token für initiale Anmeldung generieren
             token = manage_auth.generate_token()
@@ -146,16 +171,21 @@ def api_set_password() -> Dict[str, Any]:
         
         # Passwort ändern im normalen Betrieb
         elif 'current_password' in data and 'new_password' in data:
-            if not manage_auth.check_password(data['current_password']):
+            try:
+                password_ok = manage_auth.check_password(data['current_password'])
+            except manage_auth.AuthBusyError as e:
+                logger.warning(f"Passwort-Änderung abgelehnt: {e}")
+                return _password_busy_response('Passwort-Änderung derzeit nicht möglich, bitte erneut versuchen')
+            if not password_ok:
                 logger.warning('Passwort-Änderung fehlgeschlagen: Aktuelles Passwort falsch')
-                return ApiResponse.error('Aktuelles Passwort falsch', status_code=401)
+                return ApiResponse.error('Aktuelles Passwort falsch', error_code=401)
                 
             if not manage_auth.set_password(data['new_password']):
                 logger.error('Fehler beim Ändern des Passworts')
-                return ApiResponse.error('Passwort konnte nicht geändert werden', status_code=500)
+                return ApiResponse.error('Passwort konnte nicht geändert werden', error_code=500)
             
             # Altes Token invalidieren und neues generieren
-            token = request.headers.get('X-Auth-Token')
+            token = manage_auth.get_request_token()
             if token:
                 manage_auth.invalidate_token(token)
             new_token = manage_auth.generate_token()
@@ -168,8 +198,40 @@ def api_set_password() -> Dict[str, Any]:
             })
         
         else:
-            return ApiResponse.error('Ungültige Daten', status_code=400)
+            return ApiResponse.error('Ungültige Daten', error_code=400)
             
     except Exception as e:
         logger.error(f"Fehler bei Passwort-Änderung: {str(e)}")
         return handle_api_exception(e, endpoint='/api/auth/password')
+
+@api_auth.route('/api/auth/rotate-key', methods=['POST'])
+@token_required
+def api_rotate_key() -> Dict[str, Any]:
+    """
+    API-Endpunkt zur Rotation des Token-Signaturschlüssels
+    
+    Bereits ausgestellte Tokens bleiben bis zu ihrem Ablauf gültig.
+    
+    Returns:
+        Dict mit der ID des neuen Schlüssels
+    """
+    try:
+        kid = manage_auth.rotate_signing_key()
+        logger.info(f"Signaturschlüssel rotiert (kid {kid})")
+        
+        return ApiResponse.success(data={
+            'kid': kid,
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except manage_auth.AuthError as e:
+        return ApiResponse.error(str(e), error_code=409)
+    except Exception as e:
+        logger.error(f"Fehler bei der Schlüsselrotation: {str(e)}")
+        return handle_api_exception(e, endpoint='/api/auth/rotate-key')
+
+# Blueprint-Registrierung
+def register_blueprint(app):
+    """Registriert den Blueprint bei der Flask-App"""
+    app.register_blueprint(api_auth)
+    logger.info("API-Endpunkte für Authentifizierung registriert")
@@ -16,7 +16,8 @@ from datetime import datetime
 from manage_api import ApiResponse, handle_api_exception
 from api_auth import token_required
 import manage_backend_service
-from manage_folders import FolderManager
+import manage_startup
+from manage_folders import get_folder_manager
 
 # Logger konfigurieren
 logger = logging.getLogger(__name__)
@@ -25,10 +26,7 @@ logger = logging.getLogger(__name__)
 api_backend_service = Blueprint('api_backend_service', __name__)
 
 # FolderManager Instanz
-folder_manager = FolderManager()
-
-# Backend-Service Instanz
-backend_service = manage_backend_service.BackendService()
+folder_manager = get_folder_manager()
 
 @api_backend_service.route('/api/service/status', methods=['GET'])
 @token_required
@@ -40,6 +38,7 @@ def get_service_status() -> Dict[str, Any]:
         Dict mit Service-Status
     """
     try:
+        backend_service = manage_backend_service.get_backend_service()
         status = backend_service.get_status()
         # Bash-kompatiblen Status auch zurückgeben
         success, combined_status = backend_service.get_status_with_comparison()
@@ -69,6 +68,7 @@ def get_service_details() -> Dict[str, Any]:
         Dict mit Service-Details
     """
     try:
+        backend_service = manage_backend_service.get_backend_service()
         details = backend_service.get_details()
         status = backend_service.get_status()
         
@@ -100,6 +100,7 @@ def start_service() -> Dict[str, Any]:
         Dict mit Status der Operation
     """
     try:
+        backend_service = manage_backend_service.get_backend_service()
         logger.info("Starte Backend-Service...")
         result = backend_service.start()
         
@@ -135,6 +136,7 @@ def stop_service() -> Dict[str, Any]:
         Dict mit Status der Operation
     """
     try:
+        backend_service = manage_backend_service.get_backend_service()
         logger.info("Stoppe Backend-Service...")
         result = backend_service.stop()
         
@@ -170,6 +172,7 @@ def restart_service() -> Dict[str, Any]:
         Dict mit Status der Operation
     """
     try:
+        backend_service = manage_backend_service.get_backend_service()
         logger.info("Starte Backend-Service neu...")
         result = backend_service.restart()
         
@@ -208,6 +211,7 @@ def compare_service_status() -> Dict[str, Any]:
         Dict mit Vergleichsergebnis
     """
     try:
+        backend_service = manage_backend_service.get_backend_service()
         # Status aus Query-Parameter lesen
         comparison_status = request.args.get('status')
         
@@ -231,3 +235,25 @@ def compare_service_status() -> Dict[str, Any]:
     except Exception as e:
         logger.error(f"Fehler beim Vergleichen des Service-Status: {e}")
         return handle_api_exception(e, endpoint='/api/service/compare_status')
+
+@api_backend_service.route('/api/service/startup', methods=['GET'])
+@token_required
+def get_startup_report() -> Dict[str, Any]:
+    """
+    Gibt den Startbericht dieses Worker-Prozesses zurück
+    
+    Returns:
+        Dict mit der Dauer der Startschritte und der Zeit bis zur Bereitschaft
+    """
+    try:
+        return ApiResponse.success(data=manage_startup.get_startup_report())
+        
+    except Exception as e:
+        logger.error(f"Fehler beim Abrufen des Startberichts: {e}")
+        return handle_api_exception(e, endpoint='/api/service/startup')
+
+# Blueprint-Registrierung
+def register_blueprint(app):
+    """Registriert den Blueprint bei der Flask-App"""
+    app.register_blueprint(api_backend_service)
+    logger.info("API-Endpunkte für Backend-Service registriert")
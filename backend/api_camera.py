@@ -23,11 +23,12 @@ import time
 import json
 
 # Importiere die Kameramodule
-import manage_camera
+import manage_camera_client
 import manage_camera_config
+import manage_metrics
 from manage_api import ApiResponse, handle_api_exception
 from api_auth import token_required
-from manage_folders import FolderManager
+from manage_folders import get_folder_manager
 
 # Logger konfigurieren
 logger = logging.getLogger(__name__)
@@ -35,8 +36,12 @@ logger = logging.getLogger(__name__)
 # Blueprint für die Kamera-API erstellen
 api_camera = Blueprint('api_camera', __name__)
 
+# Metriken des Vorschau-Streams
+PREVIEW_CLIENTS = manage_metrics.gauge('fotobox_preview_clients', 'Verbundene Clients des Vorschau-Streams')
+PREVIEW_FPS = manage_metrics.gauge('fotobox_preview_fps', 'Ausgelieferte Bildrate des Vorschau-Streams')
+
 # FolderManager Instanz
-folder_manager = FolderManager()
+folder_manager = get_folder_manager()
 
 @api_camera.route('/api/camera/list', methods=['GET'])
 @token_required
@@ -48,7 +53,7 @@ def list_cameras() -> Dict[str, Any]:
         Dict mit Liste der verfügbaren Kameras
     """
     try:
-        cameras = manage_camera.get_camera_list()
+        cameras = manage_camera_client.get_camera_list()
         return ApiResponse.success(data=cameras)
     except Exception as e:
         logger.error(f"Fehler beim Abrufen der Kameraliste: {e}")
@@ -72,7 +77,7 @@ def connect_camera() -> Dict[str, Any]:
             )
             
         camera_id = data['camera_id']
-        result = manage_camera.connect_camera(camera_id)
+        result = manage_camera_client.connect_camera(camera_id)
         
         if not result['success']:
             return ApiResponse.error(
@@ -103,7 +108,7 @@ def disconnect_camera() -> Dict[str, Any]:
         data = request.get_json()
         camera_id = data.get('camera_id') if data else None
         
-        result = manage_camera.disconnect_camera(camera_id)
+        result = manage_camera_client.disconnect_camera(camera_id)
         
         if not result['success']:
             return ApiResponse.error(
@@ -131,7 +136,7 @@ def capture_image() -> Dict[str, Any]:
         data = request.get_json()
         options = data if data else {}
         
-        result = manage_camera.capture_image(options)
+        result = manage_camera_client.capture_image(options)
         
         if not result['success']:
             return ApiResponse.error(
@@ -145,7 +150,8 @@ def capture_image() -> Dict[str, Any]:
             data={
                 'filepath': result.get('filepath', ''),
                 'thumbnail': result.get('thumbnail', ''),
-                'metadata': result.get('metadata', {})
+                'metadata': result.get('metadata', {}),
+                'trace_id': result.get('trace_id')
             }
         )
         
@@ -153,6 +159,31 @@ def capture_image() -> Dict[str, Any]:
         logger.error(f"Fehler bei der Bildaufnahme: {e}")
         return handle_api_exception(e, endpoint='/api/camera/capture')
 
+@api_camera.route('/api/camera/traces', methods=['GET'])
+@token_required
+def get_capture_traces() -> Dict[str, Any]:
+    """
+    Liefert die Zeitmessungen der letzten Aufnahmen
+    
+    Query-Parameter:
+        limit: Anzahl der Traces (Standard: 20)
+        name: Art des Ablaufs (Standard: capture, z.B. auch gallery_list)
+    
+    Returns:
+        Dict mit den Traces (neueste zuerst) und ihren Einzelschritten
+    """
+    try:
+        limit = request.args.get('limit', 20, type=int)
+        name = request.args.get('name', 'capture')
+        
+        traces = manage_camera_client.get_traces(limit=limit, name=name)
+        
+        return ApiResponse.success(data={'traces': traces, 'count': len(traces)})
+        
+    except Exception as e:
+        logger.error(f"Fehler beim Abrufen der Aufnahme-Traces: {e}")
+        return handle_api_exception(e, endpoint='/api/camera/traces')
+
 @api_camera.route('/api/camera/preview', methods=['GET'])
 @token_required
 def get_preview() -> Response:
@@ -164,20 +195,39 @@ def get_preview() -> Response:
     """
     try:
         def generate_preview() -> Generator[bytes, None, None]:
-            while True:
-                try:
-                    frame = manage_camera.get_preview_frame()
-                    if frame is None:
-                        time.sleep(0.5)
-                        continue
+            PREVIEW_CLIENTS.inc()
+            frames = 0
+            window_start = time.monotonic()
+            try:
+                while True:
+                    try:
+                        # Im Daemon-Betrieb kommen die Bilder aus dem Shared Memory (Ca. 30 FPS)
+                        for frame in manage_camera_client.iter_preview_frames():
+                            if frame is None:
+                                time.sleep(0.5)
+                                continue
+                                
+                            # Einzeln ausgeben, damit das Bild nicht noch einmal kopiert wird
+                            yield b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+                            yield frame
+                            yield b'\r\n'
+                            
+                            # Tatsächlich ausgelieferte Bildrate einmal pro Sekunde aktualisieren
+                            frames += 1
+                            elapsed = time.monotonic() - window_start
+                            if elapsed >= 1.0:
+                                PREVIEW_FPS.set(frames / elapsed)
+                                frames = 0
+                                window_start = time.monotonic()
                         
-                    yield (b'--frame\r\n'
-                           b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-                    time.sleep(0.033)  # Ca. 30 FPS
-                    
-                except Exception as e:
-                    logger.error(f"Fehler beim Generieren des Preview-Frames: {e}")
-                    time.sleep(1)
+                    except Exception as e:
+                        logger.error(f"Fehler beim Generieren des Preview-Frames: {e}")
+                        time.sleep(1)
+            finally:
+                # Verbindung des Clients beendet
+                PREVIEW_CLIENTS.dec()
+                if PREVIEW_CLIENTS.get() <= 0:
+                    PREVIEW_FPS.set(0)
                     
         return Response(
             stream_with_context(generate_preview()),
@@ -206,7 +256,7 @@ def camera_settings() -> Dict[str, Any]:
                     status_code=400
                 )
                 
-            result = manage_camera.update_settings(settings)
+            result = manage_camera_client.update_camera_settings(settings)
             if not result['success']:
                 return ApiResponse.error(
                     message="Aktualisierung der Einstellungen fehlgeschlagen",
@@ -220,8 +270,8 @@ def camera_settings() -> Dict[str, Any]:
             )
             
         else:  # GET
-            settings = manage_camera.get_settings()
-            return ApiResponse.success(data=settings)
+            result = manage_camera_client.get_camera_settings()
+            return ApiResponse.success(data=result.get('settings', {}) if result.get('success') else {})
             
     except Exception as e:
         logger.error(f"Fehler bei Kameraeinstellungen: {e}")
@@ -237,7 +287,7 @@ def get_status() -> Dict[str, Any]:
         Dict mit Kamerastatus
     """
     try:
-        status = manage_camera.get_status()
+        status = manage_camera_client.get_status()
         return ApiResponse.success(data=status)
         
     except Exception as e:
@@ -299,3 +349,9 @@ def camera_config() -> Dict[str, Any]:
     except Exception as e:
         logger.error(f"Fehler bei Kamera-Konfiguration: {e}")
         return handle_api_exception(e, endpoint='/api/camera/config')
+
+# Blueprint-Registrierung
+def register_blueprint(app):
+    """Registriert den Blueprint bei der Flask-App"""
+    app.register_blueprint(api_camera)
+    logger.info("API-Endpunkte für Kamera registriert")
@@ -27,11 +27,12 @@ api_camera_config = Blueprint('api_camera_config', __name__)
 def get_camera_configs():
     """API-Endpunkt um alle verfügbaren Kamera-Konfigurationen abzurufen"""
     try:
-        configs = manage_camera_config.get_camera_configs()
-        return ApiResponse.success(data={
-            'configs': configs,
-            'count': len(configs)
-        })
+        def build():
+            configs = manage_camera_config.get_camera_configs()
+            return {'configs': configs, 'count': len(configs)}
+        
+        # Antworttext nur nach Änderungen an den Konfigurationen neu serialisieren
+        return ApiResponse.cached('camera_configs', manage_camera_config.get_config_version(), build)
     except Exception as e:
         logger.error(f"Fehler beim Abrufen der Kamera-Konfigurationen: {e}")
         return handle_api_exception(e, endpoint='/api/camera-configs')
@@ -57,13 +58,14 @@ def get_active_config():
 def get_camera_config(config_id: str):
     """API-Endpunkt um eine spezifische Kamera-Konfiguration abzurufen"""
     try:
+        version = manage_camera_config.get_config_version()
         config = manage_camera_config.get_config(config_id)
         if not config:
             return ApiResponse.error(
                 f"Konfiguration {config_id} nicht gefunden",
                 error_code=404
             )
-        return ApiResponse.success(data=config)
+        return ApiResponse.cached(('camera_config', config_id), version, lambda: config)
     except Exception as e:
         logger.error(f"Fehler beim Abrufen der Konfiguration {config_id}: {e}")
         return handle_api_exception(e, endpoint=f'/api/camera-configs/{config_id}')
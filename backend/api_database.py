@@ -11,7 +11,7 @@ dient als Schnittstelle zwischen dem Frontend und dem manage_database-Modul.
 # - Response-Format vereinheitlichen
 # - Siehe detaillierte Anforderungen in 2025-07-02 Konfigurationswerte_neu.todo
 
-from flask import Blueprint, request
+from flask import Blueprint, request, Response, stream_with_context
 from typing import Dict, Any, List, Optional
 import logging
 import os
@@ -20,7 +20,7 @@ import sqlite3
 from manage_api import ApiResponse, handle_api_exception
 from api_auth import token_required
 import manage_database
-from manage_folders import FolderManager
+from manage_folders import get_folder_manager
 
 # Logger konfigurieren
 logger = logging.getLogger(__name__)
@@ -29,37 +29,7 @@ logger = logging.getLogger(__name__)
 api_database = Blueprint('api_database', __name__)
 
 # FolderManager Instanz
-folder_manager = FolderManager()
-
-# Liste erlaubter SQL-Operationen für Nicht-Admins
-ALLOWED_SQL_OPS = {'SELECT'}
-
-def validate_sql_query(sql: str, is_admin: bool = False) -> bool:
-    """
-    Validiert eine SQL-Abfrage auf potenziell gefährliche Operationen
-    
-    Args:
-        sql: Die zu prüfende SQL-Abfrage
-        is_admin: Ob der Benutzer Admin-Rechte hat
-    
-    Returns:
-        bool: True wenn die Abfrage sicher ist
-    
-    Raises:
-        ValueError: Wenn die Abfrage potenziell gefährlich ist
-    """
-    if is_admin:
-        return True
-        
-    sql_upper = sql.upper()
-    ops = {word for word in sql_upper.split() if word in 
-           {'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'DROP', 'ALTER', 'CREATE', 'TRUNCATE'}}
-    
-    if not ops.issubset(ALLOWED_SQL_OPS):
-        forbidden = ops - ALLOWED_SQL_OPS
-        raise ValueError(f"Nicht erlaubte SQL-Operationen: {', '.join(forbidden)}")
-        
-    return True
+folder_manager = get_folder_manager()
 
 # -------------------------------------------------------------------------------
 # API-Endpunkte für Datenbankoperationen
@@ -69,44 +39,62 @@ def validate_sql_query(sql: str, is_admin: bool = False) -> bool:
 @token_required
 def db_query() -> Dict[str, Any]:
     """
-    API-Endpunkt für Datenbankabfragen
+    API-Endpunkt für Nur-Lese-Datenbankabfragen
+    
+    Schreibende Anweisungen werden von SQLite selbst (Authorizer auf einer
+    mode=ro-Verbindung) abgewiesen. Mit 'stream': true wird das Ergebnis
+    ohne Zeilenlimit als NDJSON gestreamt.
     
     Returns:
-        Dict mit Abfrageergebnis
+        Dict mit Abfrageergebnis bzw. NDJSON-Stream
     """
     try:
         data = request.get_json()
         if not data or 'sql' not in data:
             return ApiResponse.error(
                 message="SQL-Statement fehlt",
-                status_code=400
+                error_code=400
             )
             
         sql = data['sql']
-        params = data.get('params', [])
-        
-        # SQL-Validierung
-        try:
-            validate_sql_query(sql, is_admin=False)  # TODO: Admin-Status prüfen
-        except ValueError as e:
-            logger.warning(f"SQL-Validierung fehlgeschlagen: {e}")
-            return ApiResponse.error(
-                message="Operation nicht erlaubt",
-                details=str(e),
-                status_code=403
+        params = data.get('params') or []
+        db_path = manage_database.get_database_path(data.get('db', 'settings'))
+        
+        if data.get('stream'):
+            # Abfrage vor dem Streamen ausführen, damit Fehler als Statuscode ankommen
+            cursor = manage_database.open_readonly_query(sql, params, db_path)
+            max_rows = data.get('max_rows')
+            return Response(
+                stream_with_context(manage_database.iter_query_ndjson(
+                    cursor, max_rows=int(max_rows) if max_rows else None
+                )),
+                mimetype='application/x-ndjson'
             )
         
-        # Führe die Abfrage durch
-        result = manage_database.query(sql, params)
+        max_rows = min(int(data.get('max_rows', manage_database.QUERY_MAX_ROWS)),
+                       manage_database.QUERY_MAX_ROWS)
+        result = manage_database.query(sql, params, db_path, max_rows=max_rows)
         if not result['success']:
             return ApiResponse.error(
                 message="Datenbankabfrage fehlgeschlagen",
                 details=result.get('error'),
-                status_code=400
+                error_code=400
             )
             
-        return ApiResponse.success(data=result.get('data', []))
-        
+        message = None
+        if result['truncated']:
+            message = f"Ergebnis auf {max_rows} Zeilen begrenzt"
+        return ApiResponse.success(data=result['data'], message=message)
+        
+    except manage_database.QueryNotAllowedError as e:
+        logger.warning(f"SQL-Abfrage abgewiesen: {e}")
+        return ApiResponse.error(
+            message="Operation nicht erlaubt",
+            details=str(e),
+            error_code=403
+        )
+    except (manage_database.QueryTimeoutError, manage_database.DatabaseConfigError) as e:
+        return ApiResponse.error(str(e), error_code=400)
     except Exception as e:
         logger.error(f"Fehler bei DB-Abfrage: {e}")
         return handle_api_exception(e, endpoint='/api/database/query')
@@ -277,8 +265,11 @@ def set_db_setting() -> Dict[str, Any]:
 def check_db_integrity() -> Dict[str, Any]:
     """API-Endpunkt zur Überprüfung der Datenbankintegrität"""
     try:
-        result = manage_database.check_integrity()
+        db_path = manage_database.get_database_path(request.args.get('db', 'settings'))
+        result = manage_database.check_integrity(db_path)
         return ApiResponse.success(data=result)
+    except manage_database.DatabaseConfigError as e:
+        return ApiResponse.error(str(e), error_code=400)
     except Exception as e:
         logger.error(f"Fehler bei der Datenbankintegritätsprüfung: {e}")
         return handle_api_exception(e, endpoint='/api/database/check-integrity')
@@ -288,37 +279,30 @@ def check_db_integrity() -> Dict[str, Any]:
 def get_db_stats() -> Dict[str, Any]:
     """API-Endpunkt zum Abrufen von Datenbankstatistiken"""
     try:
-        # Hier müssen wir die Statistiken manuell sammeln, da diese nicht direkt in manage_database implementiert sind
-        conn = manage_database.connect_db()
-        cursor = conn.cursor()
-        
-        # Tabellen auflisten
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = [row['name'] for row in cursor.fetchall()]
-        
-        # Statistiken pro Tabelle sammeln
-        stats = {}
-        for table in tables:
-            cursor.execute(f"SELECT COUNT(*) as count FROM {table}")
-            count_result = cursor.fetchone()
-            count = count_result['count'] if count_result else 0
-            stats[table] = {'rows': count}
-        
-        # Datenbankgröße ermitteln
-        db_size = os.path.getsize(manage_database.DB_PATH) if os.path.exists(manage_database.DB_PATH) else 0
-        
-        conn.close()
-        
-        return ApiResponse.success(data={
-            'tables': tables,
-            'stats': stats,
-            'size_bytes': db_size,
-            'size_mb': round(db_size / (1024 * 1024), 2)
-        })
+        # Zeilenzahlen werden aus sqlite_stat1 geschätzt, kein COUNT(*) pro Tabelle
+        db_path = manage_database.get_database_path(request.args.get('db', 'settings'))
+        return ApiResponse.success(data=manage_database.get_database_stats(db_path))
+    except manage_database.DatabaseConfigError as e:
+        return ApiResponse.error(str(e), error_code=400)
     except Exception as e:
         logger.error(f"Fehler beim Abrufen der Datenbankstatistiken: {e}")
         return handle_api_exception(e, endpoint='/api/database/stats')
 
+@api_database.route('/api/database/maintenance', methods=['POST'])
+@token_required
+def run_db_maintenance() -> Dict[str, Any]:
+    """API-Endpunkt zum sofortigen Ausführen der Datenbankwartung"""
+    try:
+        data = request.get_json(silent=True) or {}
+        db_path = manage_database.get_database_path(data.get('db', 'settings'))
+        result = manage_database.run_maintenance(db_path)
+        return ApiResponse.success(data=result)
+    except manage_database.DatabaseConfigError as e:
+        return ApiResponse.error(str(e), error_code=400)
+    except Exception as e:
+        logger.error(f"Fehler bei der Datenbankwartung: {e}")
+        return handle_api_exception(e, endpoint='/api/database/maintenance')
+
 @api_database.route('/api/database/backup', methods=['POST'])
 @token_required
 def backup_database() -> Dict[str, Any]:
@@ -326,24 +310,19 @@ def backup_database() -> Dict[str, Any]:
     try:
         # Datenbankdatei sichern
         import time
-        import shutil
         
         # Backup-Verzeichnis erstellen, falls es nicht existiert
-        backup_dir = os.path.join(os.path.dirname(manage_database.DB_PATH), 'backups')
+        backup_dir = os.path.join(os.path.dirname(manage_database.get_db_path()), 'backups')
         os.makedirs(backup_dir, exist_ok=True)
         
         # Eindeutigen Dateinamen erstellen
         timestamp = time.strftime("%Y%m%d_%H%M%S")
-        db_filename = os.path.basename(manage_database.DB_PATH)
+        db_filename = os.path.basename(manage_database.get_db_path())
         backup_filename = f"{os.path.splitext(db_filename)[0]}_{timestamp}.db"
         backup_path = os.path.join(backup_dir, backup_filename)
         
-        # Datenbank-Verbindung sicherstellen und schließen
-        conn = manage_database.connect_db()
-        conn.close()
-        
-        # Datei kopieren
-        shutil.copy2(manage_database.DB_PATH, backup_path)
+        # Über die Backup-API kopieren (enthält auch Commits, die noch im WAL stehen)
+        manage_database.copy_database(manage_database.get_db_path(), backup_path)
         
         logger.info(f"Datenbanksicherung erstellt: {backup_path}")
         return ApiResponse.success(
@@ -475,3 +454,9 @@ def cleanup_orphaned_metadata() -> Dict[str, Any]:
 def init_app(app):
     """Initialisiert die Datenbank-API mit der Flask-Anwendung"""
     app.register_blueprint(api_database)
+
+# Blueprint-Registrierung
+def register_blueprint(app):
+    """Registriert den Blueprint bei der Flask-App"""
+    app.register_blueprint(api_database)
+    logger.info("API-Endpunkte für Datenbank registriert")
@@ -22,7 +22,7 @@ import utils.path_utils as utils  # Sicherheitsutils für Pfadoperationen
 import manage_files
 from manage_api import ApiResponse, handle_api_exception
 from api_auth import token_required
-from manage_folders import FolderManager
+from manage_folders import get_folder_manager
 
 # Logger konfigurieren
 logger = logging.getLogger(__name__)
@@ -31,7 +31,7 @@ logger = logging.getLogger(__name__)
 api_files = Blueprint('api_files', __name__)
 
 # FolderManager Instanz
-folder_manager = FolderManager()
+folder_manager = get_folder_manager()
 
 @api_files.route('/api/files/config', methods=['GET'])
 @token_required
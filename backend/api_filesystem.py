@@ -35,19 +35,26 @@ def get_images():
         sort_by = request.args.get('sort', 'date')
         order = request.args.get('order', 'desc')
         
-        result = manage_files.get_image_list(
-            directory=directory,
-            page=page,
-            limit=limit,
-            sort_by=sort_by,
-            order=order
-        )
+        result = manage_files.get_image_list(directory=directory)
+        if not result['success']:
+            return ApiResponse.error(result.get('error', 'Bilderliste nicht verfügbar'))
+        
+        # get_image_list liefert die Dateinamen nach Datum absteigend sortiert
+        images = result['photos']
+        if sort_by == 'name':
+            images = sorted(images, reverse=(order == 'desc'))
+        elif order == 'asc':
+            images = images[::-1]
         
-        return ApiResponse.success(data={
-            'images': result['images'],
-            'total': result['total'],
+        page = max(page, 1)
+        limit = max(limit, 1)
+        total = len(images)
+        page_images = images[(page - 1) * limit:page * limit]
+        validator = '\n'.join([request.full_path, str(total)] + page_images)
+        return ApiResponse.stream(page_images, key='images', validator=validator, meta={
+            'total': total,
             'page': page,
-            'pages': (result['total'] + limit - 1) // limit
+            'pages': (total + limit - 1) // limit
         })
     except Exception as e:
         logger.error(f"Fehler beim Abrufen der Bilderliste: {e}")
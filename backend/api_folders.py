@@ -15,7 +15,7 @@ import logging
 from pathlib import Path
 
 from manage_api import ApiResponse, handle_api_exception
-from manage_folders import FolderManager, get_photos_dir, get_photos_gallery_dir
+from manage_folders import get_folder_manager, get_photos_dir, get_photos_gallery_dir
 from api_auth import token_required
 
 # Logger konfigurieren
@@ -25,7 +25,7 @@ logger = logging.getLogger(__name__)
 api_folders = Blueprint('api_folders', __name__)
 
 # FolderManager Instanz
-folder_manager = FolderManager()
+folder_manager = get_folder_manager()
 
 @api_folders.route('/api/folders/structure', methods=['GET'])
 @token_required
@@ -5,7 +5,7 @@ Dieses Modul stellt die Flask-API-Endpunkte für Logging-Operationen bereit und
 dient als Schnittstelle zwischen dem Frontend und dem manage_logging-Modul.
 """
 
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 import os
 import json
 import logging
@@ -13,10 +13,10 @@ from datetime import datetime
 from typing import Dict, Any, Optional, List
 from pathlib import Path
 
-from manage_folders import FolderManager, get_log_dir
+from manage_folders import get_folder_manager, get_log_dir
 import manage_logging
 from api_auth import token_required
-from manage_api import ApiResponse, handle_api_exception
+from manage_api import ApiResponse, handle_api_exception, get_access_stats
 
 # Logger konfigurieren
 logger = logging.getLogger(__name__)
@@ -25,7 +25,7 @@ logger = logging.getLogger(__name__)
 api_logging = Blueprint('api_logging', __name__)
 
 # FolderManager für Pfadverwaltung
-folder_manager = FolderManager()
+folder_manager = get_folder_manager()
 
 @api_logging.route('/api/logs', methods=['GET'])
 @token_required
@@ -39,6 +39,7 @@ def get_logs():
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
         source = request.args.get('source')
+        cursor = request.args.get('cursor')
         
         # Parameter validieren
         if limit > 1000:
@@ -72,7 +73,8 @@ def get_logs():
             offset=offset,
             start_date=start_date,
             end_date=end_date,
-            source=source
+            source=source,
+            cursor=cursor
         )
         
         # Metadaten berechnen
@@ -83,18 +85,64 @@ def get_logs():
             source=source
         )
         
-        return ApiResponse.success(data={
-            'logs': logs,
+        # Cursor für die nächste Seite (Keyset-Paginierung)
+        has_more = len(logs) == limit
+        # Bis zu 1000 Einträge mit Kontext: abschnittsweise serialisieren; der ETag
+        # ergibt sich aus Anfrage, Anzahl und erstem/letztem Eintrag der Seite
+        validator = '|'.join([request.full_path, str(total_count)] +
+                             [manage_logging.encode_log_cursor(entry) for entry in logs[:1] + logs[-1:]])
+        return ApiResponse.stream(logs, key='logs', validator=validator, meta={
             'total': total_count,
             'offset': offset,
             'limit': limit,
-            'has_more': (offset + limit) < total_count
+            'has_more': has_more,
+            'next_cursor': manage_logging.encode_log_cursor(logs[-1]) if has_more and logs else None
         })
         
+    except ValueError as e:
+        return ApiResponse.error(str(e), error_code=400)
     except Exception as e:
         logger.error(f"Fehler beim Abrufen der Logs: {e}")
         return handle_api_exception(e, endpoint='/api/logs')
 
+@api_logging.route('/api/logs/search', methods=['GET'])
+@token_required
+def search_logs():
+    """API-Endpunkt für die Volltextsuche in Nachricht und Kontext der Logs
+    
+    Query-Parameter:
+        q: Suchtext ("Phrase", Präfix*, -Ausschluss)
+        level, source, start_date, end_date: Zusätzliche Filter
+        limit: Maximale Anzahl Treffer
+        cursor: next_cursor der vorigen Seite
+    """
+    try:
+        result = manage_logging.search_logs(
+            request.args.get('q', ''),
+            level=request.args.get('level'),
+            source=request.args.get('source'),
+            start_date=request.args.get('start_date'),
+            end_date=request.args.get('end_date'),
+            limit=request.args.get('limit', 50, type=int),
+            cursor=request.args.get('cursor')
+        )
+        return ApiResponse.success(data=result)
+    except ValueError as e:
+        return ApiResponse.error(str(e), error_code=400)
+    except Exception as e:
+        logger.error(f"Fehler bei der Logsuche: {e}")
+        return handle_api_exception(e, endpoint='/api/logs/search')
+
+@api_logging.route('/api/logs/access', methods=['GET'])
+@token_required
+def get_access_log_stats():
+    """API-Endpunkt für die aggregierte Zugriffsstatistik je Endpunkt (über alle Worker)"""
+    try:
+        return ApiResponse.success(data={'endpoints': get_access_stats()})
+    except Exception as e:
+        logger.error(f"Fehler beim Abrufen der Zugriffsstatistik: {e}")
+        return handle_api_exception(e, endpoint='/api/logs/access')
+
 @api_logging.route('/api/logs/sources', methods=['GET'])
 @token_required
 def get_log_sources():
@@ -111,42 +159,100 @@ def get_log_sources():
 @api_logging.route('/api/logs/download', methods=['GET'])
 @token_required
 def download_logs():
-    """API-Endpunkt zum Herunterladen von Logs"""
+    """API-Endpunkt zum Herunterladen von Logs
+    
+    Die Logs werden direkt aus der Datenbank in die Antwort gestreamt,
+    mit gzip=1 zusätzlich fortlaufend komprimiert.
+    """
     try:
         # Parameter aus Query extrahieren
         source = request.args.get('source')
+        level = request.args.get('level')
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
         format_type = request.args.get('format', 'json')
+        compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
         
         # Parameter validieren
-        if format_type not in ['json', 'csv', 'txt']:
+        if format_type not in manage_logging.EXPORT_FORMATS:
             return ApiResponse.error(
                 "Ungültiges Format (erlaubt: json, csv, txt)",
                 error_code=400
             )
         
         # Logs exportieren
-        export_path = manage_logging.export_logs(
+        chunks = manage_logging.iter_export_logs(
+            format_type=format_type,
+            level=level,
             source=source,
             start_date=start_date,
-            end_date=end_date,
-            format_type=format_type
+            end_date=end_date
         )
         
-        # Datei zum Download bereitstellen
         filename = f"logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format_type}"
-        return send_file(
-            export_path,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/json' if format_type == 'json' else 'text/plain'
+        mimetype = manage_logging.EXPORT_FORMATS[format_type]
+        if compress:
+            chunks = manage_logging.iter_gzip(chunks)
+            filename += '.gz'
+            mimetype = 'application/gzip'
+        
+        return Response(
+            stream_with_context(chunks),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
         )
         
     except Exception as e:
         logger.error(f"Fehler beim Download der Logs: {e}")
         return handle_api_exception(e, endpoint='/api/logs/download')
 
+@api_logging.route('/api/logs/stream', methods=['GET'])
+@token_required
+def stream_logs():
+    """API-Endpunkt zum Live-Verfolgen der Logs (Server-Sent Events)
+    
+    Query-Parameter:
+        level: Mindest-Log-Level
+        source: Quelle bzw. Loggername
+        replay: Anzahl der zuletzt geloggten Einträge, die vorab gesendet werden (max. 500)
+    
+    Die Einträge kommen direkt aus der Logging-Pipeline (unter gunicorn aus der
+    gemeinsamen Live-Logdatei aller Prozesse), die Datenbank wird nicht abgefragt.
+    """
+    try:
+        replay = min(max(request.args.get('replay', 50, type=int), 0), manage_logging.LIVE_LOG_BUFFER_SIZE)
+        entries = manage_logging.iter_live_logs(
+            level=request.args.get('level'),
+            source=request.args.get('source'),
+            replay=replay
+        )
+        # Filter sofort prüfen, damit Fehler als normale API-Antwort zurückkommen
+        first_entry = next(entries)
+    except ValueError as e:
+        return ApiResponse.error(str(e), error_code=400)
+    except Exception as e:
+        logger.error(f"Fehler beim Öffnen des Log-Streams: {e}")
+        return handle_api_exception(e, endpoint='/api/logs/stream')
+
+    def generate():
+        entry = first_entry
+        try:
+            while True:
+                if entry is None:
+                    yield ": keepalive\n\n"
+                elif 'dropped' in entry:
+                    yield f"event: dropped\ndata: {json.dumps(entry)}\n\n"
+                else:
+                    yield f"id: {entry['id']}\nevent: log\ndata: {json.dumps(entry, ensure_ascii=False)}\n\n"
+                entry = next(entries)
+        finally:
+            entries.close()
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @api_logging.route('/api/logs', methods=['DELETE'])
 @token_required
 def clear_logs():
@@ -186,10 +292,24 @@ def clear_logs():
         logger.error(f"Fehler beim Löschen der Logs: {e}")
         return handle_api_exception(e, endpoint='/api/logs')
 
+@api_logging.route('/api/logs/level', methods=['GET'])
+@token_required
+def get_log_level():
+    """API-Endpunkt zum Abrufen des globalen und der modulspezifischen Log-Level"""
+    try:
+        return ApiResponse.success(data=manage_logging.get_log_levels())
+    except Exception as e:
+        logger.error(f"Fehler beim Abrufen des Log-Levels: {e}")
+        return handle_api_exception(e, endpoint='/api/logs/level')
+
 @api_logging.route('/api/logs/level', methods=['PUT'])
 @token_required
 def set_log_level():
-    """API-Endpunkt zum Ändern des Log-Levels"""
+    """API-Endpunkt zum Ändern des Log-Levels
+    
+    Mit "module" wird nur das Level dieses Moduls geändert; "level": null
+    setzt das Modul wieder auf das globale Level zurück.
+    """
     try:
         data = request.get_json()
         if not data or 'level' not in data:
@@ -197,13 +317,21 @@ def set_log_level():
                 "Log-Level muss angegeben werden",
                 error_code=400
             )
-            
-        level = data['level'].upper()
-        if level not in ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']:
+        
+        module = data.get('module')
+        level = data['level'].upper() if isinstance(data['level'], str) else data['level']
+        if level not in manage_logging.VALID_LOG_LEVELS and not (module and level is None):
             return ApiResponse.error(
                 "Ungültiger Log-Level",
                 error_code=400
             )
+        
+        if module:
+            manage_logging.set_module_log_level(module, level)
+            return ApiResponse.success(
+                message=f"Log-Level für {module} auf {level or 'Standard'} gesetzt",
+                data=manage_logging.get_log_levels()
+            )
             
         manage_logging.set_log_level(level)
         return ApiResponse.success(
@@ -0,0 +1,50 @@
+"""
+api_metrics.py - Metrik-Endpunkt für Fotobox2
+
+Dieses Modul stellt die Metriken aus manage_metrics im Prometheus-Textformat
+unter /metrics bereit.
+
+Der Endpunkt ist ohne Token erreichbar (Prometheus-Scraper senden keinen),
+standardmäßig aber nur von lokalen Adressen. Mit FOTOBOX_METRICS_PUBLIC=1
+ist er auch aus dem Netzwerk abrufbar.
+
+Unter gunicorn werden die Stände aller Worker und des Stream-Prozesses
+zusammengeführt (manage_metrics.render_metrics), im Daemon-Betrieb zusätzlich
+die des Kamera-Daemons, in dem Aufnahmen und Vorschau gemessen werden.
+"""
+
+import os
+import logging
+from flask import Blueprint, Response, request
+
+import manage_metrics
+import manage_camera_client
+from manage_api import ApiResponse, handle_api_exception
+
+# Logger konfigurieren
+logger = logging.getLogger(__name__)
+
+# Blueprint für die Metrik-API erstellen
+api_metrics = Blueprint('api_metrics', __name__)
+
+METRICS_PUBLIC = os.environ.get('FOTOBOX_METRICS_PUBLIC', '').lower() in ('1', 'true', 'yes')
+LOCAL_ADDRESSES = ('127.0.0.1', '::1', 'localhost')
+
+@api_metrics.route('/metrics', methods=['GET'])
+def get_metrics():
+    """API-Endpunkt für alle Metriken im Prometheus-Textformat"""
+    try:
+        if not METRICS_PUBLIC and request.remote_addr not in LOCAL_ADDRESSES:
+            return ApiResponse.error("Zugriff verweigert", error_code=403)
+        daemon_snapshot = manage_camera_client.get_metrics_snapshot()
+        extra = [daemon_snapshot] if daemon_snapshot else []
+        return Response(manage_metrics.render_metrics(extra), content_type=manage_metrics.CONTENT_TYPE)
+    except Exception as e:
+        logger.error(f"Fehler beim Abrufen der Metriken: {e}")
+        return handle_api_exception(e, endpoint='/metrics')
+
+# Blueprint-Registrierung
+def register_blueprint(app):
+    """Registriert den Blueprint bei der Flask-App"""
+    app.register_blueprint(api_metrics)
+    logger.info("API-Endpunkt für Metriken registriert")
@@ -12,11 +12,12 @@ bereit und dient als Schnittstelle zwischen dem Frontend und dem manage_settings
 # - Fehlerbehandlung und sauberes Error-Reporting
 # - Siehe detaillierte Anforderungen in 2025-07-02 Konfigurationswerte_neu.todo
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+import json
 import logging
 from typing import Dict, Any, Optional
 
-from manage_folders import FolderManager, get_config_dir
+from manage_folders import get_folder_manager, get_config_dir
 import manage_settings
 from api_auth import token_required
 from manage_api import ApiResponse, handle_api_exception
@@ -28,7 +29,7 @@ logger = logging.getLogger(__name__)
 api_settings = Blueprint('api_settings', __name__)
 
 # FolderManager für Pfadverwaltung
-folder_manager = FolderManager()
+folder_manager = get_folder_manager()
 
 @api_settings.route('/api/settings', methods=['GET'])
 @token_required
@@ -44,6 +45,81 @@ def get_settings():
         logger.error(f"Fehler beim Abrufen der Einstellungen: {e}")
         return handle_api_exception(e, endpoint='/api/settings')
 
+@api_settings.route('/api/settings/schema', methods=['GET'])
+def get_settings_schema():
+    """API-Endpunkt zum Abrufen des JSON-Schemas für die clientseitige Validierung"""
+    try:
+        return ApiResponse.success(data=manage_settings.get_validation_schema())
+    except Exception as e:
+        logger.error(f"Fehler beim Abrufen des Einstellungs-Schemas: {e}")
+        return handle_api_exception(e, endpoint='/api/settings/schema')
+
+@api_settings.route('/api/settings/validate', methods=['POST'])
+@token_required
+def validate_settings():
+    """API-Endpunkt zur Validierung von Einstellungen ohne Speicherung
+    
+    Liefert alle Validierungsfehler auf einmal zurück.
+    """
+    try:
+        settings = request.get_json()
+        if not settings:
+            return ApiResponse.error('Keine Einstellungen übermittelt', 400)
+        
+        valid, errors = manage_settings.validate_settings(settings)
+        return ApiResponse.success(data={
+            'valid': valid,
+            'errors': errors
+        })
+    except Exception as e:
+        logger.error(f"Fehler bei der Validierung der Einstellungen: {e}")
+        return handle_api_exception(e, endpoint='/api/settings/validate')
+
+@api_settings.route('/api/settings/events', methods=['GET'])
+@token_required
+def settings_events():
+    """API-Endpunkt für Änderungsereignisse der Einstellungen (Server-Sent Events)
+    
+    Query-Parameter:
+        keys: Kommagetrennte Schlüssel oder Gruppen (z.B. "camera,system.color_mode")
+    
+    Das erste Ereignis ("snapshot") enthält den aktuellen Stand, danach folgen
+    nur noch geänderte Schlüssel ("change"). data ist jeweils
+    {"sequence": n, "settings": {...}}; die Nummern steigen innerhalb einer
+    Verbindung in der Reihenfolge der Änderungen.
+    """
+    try:
+        keys_param = request.args.get('keys')
+        keys = [key.strip() for key in keys_param.split(',') if key.strip()] if keys_param else None
+        events = manage_settings.iter_change_events(keys)
+        first_event = next(events)
+    except manage_settings.SettingsKeyError as e:
+        return ApiResponse.error(str(e), 400)
+    except Exception as e:
+        logger.error(f"Fehler beim Öffnen des Ereignis-Streams: {e}")
+        return handle_api_exception(e, endpoint='/api/settings/events')
+
+    def generate():
+        event = first_event
+        try:
+            while True:
+                if event is None:
+                    # Kommentarzeile hält die Verbindung über Proxys hinweg offen
+                    yield ": keepalive\n\n"
+                else:
+                    # Ereignisnummer des Prozesses, zu dem der Stand gehört (als id und in data)
+                    data = json.dumps({'sequence': event['sequence'], 'settings': event['settings']},
+                                      ensure_ascii=False)
+                    yield f"id: {event['sequence']}\nevent: {event['type']}\ndata: {data}\n\n"
+                event = next(events)
+        finally:
+            events.close()
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @api_settings.route('/api/settings/<key>', methods=['GET'])
 @token_required
 def get_setting(key: str):
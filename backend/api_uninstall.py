@@ -12,7 +12,7 @@ import logging
 from manage_api import ApiResponse, handle_api_exception
 from api_auth import token_required
 import manage_uninstall
-from manage_folders import FolderManager
+from manage_folders import get_folder_manager
 
 # Logger konfigurieren
 logger = logging.getLogger(__name__)
@@ -21,7 +21,7 @@ logger = logging.getLogger(__name__)
 api_uninstall = Blueprint('api_uninstall', __name__)
 
 # FolderManager Instanz
-folder_manager = FolderManager()
+folder_manager = get_folder_manager()
 
 @api_uninstall.route('/api/uninstall/backup-configs', methods=['POST'])
 @token_required
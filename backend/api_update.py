@@ -12,11 +12,9 @@ import sys
 from datetime import datetime
 from typing import Dict, Any, Optional
 
-# Import der Update-Funktionen
-import manage_update
 from api_auth import token_required
 from manage_api import ApiResponse, handle_api_exception
-from manage_folders import FolderManager
+from manage_folders import get_folder_manager
 
 # Logger einrichten
 logger = logging.getLogger(__name__)
@@ -25,7 +23,11 @@ logger = logging.getLogger(__name__)
 api_update = Blueprint('api_update', __name__)
 
 # FolderManager Instanz
-folder_manager = FolderManager()
+folder_manager = get_folder_manager()
+
+# manage_update ist ein Skript mit Nebenwirkungen beim Import (Logdatei über die
+# Shell ermitteln, Logs rotieren, Verzeichnisse anlegen) und wird daher erst bei
+# der ersten Update-Anfrage geladen
 
 @api_update.route('/api/update/check', methods=['GET'])
 @token_required
@@ -37,6 +39,7 @@ def check_updates() -> Dict[str, Any]:
         Dict mit Versions- und Update-Informationen
     """
     try:
+        import manage_update
         local_version = manage_update.get_local_version()
         remote_version = manage_update.get_remote_version()
         
@@ -68,6 +71,7 @@ def start_update() -> Dict[str, Any]:
         Dict mit Status und Job-ID des Update-Prozesses
     """
     try:
+        import manage_update
         # Prüfe Systemvoraussetzungen
         system_check = manage_update.check_system_requirements()
         if not system_check['success']:
@@ -113,6 +117,7 @@ def get_update_status(job_id: str) -> Dict[str, Any]:
         Dict mit aktuellem Status des Updates
     """
     try:
+        import manage_update
         if not job_id:
             return ApiResponse.error(
                 message='Keine Job-ID angegeben',
@@ -143,6 +148,7 @@ def get_update_status(job_id: str) -> Dict[str, Any]:
 def cancel_update(job_id: str):
     """API-Endpunkt zum Abbrechen eines laufenden Updates"""
     try:
+        import manage_update
         if manage_update.cancel_update(job_id):
             return jsonify({
                 'success': True,
@@ -5,20 +5,25 @@ Dieses Modul initialisiert die Flask-Anwendung und konfiguriert alle
 notwendigen Erweiterungen, Blueprints und Middleware-Komponenten.
 """
 
-from flask import Flask, request, jsonify, session
+from flask import Flask, request, jsonify, session, g
 from flask_cors import CORS
 import os
 import logging
 import sys
-from werkzeug.middleware.proxy_fix import ProxyFix
+import time
 
 # Importiere Kernmodule
 import manage_logging
 import manage_folders
 import manage_auth
-import manage_settings  # TODO: Anpassung für neue Settings-API (hierarchische Schlüssel und DB-Backend)
+import manage_settings
 import manage_database  # TODO: Integration mit manage_database.sh für zentralisierte Datenbankoperationen
 import manage_backend_service
+import manage_api
+import manage_http
+import manage_json
+import manage_startup
+import manage_metrics
 
 # Importiere API-Module
 import api_auth
@@ -32,6 +37,7 @@ import api_logging
 import api_settings
 import api_update
 import api_backend_service
+import api_metrics
 
 # Logging einrichten (vor Flask-App-Erstellung)
 manage_logging.setup_logging()
@@ -54,8 +60,15 @@ def create_app(test_config=None):
         # Testkonfiguration
         app.config.from_mapping(test_config)
     
-    # Secret Key setzen
-    app.secret_key = os.environ.get('FOTOBOX_SECRET_KEY', os.urandom(24))
+    # Startablauf der App (Datenbank, Authentifizierung, Verzeichnisse, ggf. Kameraerkennung)
+    if test_config is None:
+        manage_startup.startup('app')
+    
+    # Secret Key setzen (persistent, damit Sessions Neustarts und mehrere Worker überstehen)
+    app.secret_key = manage_auth.get_session_secret()
+    
+    # JSON-Serialisierung (orjson, Dataclasses, __slots__) auch für jsonify
+    manage_json.init_app(app)
     
     # CORS konfigurieren
     CORS(app, resources={
@@ -66,8 +79,8 @@ def create_app(test_config=None):
         }
     })
     
-    # Proxy-Konfiguration (für nginx)
-    app.wsgi_app = ProxyFix(
+    # Proxy-Konfiguration (für nginx, nur von lokalen Adressen)
+    app.wsgi_app = manage_http.TrustedProxyFix(
         app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_prefix=1
     )
     
@@ -83,7 +96,12 @@ def create_app(test_config=None):
     api_settings.register_blueprint(app)
     api_update.register_blueprint(app)
     api_backend_service.register_blueprint(app)
+    api_metrics.register_blueprint(app)
     
+    # Unter gunicorn: Metriken dieses Workers für /metrics der anderen Worker ablegen
+    if test_config is None:
+        manage_metrics.start_shared_export()
+        
     # Fehlerbehandlung
     @app.errorhandler(400)
     def bad_request(error):
@@ -122,35 +140,44 @@ def create_app(test_config=None):
             'error': 'Interner Serverfehler'
         }), 500
 
-    # Globale Middleware für Logging
+    # Globale Middleware für das Zugriffsprotokoll (aggregiert, siehe manage_api.record_request)
     @app.before_request
     def log_request_info():
-        logger.debug(f"Request: {request.method} {request.path}")
+        g.request_start = time.perf_counter()
 
     @app.after_request
     def log_response_info(response):
-        logger.debug(f"Response: {response.status}")
+        start = g.get('request_start')
+        duration_ms = (time.perf_counter() - start) * 1000 if start is not None else None
+        # Routenmuster statt Pfad, damit z.B. jedes Foto denselben Zähler verwendet
+        endpoint = request.url_rule.rule if request.url_rule is not None else '<unbekannt>'
+        manage_api.record_request(endpoint, request.method, response.status_code, duration_ms)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Request: %s %s -> %s", request.method, request.path, response.status)
         return response
+
+    # ETag, 304 Not Modified und gzip/deflate (siehe manage_http); zuletzt registriert,
+    # damit es vor dem Zugriffsprotokoll läuft und dieses den endgültigen Status erfasst
+    @app.after_request
+    def optimize_response(response):
+        return manage_http.process_response(response)
     
     return app
 
 # Anwendung starten
 if __name__ == '__main__':
-    app = create_app()
     port = int(os.environ.get('FOTOBOX_PORT', 5000))
     debug = os.environ.get('FOTOBOX_DEBUG', '0').lower() in ('true', '1', 't')
     
     try:
-        # Stelle sicher, dass alle notwendigen Verzeichnisse existieren
-        manage_folders.init_folders()
-        
-        # Stelle sicher, dass die Einstellungen initialisiert sind
-        manage_settings.load_settings()
+        # Verzeichnisstruktur und Einstellungen vorbereiten
+        manage_startup.startup('server')
+        app = create_app()
         
         # Starte die Anwendung
         logger.info(f"Starte Fotobox2 Backend auf Port {port} (Debug: {debug})")
         app.run(
-            host='0.0.0.0',
+            host=os.environ.get('FOTOBOX_HOST', '127.0.0.1'),
             port=port,
             debug=debug,
             use_reloader=debug
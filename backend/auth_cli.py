@@ -14,7 +14,7 @@ import argparse
 from typing import List, Optional
 from datetime import datetime
 
-from manage_auth import AuthManager
+from manage_auth import AuthManager, calibrate_bcrypt_cost, get_auth_manager
 from manage_api import ApiResponse
 from utils import Result
 
@@ -40,6 +40,16 @@ def parse_args(args: List[str]) -> argparse.Namespace:
     token_parser = subparsers.add_parser('check-token', help='Überprüft einen Token')
     token_parser.add_argument('token', help='Der zu überprüfende Token')
     
+    # Calibrate-Befehl
+    calibrate_parser = subparsers.add_parser('calibrate', help='Ermittelt den bcrypt-Kostenfaktor für diese Hardware')
+    calibrate_parser.add_argument('--target-ms', type=float, default=250.0,
+                                  help='Angestrebte Dauer einer Passwortprüfung in ms (Standard: 250)')
+    calibrate_parser.add_argument('--save', action='store_true',
+                                  help='Ermittelten Kostenfaktor speichern')
+    
+    # Rotate-Key-Befehl
+    subparsers.add_parser('rotate-key', help='Erzeugt einen neuen Signaturschlüssel für Tokens')
+    
     return parser.parse_args(args)
 
 def show_status(auth_manager: AuthManager) -> Result:
@@ -87,6 +97,47 @@ def check_token(auth_manager: AuthManager, token: str) -> Result:
         logger.error(f"Fehler bei Token-Überprüfung: {str(e)}")
         return Result.fail(str(e))
 
+def calibrate(auth_manager: AuthManager, target_ms: float, save: bool) -> Result:
+    """Ermittelt (und speichert optional) den bcrypt-Kostenfaktor"""
+    try:
+        result = calibrate_bcrypt_cost(target_ms)
+        
+        print("\n=== bcrypt-Kalibrierung ===")
+        for entry in result['measurements']:
+            print(f"Kosten {entry['cost']:>2}: {entry['duration_ms']:>8.1f} ms")
+        print(f"Gewählter Kostenfaktor: {result['cost']} (Ziel: {target_ms:.0f} ms, "
+              f"aktuell: {auth_manager.get_bcrypt_cost()})")
+        
+        if save:
+            auth_manager.set_bcrypt_cost(result['cost'])
+            print("✅ Kostenfaktor gespeichert (Passwort-Hash wird beim nächsten Login angepasst)")
+        print("===========================\n")
+        
+        return Result.ok(result)
+        
+    except Exception as e:
+        logger.error(f"Fehler bei der Kalibrierung: {str(e)}")
+        return Result.fail(str(e))
+
+def rotate_key(auth_manager: AuthManager) -> Result:
+    """Rotiert den Signaturschlüssel und zeigt den Schlüsselbund an"""
+    try:
+        kid = auth_manager.rotate_signing_key()
+        info = auth_manager.key_ring.info()
+        
+        print(f"✅ Neuer Signaturschlüssel aktiv: {kid}")
+        for key in info['keys']:
+            created = datetime.fromtimestamp(key['created']).isoformat(timespec='seconds')
+            state = 'aktiv' if key['kid'] == info['active'] else 'nur Prüfung'
+            print(f"  {key['kid']}  erstellt {created}  ({state})")
+        
+        return Result.ok(info)
+        
+    except Exception as e:
+        logger.error(f"Fehler bei der Schlüsselrotation: {str(e)}")
+        print(f"❌ {str(e)}")
+        return Result.fail(str(e))
+
 def main(args: Optional[List[str]] = None) -> int:
     """Hauptfunktion des CLI-Tools"""
     if args is None:
@@ -94,7 +145,7 @@ def main(args: Optional[List[str]] = None) -> int:
         
     try:
         parsed_args = parse_args(args)
-        auth_manager = AuthManager()
+        auth_manager = get_auth_manager()
         
         if parsed_args.command == 'status':
             result = show_status(auth_manager)
@@ -102,6 +153,10 @@ def main(args: Optional[List[str]] = None) -> int:
             result = set_password(auth_manager, parsed_args.password)
         elif parsed_args.command == 'check-token':
             result = check_token(auth_manager, parsed_args.token)
+        elif parsed_args.command == 'calibrate':
+            result = calibrate(auth_manager, parsed_args.target_ms, parsed_args.save)
+        elif parsed_args.command == 'rotate-key':
+            result = rotate_key(auth_manager)
         else:
             print("Bitte geben Sie einen gültigen Befehl an")
             return 1
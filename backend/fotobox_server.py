@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+fotobox_server.py - Produktions-Startpunkt für das Fotobox2-Backend
+
+Dieses Modul startet die Flask-Anwendung unter gunicorn statt mit dem
+Werkzeug-Entwicklungsserver (app.run). Es gibt zwei Profile:
+
+    api     - mehrere Worker-Prozesse mit Threads für normale API-Anfragen
+    stream  - ein Worker mit vielen Threads für langlebige Verbindungen
+              (MJPEG-Vorschau, Server-Sent Events) auf eigenem Port
+
+Im Standardprofil "all" läuft das API-Profil im Hauptprozess und das
+Stream-Profil als Kindprozess. Ein SIGHUP an den Hauptprozess lädt beide
+Profile ohne Verbindungsabbruch neu (gunicorn Graceful Reload).
+
+Die Kameras gehören in den Profilen "all" und "api" einem eigenen
+Kamera-Daemon (manage_camera_daemon.py); alle Worker greifen über
+manage_camera_client per Unix-Socket darauf zu. Der Hauptprozess überwacht
+den Daemon und startet ihn nach einem Absturz neu. Ist FOTOBOX_CAMERA_MODE
+beim Start des Profils "api" bereits "daemon", wird ein extern gestarteter
+Daemon verwendet.
+
+Unter gunicorn teilen alle Prozesse das Live-Log (/api/logs/stream) und die
+Log-Level (PUT /api/logs/level) über Dateien im Log-Verzeichnis (siehe
+manage_logging.enable_shared_logging). /metrics und /api/logs/access führen
+die Stände aller Worker zusammen, die diese in METRICS_DIRNAME im
+Datenverzeichnis ablegen (siehe manage_metrics.enable_shared_metrics).
+
+Ist gunicorn nicht installiert, wird ein eingebauter Thread-Server von
+Werkzeug verwendet (ein Prozess, beide Ports).
+
+Konfiguration über Umgebungsvariablen (oder Kommandozeile):
+    FOTOBOX_HOST, FOTOBOX_PORT, FOTOBOX_STREAM_PORT,
+    FOTOBOX_WORKERS, FOTOBOX_THREADS, FOTOBOX_STREAM_THREADS,
+    FOTOBOX_KEEPALIVE, FOTOBOX_TIMEOUT, FOTOBOX_GRACEFUL_TIMEOUT
+"""
+
+import os
+import sys
+import time
+import signal
+import logging
+import argparse
+import threading
+import subprocess
+from typing import Any, Dict, List, Optional
+
+import manage_logging  # richtet das Logging ein, bevor gunicorn startet
+import manage_metrics
+import manage_startup
+from manage_folders import get_data_dir
+
+# Logger konfigurieren
+logger = logging.getLogger(__name__)
+
+# Versuche, gunicorn zu importieren
+try:
+    from gunicorn.app.base import BaseApplication
+    GUNICORN_AVAILABLE = True
+except ImportError:
+    BaseApplication = object
+    GUNICORN_AVAILABLE = False
+
+PROFILES = ('all', 'api', 'stream')
+
+# Unterverzeichnis des Datenverzeichnisses für die Metrik-Stände der Worker
+METRICS_DIRNAME = 'metrics'
+
+# Überwachung des Kamera-Daemons: Prüfintervall und Wartezeit vor einem Neustart
+# (verdoppelt sich bei wiederholten Abstürzen bis zur Obergrenze)
+DAEMON_CHECK_INTERVAL = 1.0
+DAEMON_RESTART_MIN_DELAY = 1.0
+DAEMON_RESTART_MAX_DELAY = 60.0
+# Nach so vielen Sekunden stabilem Lauf beginnt die Wartezeit wieder beim Minimum
+DAEMON_STABLE_SECONDS = 300.0
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        logger.warning(f"Ungültiger Wert für {name}, verwende {default}")
+        return default
+
+def default_options() -> Dict[str, Any]:
+    """Standardwerte aus den Umgebungsvariablen"""
+    # Auf dem Raspberry Pi lieber wenige Prozesse mit Threads als viele Prozesse
+    cpu_count = os.cpu_count() or 1
+    return {
+        # Nur lokal erreichbar, nginx leitet die Anfragen weiter
+        'host': os.environ.get('FOTOBOX_HOST', '127.0.0.1'),
+        'port': _env_int('FOTOBOX_PORT', 5000),
+        'stream_port': _env_int('FOTOBOX_STREAM_PORT', 5001),
+        'workers': _env_int('FOTOBOX_WORKERS', min(cpu_count, 4)),
+        'threads': _env_int('FOTOBOX_THREADS', 4),
+        'stream_threads': _env_int('FOTOBOX_STREAM_THREADS', 32),
+        'keepalive': _env_int('FOTOBOX_KEEPALIVE', 5),
+        'timeout': _env_int('FOTOBOX_TIMEOUT', 60),
+        'graceful_timeout': _env_int('FOTOBOX_GRACEFUL_TIMEOUT', 30),
+    }
+
+def gunicorn_config(profile: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Erzeugt die gunicorn-Einstellungen für ein Profil
+
+    Beide Profile verwenden den gthread-Worker: der Heartbeat des Workers läuft
+    unabhängig von den Request-Threads, daher beendet timeout keine offenen Streams.
+    """
+    if profile == 'stream':
+        return {
+            'bind': f"{options['host']}:{options['stream_port']}",
+            'workers': 1,
+            'threads': options['stream_threads'],
+            'worker_class': 'gthread',
+            # Streams laufen endlos, beim Reload nicht lange auf sie warten
+            'keepalive': 75,
+            'timeout': options['timeout'],
+            'graceful_timeout': 5,
+            'proc_name': 'fotobox-stream',
+        }
+    return {
+        'bind': f"{options['host']}:{options['port']}",
+        'workers': options['workers'],
+        'threads': options['threads'],
+        'worker_class': 'gthread',
+        'keepalive': options['keepalive'],
+        'timeout': options['timeout'],
+        'graceful_timeout': options['graceful_timeout'],
+        'proc_name': 'fotobox-api',
+    }
+
+class FotoboxApplication(BaseApplication):
+    """gunicorn-Anwendung, die die Flask-App in jedem Worker erzeugt"""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.config.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key.lower(), value)
+
+    def load(self):
+        # Erst im Worker importieren: jeder Prozess bekommt eigene Verbindungen und Threads
+        from app import create_app
+        return create_app()
+
+def _stream_child_command(options: Dict[str, Any]) -> List[str]:
+    return [sys.executable, os.path.abspath(__file__), '--profile', 'stream',
+            '--host', options['host'], '--stream-port', str(options['stream_port']),
+            '--stream-threads', str(options['stream_threads'])]
+
+def _start_camera_daemon() -> subprocess.Popen:
+    """Startet den Kamera-Daemon und wartet, bis er Anfragen annimmt"""
+    # Vor dem Import des Clients setzen: die Worker erben die Betriebsart
+    os.environ['FOTOBOX_CAMERA_MODE'] = 'daemon'
+    import manage_camera_client
+
+    daemon_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'manage_camera_daemon.py')
+    process = subprocess.Popen([sys.executable, daemon_path])
+    if manage_camera_client.wait_for_daemon(timeout=30.0):
+        logger.info(f"Kamera-Daemon gestartet (PID {process.pid})")
+    else:
+        logger.error("Kamera-Daemon antwortet nicht, Kamerafunktionen sind nicht verfügbar")
+    return process
+
+def _stop_process(process: subprocess.Popen) -> None:
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+class CameraDaemonSupervisor:
+    """Startet den Kamera-Daemon und startet ihn nach einem Absturz neu"""
+
+    def __init__(self):
+        self.process: Optional[subprocess.Popen] = None
+        self.restarts = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.process = _start_camera_daemon()
+        self._thread = threading.Thread(target=self._watch, name='fotobox-camera-supervisor', daemon=True)
+        self._thread.start()
+
+    def _watch(self) -> None:
+        delay = DAEMON_RESTART_MIN_DELAY
+        started = time.monotonic()
+        while not self._stop.wait(DAEMON_CHECK_INTERVAL):
+            returncode = self.process.poll()
+            if returncode is None:
+                continue
+            if time.monotonic() - started >= DAEMON_STABLE_SECONDS:
+                delay = DAEMON_RESTART_MIN_DELAY
+            logger.error(f"Kamera-Daemon unerwartet beendet (Code {returncode}), Neustart in {delay:.0f} s")
+            if self._stop.wait(delay):
+                return
+            delay = min(delay * 2, DAEMON_RESTART_MAX_DELAY)
+            self.process = _start_camera_daemon()
+            self.restarts += 1
+            started = time.monotonic()
+            if self._stop.is_set():
+                # stop() kam während des Neustarts
+                _stop_process(self.process)
+                return
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=DAEMON_RESTART_MAX_DELAY)
+        if self.process is not None:
+            _stop_process(self.process)
+
+def _run_gunicorn(profile: str, options: Dict[str, Any]) -> int:
+    """Startet gunicorn im Vordergrund (kehrt erst beim Beenden zurück)"""
+    config = gunicorn_config('stream' if profile == 'stream' else 'api', options)
+    child: Optional[subprocess.Popen] = None
+    # Vor dem Start der Worker und Kindprozesse, damit alle das Live-Log, die Log-Level
+    # und die Metriken teilen (ein eigenständiges Stream-Profil lässt die Stände der API stehen)
+    manage_logging.enable_shared_logging()
+    manage_metrics.enable_shared_metrics(os.path.join(get_data_dir(), METRICS_DIRNAME),
+                                         clear=profile != 'stream')
+
+    camera_daemon: Optional[CameraDaemonSupervisor] = None
+    # Mehrere Worker dürfen die Kameras nicht jeweils selbst öffnen
+    if profile == 'all' or (profile == 'api' and os.environ.get('FOTOBOX_CAMERA_MODE') != 'daemon'):
+        camera_daemon = CameraDaemonSupervisor()
+        camera_daemon.start()
+
+    if profile == 'all':
+        child = subprocess.Popen(_stream_child_command(options))
+        logger.info(f"Stream-Server gestartet (PID {child.pid}, Port {options['stream_port']})")
+
+        def on_reload(arbiter):
+            # Der Kamera-Daemon bleibt bestehen, nur die HTTP-Worker werden ersetzt
+            if child.poll() is None:
+                child.send_signal(signal.SIGHUP)
+
+        config['on_reload'] = on_reload
+
+    if camera_daemon is not None:
+        def on_exit(arbiter):
+            if child is not None:
+                _stop_process(child)
+            camera_daemon.stop()
+
+        config['on_exit'] = on_exit
+
+    logger.info(f"Starte gunicorn ({config['proc_name']}) auf {config['bind']} mit "
+                f"{config['workers']} Worker(n) x {config['threads']} Threads")
+    FotoboxApplication(config).run()
+    return 0
+
+def _run_builtin(profile: str, options: Dict[str, Any]) -> int:
+    """Eingebauter Thread-Server (ein Prozess) als Ersatz für gunicorn"""
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    logger.warning("gunicorn nicht installiert, verwende eingebauten Thread-Server (nur ein Prozess)")
+    app = create_app()
+    ports = []
+    if profile in ('all', 'api'):
+        ports.append(options['port'])
+    if profile in ('all', 'stream'):
+        ports.append(options['stream_port'])
+    servers = [make_server(options['host'], port, app, threaded=True) for port in ports]
+
+    def shutdown(signum, frame):
+        logger.info("Beende Server")
+        for server in servers:
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    threads = [threading.Thread(target=server.serve_forever, name=f"fotobox-http-{port}")
+               for server, port in zip(servers, ports)]
+    for thread, port in zip(threads, ports):
+        logger.info(f"Server lauscht auf {options['host']}:{port}")
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return 0
+
+def parse_args(args: List[str]) -> argparse.Namespace:
+    """Parse command line arguments"""
+    defaults = default_options()
+    parser = argparse.ArgumentParser(description="Fotobox2 Backend-Server (Produktion)")
+    parser.add_argument('--profile', choices=PROFILES, default='all',
+                        help='Welche Server gestartet werden (Standard: all)')
+    parser.add_argument('--host', default=defaults['host'])
+    parser.add_argument('--port', type=int, default=defaults['port'])
+    parser.add_argument('--stream-port', type=int, default=defaults['stream_port'])
+    parser.add_argument('--workers', type=int, default=defaults['workers'])
+    parser.add_argument('--threads', type=int, default=defaults['threads'])
+    parser.add_argument('--stream-threads', type=int, default=defaults['stream_threads'])
+    parser.add_argument('--keepalive', type=int, default=defaults['keepalive'])
+    parser.add_argument('--timeout', type=int, default=defaults['timeout'])
+    parser.add_argument('--graceful-timeout', type=int, default=defaults['graceful_timeout'])
+    parser.add_argument('--builtin', action='store_true',
+                        help='Eingebauten Thread-Server statt gunicorn verwenden')
+    return parser.parse_args(args)
+
+def main(args: Optional[List[str]] = None) -> int:
+    """Hauptfunktion des Servers"""
+    if args is None:
+        args = sys.argv[1:]
+    parsed_args = parse_args(args)
+    options = vars(parsed_args)
+    profile = options.pop('profile')
+    builtin = options.pop('builtin')
+
+    try:
+        # Verzeichnisse und Einstellungen einmalig im Hauptprozess vorbereiten
+        if profile != 'stream':
+            manage_startup.startup('server')
+
+        if builtin or not GUNICORN_AVAILABLE:
+            return _run_builtin(profile, options)
+        return _run_gunicorn(profile, options)
+
+    except Exception as e:
+        logger.error(f"Fehler beim Starten des Servers: {e}")
+        return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
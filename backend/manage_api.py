@@ -7,16 +7,23 @@ einheitliche Formatierung von API-Antworten, die Fehlerbehandlung und
 die Validierung der API-Anfragen.
 """
 
+import atexit
 import json
 import logging
 import os
-from typing import Any, Dict, Optional, Union
-from datetime import datetime
-from flask import jsonify, Response
+import random
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from flask import Response
 
 # Initialisiere Basis-Logging für API-Modul
 logger = logging.getLogger(__name__)
 
+import manage_http
+import manage_json
+import manage_metrics
+
 # Versuche manage_logging zu importieren, mit Fallback auf Standard-Logging
 try:
     import manage_logging
@@ -33,28 +40,67 @@ HTTP_FORBIDDEN = 403
 HTTP_NOT_FOUND = 404
 HTTP_SERVER_ERROR = 500
 
-def log_api_call(endpoint: str, method: str, status_code: int, 
-                error: Optional[str] = None) -> None:
-    """
-    Protokolliert einen API-Aufruf
-    
-    Args:
-        endpoint: Der aufgerufene API-Endpunkt
-        method: Die HTTP-Methode
-        status_code: Der HTTP-Statuscode
-        error: Optional - Eine Fehlermeldung
-    """
-    message = f"API-Aufruf: {method} {endpoint} -> {status_code}"
-    context = {
-        'endpoint': endpoint,
-        'method': method,
-        'status_code': status_code,
-        'timestamp': datetime.now().isoformat()
-    }
-    
-    if error:
-        context['error'] = error
-    
+# Zugriffsprotokoll: Jede Anfrage wird nur in Zählern und Latenz-Histogrammen je
+# Endpunkt erfasst. Vollständige Logeinträge entstehen nur für Fehler und einen
+# kleinen Anteil zufällig ausgewählter Anfragen; eine Zusammenfassung wird
+# periodisch geschrieben.
+ACCESS_LOG_SAMPLE_RATE = float(os.environ.get('FOTOBOX_ACCESS_LOG_SAMPLE_RATE', 0.01))
+ACCESS_LOG_FLUSH_INTERVAL = float(os.environ.get('FOTOBOX_ACCESS_LOG_FLUSH_INTERVAL', 300))  # Sekunden
+
+# Obere Grenzen der Latenz-Buckets in Millisekunden (letzter Bucket: alles darüber)
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+class EndpointStats:
+    """Zähler und Latenz-Histogramm eines Endpunkts"""
+
+    __slots__ = ('count', 'errors', 'status', 'total_ms', 'max_ms', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.status: Dict[int, int] = {}
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, status_code: int, duration_ms: Optional[float]) -> None:
+        self.count += 1
+        if status_code >= 500:
+            self.errors += 1
+        self.status[status_code] = self.status.get(status_code, 0) + 1
+        if duration_ms is not None:
+            self.total_ms += duration_ms
+            if duration_ms > self.max_ms:
+                self.max_ms = duration_ms
+            index = 0
+            while index < len(LATENCY_BUCKETS_MS) and duration_ms > LATENCY_BUCKETS_MS[index]:
+                index += 1
+            self.buckets[index] += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'status': {str(code): count for code, count in sorted(self.status.items())},
+            'total_ms': round(self.total_ms, 2),
+            'avg_ms': round(self.total_ms / self.count, 2) if self.count else 0.0,
+            'max_ms': round(self.max_ms, 2),
+            'buckets': dict(zip([str(b) for b in LATENCY_BUCKETS_MS] + ['+Inf'], self.buckets))
+        }
+
+# Metriken je Endpunkt (Routenmuster) für /metrics
+HTTP_REQUESTS = manage_metrics.counter(
+    'fotobox_http_requests_total', 'Anzahl der API-Anfragen', ('method', 'endpoint', 'status'))
+HTTP_REQUEST_DURATION = manage_metrics.histogram(
+    'fotobox_http_request_duration_seconds', 'Bearbeitungsdauer der API-Anfragen', ('method', 'endpoint'))
+
+_access_lock = threading.Lock()
+_access_stats: Dict[Tuple[str, str], EndpointStats] = {}  # Seit Prozessstart
+_access_window: Dict[Tuple[str, str], EndpointStats] = {}  # Seit der letzten Zusammenfassung
+_access_window_start = time.monotonic()
+
+def _write_access_record(message: str, context: Dict[str, Any], status_code: int) -> None:
+    """Schreibt einen vollständigen Zugriffseintrag"""
     if CUSTOM_LOGGING:
         if status_code >= 500:
             manage_logging.error(message, context=context, source='api')
@@ -70,8 +116,170 @@ def log_api_call(endpoint: str, method: str, status_code: int,
         else:
             logger.info(message, extra=context)
 
+def _flush_access_window(window: Dict[Tuple[str, str], EndpointStats], seconds: float) -> None:
+    """Schreibt die Zusammenfassung eines Zeitfensters als einen Logeintrag"""
+    if not window:
+        return
+    total = sum(stats.count for stats in window.values())
+    context = {
+        'interval_seconds': round(seconds, 1),
+        'endpoints': {f"{method} {endpoint}": stats.to_dict()
+                      for (method, endpoint), stats in sorted(window.items())}
+    }
+    message = f"API-Zugriffe: {total} Anfragen in {round(seconds)} s"
+    if CUSTOM_LOGGING:
+        manage_logging.log(message, context=context, source='api_access')
+    else:
+        logger.info(message, extra=context)
+
+def record_request(endpoint: str, method: str, status_code: int,
+                   duration_ms: Optional[float] = None, error: Optional[str] = None) -> None:
+    """
+    Erfasst eine API-Anfrage im Zugriffsprotokoll
+    
+    Args:
+        endpoint: Endpunkt (Routenmuster, z.B. /api/files/<filename>)
+        method: Die HTTP-Methode
+        status_code: Der HTTP-Statuscode
+        duration_ms: Optional - Bearbeitungsdauer in Millisekunden
+        error: Optional - Eine Fehlermeldung
+    """
+    global _access_window, _access_window_start
+
+    HTTP_REQUESTS.inc(method=method, endpoint=endpoint, status=status_code)
+    if duration_ms is not None:
+        HTTP_REQUEST_DURATION.observe(duration_ms / 1000, method=method, endpoint=endpoint)
+    
+    key = (method, endpoint)
+    flush = None
+    with _access_lock:
+        for stats_map in (_access_stats, _access_window):
+            stats = stats_map.get(key)
+            if stats is None:
+                stats = stats_map[key] = EndpointStats()
+            stats.add(status_code, duration_ms)
+        
+        now = time.monotonic()
+        if now - _access_window_start >= ACCESS_LOG_FLUSH_INTERVAL:
+            flush = (_access_window, now - _access_window_start)
+            _access_window = {}
+            _access_window_start = now
+    
+    if flush is not None:
+        _flush_access_window(*flush)
+    
+    # Vollständiger Eintrag nur für Fehler und Stichproben
+    if status_code >= 400 or error or random.random() < ACCESS_LOG_SAMPLE_RATE:
+        context = {
+            'endpoint': endpoint,
+            'method': method,
+            'status_code': status_code
+        }
+        if duration_ms is not None:
+            context['duration_ms'] = round(duration_ms, 2)
+        if error:
+            context['error'] = error
+        if status_code < 400 and not error:
+            context['sampled'] = True
+        _write_access_record(f"API-Aufruf: {method} {endpoint} -> {status_code}", context, status_code)
+
+def _get_process_access_stats() -> Dict[str, Any]:
+    """Zugriffsstatistik dieses Prozesses seit Prozessstart"""
+    with _access_lock:
+        return {f"{method} {endpoint}": stats.to_dict()
+                for (method, endpoint), stats in sorted(_access_stats.items())}
+    
+manage_metrics.register_section('access', _get_process_access_stats)
+    
+def _merge_access_stats(parts: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    merged: Dict[str, Dict[str, Any]] = {}
+    for part in parts:
+        for key, stats in part.items():
+            target = merged.get(key)
+            if target is None:
+                merged[key] = json.loads(json.dumps(stats))
+                continue
+            target['count'] += stats['count']
+            target['errors'] += stats['errors']
+            target['total_ms'] = round(target['total_ms'] + stats['total_ms'], 2)
+            target['max_ms'] = max(target['max_ms'], stats['max_ms'])
+            for code, count in stats['status'].items():
+                target['status'][code] = target['status'].get(code, 0) + count
+            for bound, count in stats['buckets'].items():
+                target['buckets'][bound] = target['buckets'].get(bound, 0) + count
+    for stats in merged.values():
+        stats['avg_ms'] = round(stats['total_ms'] / stats['count'], 2) if stats['count'] else 0.0
+    return dict(sorted(merged.items()))
+    
+def get_access_stats() -> Dict[str, Any]:
+    """
+    Gibt die Zugriffsstatistik seit Serverstart zurück
+    
+    Unter gunicorn über alle Worker (auch bereits beendete) zusammengefasst,
+    siehe manage_metrics.get_sections.
+    
+    Returns:
+        Dict "METHODE Endpunkt" -> Zähler und Latenz-Histogramm
+    """
+    return _merge_access_stats(manage_metrics.get_sections('access'))
+
+def flush_access_log() -> None:
+    """Schreibt die Zusammenfassung des aktuellen Zeitfensters sofort"""
+    global _access_window, _access_window_start
+
+    with _access_lock:
+        window, seconds = _access_window, time.monotonic() - _access_window_start
+        _access_window = {}
+        _access_window_start = time.monotonic()
+    _flush_access_window(window, seconds)
+
+atexit.register(flush_access_log)
+
+def log_api_call(endpoint: str, method: str, status_code: int, 
+                error: Optional[str] = None) -> None:
+    """
+    Protokolliert einen API-Aufruf (über das aggregierte Zugriffsprotokoll)
+    
+    Args:
+        endpoint: Der aufgerufene API-Endpunkt
+        method: Die HTTP-Methode
+        status_code: Der HTTP-Statuscode
+        error: Optional - Eine Fehlermeldung
+    """
+    record_request(endpoint, method, status_code, error=error)
+
+def _envelope(success: bool, body: Iterable[bytes]) -> Iterator[bytes]:
+    """Umschließt bereits serialisierte Felder mit success und timestamp"""
+    yield (b'{"success":' + (b'true' if success else b'false') +
+           b',"timestamp":' + manage_json.current_timestamp_json())
+    yield from body
+    yield b'}'
+
+def _json_response(success: bool, body: Iterable[bytes], status_code: int,
+                   etag: Optional[str] = None) -> tuple:
+    """Erzeugt die Flask-Antwort; body als Liste wird sofort, sonst gestreamt gesendet
+    
+    Vollständig vorliegende Erfolgsantworten erhalten einen schwachen ETag über
+    die Felder ohne Zeitstempel, damit unveränderte Daten mit 304 beantwortet
+    werden können (siehe manage_http).
+    """
+    if isinstance(body, list):
+        if success and etag is None:
+            etag = manage_http.weak_etag(*body)
+        response = Response(b''.join(_envelope(success, body)), mimetype='application/json')
+    else:
+        response = Response(_envelope(success, body), mimetype='application/json')
+    if etag is not None:
+        response.set_etag(etag, weak=True)
+    return response, status_code
+
 class ApiResponse:
-    """Klasse zur konsistenten Formatierung von API-Antworten"""
+    """Klasse zur konsistenten Formatierung von API-Antworten
+    
+    Die Antworttexte werden über manage_json erzeugt (orjson, falls installiert).
+    Neben success/error gibt es stream für große Listen und cached für
+    unveränderliche Ressourcen.
+    """
     
     @staticmethod
     def success(data: Any = None, message: Optional[str] = None, 
@@ -87,18 +295,12 @@ class ApiResponse:
         Returns:
             Ein Flask-Response-Objekt mit den formatierten Daten
         """
-        response = {
-            'success': True,
-            'timestamp': datetime.now().isoformat()
-        }
-        
+        body = []
         if data is not None:
-            response['data'] = data
-            
+            body.append(b',"data":' + manage_json.dumps(data))
         if message is not None:
-            response['message'] = message
-        
-        return jsonify(response), status_code
+            body.append(b',"message":' + manage_json.dumps(message))
+        return _json_response(True, body, status_code)
     
     @staticmethod
     def error(message: str, error_code: int = HTTP_SERVER_ERROR,
@@ -114,16 +316,65 @@ class ApiResponse:
         Returns:
             Ein Flask-Response-Objekt mit der Fehlermeldung
         """
-        response = {
-            'success': False,
-            'error': message,
-            'timestamp': datetime.now().isoformat()
-        }
-        
+        body = [b',"error":' + manage_json.dumps(message)]
         if details is not None:
-            response['details'] = details
-            
-        return jsonify(response), error_code
+            body.append(b',"details":' + manage_json.dumps(details))
+        return _json_response(False, body, error_code)
+    
+    @staticmethod
+    def stream(items: Iterable[Any], key: str = 'items', meta: Optional[Dict[str, Any]] = None,
+               message: Optional[str] = None, status_code: int = HTTP_OK,
+               validator: Optional[str] = None) -> tuple:
+        """
+        Erzeugt eine erfolgreiche API-Antwort mit einer großen Liste, die
+        abschnittsweise serialisiert und gesendet wird
+        
+        Die Antwort entspricht success(data={**meta, key: list(items)}), ohne
+        den gesamten Text im Speicher aufzubauen. Greift items beim Iterieren
+        auf den Request-Kontext zu, muss es mit stream_with_context umschlossen werden.
+        
+        Args:
+            items: Die Listeneinträge (Liste oder Generator)
+            key: Name der Liste in data
+            meta: Weitere Felder von data (z.B. total, offset)
+            message: Eine optionale Erfolgsmeldung
+            status_code: Der HTTP-Statuscode (default: 200)
+            validator: Optional - Kennung des Listenstands (z.B. Anfrage, Anzahl und
+                neuester Eintrag), aus der der ETag gebildet wird. Ohne Angabe gibt es
+                keinen ETag, da die Liste dafür vorab serialisiert werden müsste.
+        """
+        def body() -> Iterator[bytes]:
+            head = manage_json.dumps(meta) if meta else b'{}'
+            yield b',"data":' + head[:-1] + (b',' if meta else b'') + manage_json.dumps(key) + b':'
+            yield from manage_json.iter_json_array(items)
+            yield b'}'
+            if message is not None:
+                yield b',"message":' + manage_json.dumps(message)
+        etag = None
+        if validator is not None:
+            etag = manage_http.weak_etag(key.encode('utf-8'), b'\0', validator.encode('utf-8'))
+        return _json_response(True, body(), status_code, etag=etag)
+    
+    @staticmethod
+    def cached(key: Any, version: Any, build, message: Optional[str] = None,
+               status_code: int = HTTP_OK) -> tuple:
+        """
+        Erzeugt eine erfolgreiche API-Antwort für eine unveränderliche Ressource
+        
+        build() wird nur aufgerufen und serialisiert, wenn für (key, version)
+        noch kein Text zwischengespeichert ist.
+        
+        Args:
+            key: Schlüssel der Ressource (z.B. ('camera_config', config_id))
+            version: Version der Ressource (z.B. Änderungszähler oder mtime)
+            build: Funktion, die die Daten liefert
+            message: Eine optionale Erfolgsmeldung
+            status_code: Der HTTP-Statuscode (default: 200)
+        """
+        body = [b',"data":' + manage_json.cached_dumps(key, version, build)]
+        if message is not None:
+            body.append(b',"message":' + manage_json.dumps(message))
+        return _json_response(True, body, status_code)
 
 def handle_api_exception(e: Exception, endpoint: Optional[str] = None,
                         context: Optional[Dict] = None) -> tuple:
@@ -163,6 +414,12 @@ def handle_api_exception(e: Exception, endpoint: Optional[str] = None,
     
     return ApiResponse.error(str(e))
 
+def token_required(f):
+    """Decorator für geschützte API-Endpunkte (siehe manage_auth.login_required)"""
+    # Später Import, da manage_auth beim Laden von manage_api noch nicht benötigt wird
+    import manage_auth
+    return manage_auth.login_required(f)
+
 def validate_request_data(data, required_fields=None, field_types=None):
     """Validiert die Daten einer API-Anfrage
     
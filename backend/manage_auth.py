@@ -7,11 +7,20 @@ Autorisierung in der Fotobox2-Anwendung bereit.
 """
 
 import os
+import json
+import time
+import fcntl
+import secrets
+import hashlib
 import logging
+import threading
+import sqlite3
 import bcrypt
 import jwt
 import datetime
-from typing import Optional, Dict, Any, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Optional, Dict, Any, List, Tuple
 from functools import wraps
 from flask import session, request, jsonify
 
@@ -19,8 +28,8 @@ from flask import session, request, jsonify
 logger = logging.getLogger(__name__)
 
 # Importiere FolderManager und DatabaseManager
-from manage_folders import FolderManager, get_data_dir
-from manage_database import DatabaseManager, get_setting, set_setting
+from manage_folders import get_folder_manager, get_data_dir
+from manage_database import get_db_manager, get_connection, get_setting, set_setting, DatabaseError
 
 class AuthError(Exception):
     """Basisklasse für Authentifizierungs-bezogene Fehler"""
@@ -30,19 +39,613 @@ class TokenError(AuthError):
     """Fehler bei der Token-Verarbeitung"""
     pass
 
+class AuthBusyError(AuthError):
+    """Zu viele gleichzeitige Passwortprüfungen"""
+    pass
+
+# Maximale Anzahl zwischengespeicherter, bereits verifizierter Tokens
+TOKEN_CACHE_SIZE = int(os.environ.get('FOTOBOX_TOKEN_CACHE_SIZE', 256))
+
+def _token_key(token: str) -> str:
+    """Schlüssel für Cache und Sperrliste (das Token selbst wird nicht gespeichert)"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+class TokenCache:
+    """LRU-Cache für verifizierte Tokens
+
+    Speichert zu jedem Token die bereits geprüfte Payload, damit nicht jede
+    geschützte Anfrage (z.B. jedes Thumbnail einer Galerieseite) die Signatur
+    erneut prüfen muss. Einträge verfallen mit dem Ablauf (exp) des Tokens.
+    """
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: 'OrderedDict[str, Tuple[float, Dict[str, Any]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Gibt die Payload zurück, falls das Token bekannt und nicht abgelaufen ist"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, payload = entry
+            if expires <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key: str, payload: Dict[str, Any]) -> None:
+        """Nimmt ein verifiziertes Token auf (nur mit Ablaufzeit)"""
+        expires = payload.get('exp')
+        if not isinstance(expires, (int, float)):
+            return
+        with self._lock:
+            self._entries[key] = (float(expires), payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+# Passwortprüfung (bcrypt) in eigenen Worker-Threads, damit Login-Versuche
+# nicht die Request-Threads und die Kameravorschau ausbremsen. Beide Grenzen
+# gelten über Sperrdateien im Datenverzeichnis für alle Prozesse zusammen.
+PASSWORD_WORKERS = int(os.environ.get('FOTOBOX_PASSWORD_WORKERS', 1))
+# Maximale Anzahl gleichzeitig laufender oder wartender Prüfungen
+PASSWORD_MAX_PENDING = int(os.environ.get('FOTOBOX_PASSWORD_MAX_PENDING', 4))
+PASSWORD_VERIFY_TIMEOUT = 10.0
+
+# bcrypt-Kostenfaktor (wird per calibrate_bcrypt_cost an die Hardware angepasst)
+BCRYPT_COST_KEY = 'auth.bcrypt_cost'
+BCRYPT_DEFAULT_COST = 12
+BCRYPT_MIN_COST = 10
+BCRYPT_MAX_COST = 15
+
+# Login-Ratenbegrenzung je Client: Anzahl Versuche am Stück und Nachfüllrate
+LOGIN_BURST = int(os.environ.get('FOTOBOX_LOGIN_BURST', 5))
+LOGIN_REFILL_SECONDS = float(os.environ.get('FOTOBOX_LOGIN_REFILL_SECONDS', 12))
+LOGIN_MAX_CLIENTS = 1024
+# Zusätzliche Begrenzung über alle Clients, falls Client-Adressen wechseln oder gefälscht sind
+LOGIN_GLOBAL_BURST = int(os.environ.get('FOTOBOX_LOGIN_GLOBAL_BURST', 20))
+LOGIN_GLOBAL_REFILL_SECONDS = float(os.environ.get('FOTOBOX_LOGIN_GLOBAL_REFILL_SECONDS', 3))
+# Schlüssel des globalen Buckets (keine gültige Client-Adresse)
+LOGIN_GLOBAL_KEY = '*'
+
+# Mindestabstand in Sekunden zwischen zwei Prüfungen der Sperrliste auf Änderungen anderer Prozesse
+REVOCATION_CHECK_INTERVAL = 1.0
+
+# Präfix der Sperrdateien für die prozessübergreifenden bcrypt-Plätze
+PASSWORD_LOCK_PREFIX = '.bcrypt'
+
+def _lower_thread_priority() -> None:
+    """Senkt die Priorität des aktuellen Worker-Threads (nur Linux)"""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+    except (AttributeError, OSError):
+        pass
+
+class TokenBucket:
+    """Token-Bucket für die Ratenbegrenzung eines Clients"""
+
+    __slots__ = ('capacity', 'refill_seconds', 'tokens', 'updated')
+
+    def __init__(self, capacity: int, refill_seconds: float):
+        self.capacity = capacity
+        self.refill_seconds = refill_seconds
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.refill_seconds)
+        self.updated = now
+
+    def consume(self) -> Tuple[bool, float]:
+        """Verbraucht einen Versuch
+
+        Returns:
+            (erlaubt, Sekunden bis zum nächsten erlaubten Versuch)
+        """
+        now = time.monotonic()
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True, 0.0
+        return False, (1 - self.tokens) * self.refill_seconds
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+class LoginRateLimiter:
+    """Begrenzt Login-Versuche je Client-Adresse und über alle Clients"""
+
+    def __init__(self, burst: int = LOGIN_BURST, refill_seconds: float = LOGIN_REFILL_SECONDS,
+                 max_clients: int = LOGIN_MAX_CLIENTS, global_burst: int = LOGIN_GLOBAL_BURST,
+                 global_refill_seconds: float = LOGIN_GLOBAL_REFILL_SECONDS):
+        self.burst = burst
+        self.refill_seconds = refill_seconds
+        self.max_clients = max_clients
+        self.global_burst = global_burst
+        self.global_refill_seconds = global_refill_seconds
+        self._buckets: 'OrderedDict[str, TokenBucket]' = OrderedDict()
+        self._global = TokenBucket(global_burst, global_refill_seconds)
+        self._lock = threading.Lock()
+
+    def check(self, client: str) -> Tuple[bool, float]:
+        """Prüft und verbucht einen Login-Versuch des Clients"""
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                self._prune()
+                bucket = self._buckets[client] = TokenBucket(self.burst, self.refill_seconds)
+            self._buckets.move_to_end(client)
+            allowed, retry_after = bucket.consume()
+            if not allowed:
+                return allowed, retry_after
+            return self._global.consume()
+
+    def _prune(self) -> None:
+        """Entfernt volle (also inaktive) Buckets und begrenzt die Anzahl der Clients"""
+        if len(self._buckets) < self.max_clients:
+            return
+        now = time.monotonic()
+        for client in [c for c, b in self._buckets.items() if b.is_full(now)]:
+            del self._buckets[client]
+        while len(self._buckets) >= self.max_clients:
+            self._buckets.popitem(last=False)
+
+    def reset(self, client: Optional[str] = None) -> None:
+        with self._lock:
+            if client is None:
+                self._buckets.clear()
+                self._global = TokenBucket(self.global_burst, self.global_refill_seconds)
+            else:
+                self._buckets.pop(client, None)
+
+class SharedLoginRateLimiter(LoginRateLimiter):
+    """Login-Ratenbegrenzung mit Buckets in der Tabelle login_buckets
+
+    Alle API-Worker und der Stream-Prozess teilen sich so die Versuche eines
+    Clients. Der globale Bucket steht unter LOGIN_GLOBAL_KEY in derselben
+    Tabelle. Ist die Datenbank nicht erreichbar, wird auf die Buckets dieses
+    Prozesses zurückgegriffen.
+    """
+
+    def check(self, client: str) -> Tuple[bool, float]:
+        """Prüft und verbucht einen Login-Versuch des Clients"""
+        try:
+            return self._check_shared(client)
+        except (sqlite3.Error, DatabaseError) as e:
+            logger.warning(f"Gemeinsame Login-Begrenzung nicht verfügbar, nur prozesslokal: {e}")
+            return super().check(client)
+
+    def _check_shared(self, client: str) -> Tuple[bool, float]:
+        # Wanduhr statt time.monotonic, da die Zeitstempel prozessübergreifend gelten
+        now = time.time()
+        conn = get_connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            allowed, retry_after = self._consume_shared(conn, client, self.burst, self.refill_seconds, now)
+            if allowed:
+                allowed, retry_after = self._consume_shared(
+                    conn, LOGIN_GLOBAL_KEY, self.global_burst, self.global_refill_seconds, now
+                )
+            conn.commit()
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return allowed, retry_after
+
+    def _consume_shared(self, conn: sqlite3.Connection, key: str, burst: int,
+                        refill_seconds: float, now: float) -> Tuple[bool, float]:
+        row = conn.execute(
+            "SELECT tokens, updated FROM login_buckets WHERE client = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self._prune_shared(conn, now)
+            tokens = float(burst)
+        else:
+            tokens = min(burst, row[0] + max(0.0, now - row[1]) / refill_seconds)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        conn.execute(
+            "INSERT OR REPLACE INTO login_buckets (client, tokens, updated) VALUES (?, ?, ?)",
+            (key, tokens, now)
+        )
+        if allowed:
+            return True, 0.0
+        return False, (1 - tokens) * refill_seconds
+
+    def _prune_shared(self, conn: sqlite3.Connection, now: float) -> None:
+        """Entfernt volle (also inaktive) Buckets und begrenzt die Anzahl der Clients
+
+        Der globale Bucket bleibt stehen, sonst würde er beim Aufräumen aufgefüllt.
+        """
+        count = conn.execute(
+            "SELECT COUNT(*) FROM login_buckets WHERE client != ?", (LOGIN_GLOBAL_KEY,)
+        ).fetchone()[0]
+        if count < self.max_clients:
+            return
+        conn.execute(
+            "DELETE FROM login_buckets WHERE client != ? AND tokens + (? - updated) / ? >= ?",
+            (LOGIN_GLOBAL_KEY, now, self.refill_seconds, self.burst)
+        )
+        conn.execute(
+            "DELETE FROM login_buckets WHERE client IN "
+            "(SELECT client FROM login_buckets WHERE client != ? ORDER BY updated DESC LIMIT -1 OFFSET ?)",
+            (LOGIN_GLOBAL_KEY, self.max_clients - 1)
+        )
+
+    def reset(self, client: Optional[str] = None) -> None:
+        super().reset(client)
+        try:
+            conn = get_connection()
+            try:
+                with conn:
+                    if client is None:
+                        conn.execute("DELETE FROM login_buckets")
+                    else:
+                        conn.execute("DELETE FROM login_buckets WHERE client = ?", (client,))
+            finally:
+                conn.close()
+        except (sqlite3.Error, DatabaseError) as e:
+            logger.warning(f"Login-Begrenzung konnte nicht zurückgesetzt werden: {e}")
+
+class _SlotLocks:
+    """Begrenzte Anzahl von Plätzen über flock-Sperrdateien (prozessübergreifend)
+
+    Jeder Platz ist eine eigene Datei; belegt ist ein Platz, solange ein
+    Prozess bzw. Thread die Datei exklusiv gesperrt hält.
+    """
+
+    def __init__(self, prefix: str, count: int):
+        self.paths = [f"{prefix}.{index}.lock" for index in range(max(1, count))]
+
+    def _lock(self, path: str, flags: int) -> Optional[int]:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, flags)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        except BaseException:
+            os.close(fd)
+            raise
+        return fd
+
+    def try_acquire(self) -> Optional[int]:
+        """Belegt einen freien Platz, ohne zu warten (None, wenn alle belegt sind)"""
+        for path in self.paths:
+            fd = self._lock(path, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            if fd is not None:
+                return fd
+        return None
+
+    def acquire(self) -> int:
+        """Belegt einen Platz und wartet notfalls, bis einer frei wird"""
+        fd = self.try_acquire()
+        if fd is None:
+            fd = self._lock(self.paths[threading.get_ident() % len(self.paths)], fcntl.LOCK_EX)
+        return fd
+
+    @staticmethod
+    def release(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+def _bcrypt_cost(hashed: bytes) -> Optional[int]:
+    """Liest den Kostenfaktor aus einem bcrypt-Hash ($2b$12$...)"""
+    try:
+        return int(hashed.split(b'$')[2])
+    except (IndexError, ValueError):
+        return None
+
+def calibrate_bcrypt_cost(target_ms: float = 250.0, min_cost: int = BCRYPT_MIN_COST,
+                          max_cost: int = BCRYPT_MAX_COST) -> Dict[str, Any]:
+    """Ermittelt den bcrypt-Kostenfaktor für eine Ziel-Prüfdauer auf dieser Hardware
+    
+    Misst die Hashdauer für steigende Kostenfaktoren und wählt den höchsten,
+    der die Zieldauer nicht überschreitet (mindestens min_cost).
+    
+    Args:
+        target_ms: Angestrebte Dauer einer Passwortprüfung in Millisekunden
+        min_cost: Untergrenze des Kostenfaktors
+        max_cost: Obergrenze des Kostenfaktors
+        
+    Returns:
+        Dict mit gewähltem Kostenfaktor und den gemessenen Dauern
+    """
+    password = os.urandom(16)
+    measurements: List[Dict[str, Any]] = []
+    chosen = min_cost
+    for cost in range(min_cost, max_cost + 1):
+        start = time.perf_counter()
+        bcrypt.hashpw(password, bcrypt.gensalt(rounds=cost))
+        duration_ms = (time.perf_counter() - start) * 1000
+        measurements.append({'cost': cost, 'duration_ms': round(duration_ms, 1)})
+        if duration_ms > target_ms:
+            break
+        chosen = cost
+        # Jede Stufe verdoppelt die Dauer, die nächste würde das Ziel sicher überschreiten
+        if duration_ms * 2 > target_ms * 1.5:
+            break
+    return {'cost': chosen, 'target_ms': target_ms, 'measurements': measurements}
+
+# Schlüsselbund für die Token-Signatur (im Datenverzeichnis, nur für den Besitzer lesbar)
+KEYRING_FILENAME = 'auth_keys.json'
+# Prüfintervall auf Änderungen durch andere Worker-Prozesse (Sekunden)
+KEYRING_RELOAD_INTERVAL = 5.0
+
+class KeyRing:
+    """Persistenter Schlüsselbund für die Signatur der Tokens
+    
+    Jeder Schlüssel hat eine ID (kid), die im Token-Header mitgesendet wird.
+    Nach einer Rotation signiert der neue Schlüssel, ältere bleiben bis zum
+    Ablauf der damit ausgestellten Tokens zur Prüfung gültig. Da alle
+    Worker-Prozesse dieselbe Datei lesen, sind Tokens prozessübergreifend
+    und über Neustarts hinweg gültig.
+    
+    Ist FOTOBOX_SECRET_KEY gesetzt, wird nur dieser Schlüssel verwendet
+    (keine Datei, keine Rotation).
+    """
+    
+    def __init__(self, path: str, retention: datetime.timedelta):
+        self.path = path
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._data: Dict[str, Any] = {}
+        self._mtime: Optional[float] = None
+        self._checked = 0.0
+        env_secret = os.environ.get('FOTOBOX_SECRET_KEY')
+        if env_secret:
+            self._static = True
+            self._data = {'active': 'env', 'session_secret': env_secret,
+                          'keys': {'env': {'secret': env_secret, 'created': time.time()}}}
+        else:
+            self._static = False
+            
+    @staticmethod
+    def _new_key() -> Dict[str, Any]:
+        return {'secret': secrets.token_hex(32), 'created': time.time()}
+        
+    def _read(self) -> Dict[str, Any]:
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+            
+    def _write(self, data: Dict[str, Any]) -> None:
+        """Schreibt den Schlüsselbund atomar mit Rechten 0600"""
+        tmp_path = f"{self.path}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, self.path)
+        
+    def _load(self, force: bool = False) -> None:
+        """Lädt den Schlüsselbund neu, falls die Datei geändert wurde (oder legt ihn an)"""
+        if self._static:
+            return
+        now = time.monotonic()
+        if not force and self._data and now - self._checked < KEYRING_RELOAD_INTERVAL:
+            return
+        self._checked = now
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            mtime = None
+        if mtime is not None and mtime == self._mtime and self._data:
+            return
+        with self._file_lock():
+            if not os.path.exists(self.path):
+                kid = secrets.token_hex(4)
+                data = {'active': kid, 'session_secret': secrets.token_hex(32), 'keys': {kid: self._new_key()}}
+                self._write(data)
+                logger.info(f"Neuer Signaturschlüssel erstellt (kid {kid})")
+            self._data = self._read()
+            self._mtime = os.stat(self.path).st_mtime
+            
+    def _file_lock(self):
+        """Exklusive Dateisperre, damit parallel startende Worker nur einen Schlüssel anlegen"""
+        return _FileLock(f"{self.path}.lock")
+        
+    def signing_key(self) -> Tuple[str, str]:
+        """Gibt (kid, Schlüssel) des aktiven Signaturschlüssels zurück"""
+        with self._lock:
+            self._load()
+            kid = self._data['active']
+            return kid, self._data['keys'][kid]['secret']
+            
+    def verification_key(self, kid: Optional[str]) -> Optional[str]:
+        """Gibt den Schlüssel zur kid zurück (ohne kid: aktiver Schlüssel)"""
+        with self._lock:
+            self._load()
+            if kid is None:
+                kid = self._data['active']
+            key = self._data['keys'].get(kid)
+            if key is None and not self._static:
+                # Evtl. hat ein anderer Worker gerade rotiert
+                self._load(force=True)
+                key = self._data['keys'].get(kid)
+            return key['secret'] if key else None
+            
+    def session_secret(self) -> str:
+        """Gibt das Secret für Flask-Sessions zurück (wird nicht rotiert)"""
+        with self._lock:
+            self._load()
+            return self._data['session_secret']
+            
+    def rotate(self) -> str:
+        """Erzeugt einen neuen aktiven Schlüssel
+        
+        Frühere Schlüssel bleiben für die Token-Gültigkeitsdauer zur Prüfung
+        erhalten und werden danach entfernt.
+        
+        Returns:
+            str: kid des neuen Schlüssels
+        """
+        if self._static:
+            raise AuthError("Schlüsselrotation nicht möglich, da FOTOBOX_SECRET_KEY gesetzt ist")
+        with self._lock, self._file_lock():
+            data = self._read() if os.path.exists(self.path) else {
+                'session_secret': secrets.token_hex(32), 'keys': {}}
+            now = time.time()
+            old_kid = data.get('active')
+            if old_kid in data['keys']:
+                data['keys'][old_kid]['retired'] = now
+            # Schlüssel entfernen, deren Tokens inzwischen alle abgelaufen sind
+            cutoff = now - self.retention.total_seconds()
+            data['keys'] = {kid: key for kid, key in data['keys'].items()
+                            if key.get('retired') is None or key['retired'] > cutoff}
+            kid = secrets.token_hex(4)
+            while kid in data['keys']:
+                kid = secrets.token_hex(4)
+            data['keys'][kid] = self._new_key()
+            data['active'] = kid
+            self._write(data)
+            self._data = data
+            self._mtime = os.stat(self.path).st_mtime
+        logger.info(f"Signaturschlüssel rotiert: {old_kid} -> {kid}")
+        return kid
+        
+    def info(self) -> Dict[str, Any]:
+        """Gibt Informationen über die Schlüssel zurück (ohne Geheimnisse)"""
+        with self._lock:
+            self._load()
+            return {
+                'active': self._data['active'],
+                'static': self._static,
+                'keys': [{'kid': kid, 'created': key.get('created'), 'retired': key.get('retired')}
+                         for kid, key in self._data['keys'].items()]
+            }
+
+class _FileLock:
+    """Exklusive flock-Sperre auf einer Hilfsdatei"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+        
+    def __enter__(self):
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+        
+    def __exit__(self, *exc_info):
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
 class AuthManager:
     """Zentrale Verwaltungsklasse für Authentifizierung"""
     
     def __init__(self):
-        self.folder_manager = FolderManager()
+        self.folder_manager = get_folder_manager()
         self.data_dir = get_data_dir()
-        self._secret_key = os.environ.get('FOTOBOX_SECRET_KEY', os.urandom(32))
         self._token_expiry = datetime.timedelta(hours=24)
-        self.db_manager = DatabaseManager()
+        self.key_ring = KeyRing(os.path.join(self.data_dir, KEYRING_FILENAME), self._token_expiry)
+        self.db_manager = get_db_manager()
+        self._token_cache = TokenCache()
+        # Gesperrte Tokens (Logout): Schlüssel -> Ablaufzeit, danach ist der Eintrag überflüssig.
+        # Maßgeblich ist die Tabelle revoked_tokens; _revoked ist ihr lokaler Stand und wird
+        # neu geladen, sobald PRAGMA data_version eine Änderung durch einen anderen Prozess meldet
+        # (geprüft höchstens alle REVOCATION_CHECK_INTERVAL Sekunden).
+        self._revoked: Dict[str, float] = {}
+        self._revoked_lock = threading.Lock()
+        self._revoked_conn: Optional[sqlite3.Connection] = None
+        self._revoked_version: Optional[int] = None
+        self._revoked_checked = 0.0
+        self._password_pool: Optional[ThreadPoolExecutor] = None
+        lock_prefix = os.path.join(self.data_dir, PASSWORD_LOCK_PREFIX)
+        self._password_slots = _SlotLocks(f"{lock_prefix}.pending", PASSWORD_MAX_PENDING)
+        self._password_workers = _SlotLocks(f"{lock_prefix}.worker", PASSWORD_WORKERS)
+        self._pool_lock = threading.Lock()
+        self.login_limiter = SharedLoginRateLimiter()
+        
+    def get_bcrypt_cost(self) -> int:
+        """Gibt den konfigurierten bcrypt-Kostenfaktor zurück"""
+        try:
+            cost = int(get_setting(BCRYPT_COST_KEY, BCRYPT_DEFAULT_COST))
+        except (TypeError, ValueError):
+            return BCRYPT_DEFAULT_COST
+        return min(max(cost, BCRYPT_MIN_COST), BCRYPT_MAX_COST)
+        
+    def set_bcrypt_cost(self, cost: int) -> bool:
+        """Speichert den bcrypt-Kostenfaktor (gilt für neue Hashes)"""
+        if not BCRYPT_MIN_COST <= cost <= BCRYPT_MAX_COST:
+            raise ValueError(f"Kostenfaktor muss zwischen {BCRYPT_MIN_COST} und {BCRYPT_MAX_COST} liegen")
+        return set_setting(BCRYPT_COST_KEY, cost)
         
     def _hash_password(self, password: str) -> bytes:
         """Erstellt einen sicheren Hash des Passworts"""
-        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=self.get_bcrypt_cost()))
+        
+    def _get_password_pool(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._password_pool is None:
+                self._password_pool = ThreadPoolExecutor(
+                    max_workers=PASSWORD_WORKERS,
+                    thread_name_prefix='fotobox-bcrypt',
+                    initializer=_lower_thread_priority
+                )
+            return self._password_pool
+            
+    def _run_with_worker_slot(self, function, *args) -> Any:
+        """Führt function aus, sobald einer der PASSWORD_WORKERS Plätze aller Prozesse frei ist"""
+        fd = self._password_workers.acquire()
+        try:
+            return function(*args)
+        finally:
+            self._password_workers.release(fd)
+            
+    def _run_password_check(self, function, *args) -> Any:
+        """Führt eine bcrypt-Operation im Worker-Pool aus
+        
+        Raises:
+            AuthBusyError: Wenn in allen Prozessen zusammen bereits
+                PASSWORD_MAX_PENDING Prüfungen anstehen
+        """
+        slot = self._password_slots.try_acquire()
+        if slot is None:
+            raise AuthBusyError("Zu viele gleichzeitige Anmeldeversuche")
+        try:
+            future = self._get_password_pool().submit(self._run_with_worker_slot, function, *args)
+        except BaseException:
+            self._password_slots.release(slot)
+            raise
+        # Slot erst freigeben, wenn die Prüfung wirklich beendet ist (auch nach Timeout)
+        future.add_done_callback(lambda _: self._password_slots.release(slot))
+        try:
+            return future.result(timeout=PASSWORD_VERIFY_TIMEOUT)
+        except FutureTimeoutError:
+            raise AuthBusyError("Passwortprüfung hat zu lange gedauert")
         
     def _verify_password(self, password: str, hashed: str) -> bool:
         """Verifiziert ein Passwort gegen einen Hash"""
@@ -62,18 +665,43 @@ class AuthManager:
     def set_password(self, password: str) -> bool:
         """Setzt ein neues Passwort"""
         try:
-            password_hash = self._hash_password(password)
+            password_hash = self._run_password_check(self._hash_password, password)
             return set_setting('admin_password_hash', password_hash.decode('utf-8'))
         except Exception as e:
             logger.error(f"Fehler beim Setzen des Passworts: {e}")
             return False
             
     def verify_password(self, password: str) -> bool:
-        """Verifiziert das eingegebene Passwort"""
+        """Verifiziert das eingegebene Passwort
+        
+        Die bcrypt-Prüfung läuft im Worker-Pool. Weicht der Kostenfaktor des
+        gespeicherten Hashes vom konfigurierten ab, wird nach erfolgreicher
+        Prüfung neu gehasht.
+        
+        Raises:
+            AuthBusyError: Wenn zu viele Prüfungen gleichzeitig anstehen
+        """
         stored_hash = get_setting('admin_password_hash')
         if not stored_hash:
             return False
-        return self._verify_password(password, stored_hash)
+        if not self._run_password_check(self._verify_password, password, stored_hash):
+            return False
+        if _bcrypt_cost(stored_hash.encode('utf-8')) != self.get_bcrypt_cost():
+            try:
+                new_hash = self._run_password_check(self._hash_password, password)
+                set_setting('admin_password_hash', new_hash.decode('utf-8'))
+                logger.info("Passwort-Hash mit neuem Kostenfaktor gespeichert")
+            except AuthError as e:
+                logger.warning(f"Neuberechnung des Passwort-Hashes übersprungen: {e}")
+        return True
+        
+    def check_login_rate(self, client: str) -> Tuple[bool, float]:
+        """Prüft, ob der Client einen weiteren Login-Versuch machen darf
+        
+        Returns:
+            (erlaubt, Sekunden bis zum nächsten erlaubten Versuch)
+        """
+        return self.login_limiter.check(client or 'unbekannt')
         
     def generate_token(self, user_id: str = 'admin') -> str:
         """Generiert ein JWT-Token"""
@@ -82,15 +710,83 @@ class AuthManager:
                 'user_id': user_id,
                 'exp': datetime.datetime.utcnow() + self._token_expiry
             }
-            return jwt.encode(payload, self._secret_key, algorithm='HS256')
+            kid, secret = self.key_ring.signing_key()
+            return jwt.encode(payload, secret, algorithm='HS256', headers={'kid': kid})
         except Exception as e:
             logger.error(f"Fehler bei Token-Generierung: {e}")
             raise TokenError(f"Token-Generierung fehlgeschlagen: {e}")
             
+    def _decode_token(self, token: str) -> Dict[str, Any]:
+        """Prüft Signatur und Ablauf mit dem Schlüssel aus dem kid-Header
+        
+        Raises:
+            jwt.InvalidTokenError: Bei ungültigem oder abgelaufenem Token
+        """
+        kid = jwt.get_unverified_header(token).get('kid')
+        secret = self.key_ring.verification_key(kid)
+        if secret is None:
+            raise jwt.InvalidTokenError(f"Unbekannter Schlüssel (kid {kid})")
+        return jwt.decode(token, secret, algorithms=['HS256'])
+        
+    def rotate_signing_key(self) -> str:
+        """Rotiert den Signaturschlüssel (bestehende Tokens bleiben gültig)"""
+        return self.key_ring.rotate()
+        
+    def get_session_secret(self) -> str:
+        """Gibt das persistente Secret für Flask-Sessions zurück"""
+        return self.key_ring.session_secret()
+        
+    def _sync_revocations(self) -> None:
+        """Lädt die Sperrliste neu, wenn ein anderer Prozess sie geändert hat (mit _revoked_lock)"""
+        self._revoked_checked = time.monotonic()
+        try:
+            if self._revoked_conn is None:
+                self._revoked_conn = sqlite3.connect(self.db_manager.db_path, check_same_thread=False)
+            version = self._revoked_conn.execute("PRAGMA data_version").fetchone()[0]
+            if version == self._revoked_version:
+                return
+            rows = self._revoked_conn.execute(
+                "SELECT key, exp FROM revoked_tokens WHERE exp > ?", (time.time(),)
+            ).fetchall()
+            self._revoked = dict(rows)
+            self._revoked_version = version
+        except sqlite3.Error as e:
+            # Lokalen Stand weiterverwenden, beim nächsten Aufruf neu verbinden
+            logger.warning(f"Sperrliste der Tokens nicht lesbar: {e}")
+            self._revoked_conn = None
+            self._revoked_version = None
+
+    def _is_revoked(self, key: str) -> bool:
+        # Innerhalb von REVOCATION_CHECK_INTERVAL nur der lokale Stand, ohne Sperre und Datenbankzugriff
+        if time.monotonic() - self._revoked_checked < REVOCATION_CHECK_INTERVAL:
+            expires = self._revoked.get(key)
+            return expires is not None and expires > time.time()
+        with self._revoked_lock:
+            if time.monotonic() - self._revoked_checked >= REVOCATION_CHECK_INTERVAL:
+                self._sync_revocations()
+            expires = self._revoked.get(key)
+            if expires is None:
+                return False
+            if expires <= time.time():
+                del self._revoked[key]
+                return False
+            return True
+            
     def verify_token(self, token: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
-        """Verifiziert ein JWT-Token"""
+        """Verifiziert ein JWT-Token
+        
+        Bereits verifizierte Tokens werden aus dem Cache beantwortet, sodass
+        die Signatur nur bei der ersten Verwendung geprüft wird.
+        """
+        key = _token_key(token)
+        if self._is_revoked(key):
+            return False, {'error': 'Token wurde widerrufen'}
+        payload = self._token_cache.get(key)
+        if payload is not None:
+            return True, payload
         try:
-            payload = jwt.decode(token, self._secret_key, algorithms=['HS256'])
+            payload = self._decode_token(token)
+            self._token_cache.put(key, payload)
             return True, payload
         except jwt.ExpiredSignatureError:
             return False, {'error': 'Token abgelaufen'}
@@ -100,6 +796,44 @@ class AuthManager:
             logger.error(f"Fehler bei Token-Verifizierung: {e}")
             return False, {'error': str(e)}
 
+    def invalidate_token(self, token: str) -> bool:
+        """Sperrt ein Token bis zu seinem Ablauf (z.B. beim Logout)
+        
+        Die Sperre steht in der Tabelle revoked_tokens und gilt damit für alle
+        Worker-Prozesse, auch für den Stream-Prozess.
+        
+        Returns:
+            bool: True, wenn ein gültiges Token gesperrt wurde
+        """
+        key = _token_key(token)
+        self._token_cache.discard(key)
+        try:
+            payload = self._decode_token(token)
+        except jwt.InvalidTokenError:
+            # Abgelaufene oder ungültige Tokens werden ohnehin abgelehnt
+            return False
+        now = time.time()
+        expires = float(payload.get('exp', now + self._token_expiry.total_seconds()))
+        conn = get_connection()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO revoked_tokens (key, exp) VALUES (?, ?)", (key, expires))
+                # Abgelaufene Sperren bei der Gelegenheit entfernen
+                conn.execute("DELETE FROM revoked_tokens WHERE exp <= ?", (now,))
+        finally:
+            conn.close()
+        with self._revoked_lock:
+            self._revoked[key] = expires
+        return True
+        
+    def get_token_cache_stats(self) -> Dict[str, Any]:
+        """Gibt Kennzahlen des Token-Caches zurück"""
+        stats = self._token_cache.stats()
+        with self._revoked_lock:
+            self._sync_revocations()
+            stats['revoked'] = len(self._revoked)
+        return stats
+
     def get_password_status(self) -> Dict[str, Any]:
         """
         Überprüft den Status des Admin-Passworts
@@ -127,21 +861,39 @@ class AuthManager:
                 'timestamp': datetime.datetime.now().isoformat()
             }
 
-# Globale Instanz
-_auth_manager = AuthManager()
+# Globale Instanz (wird beim ersten Zugriff erzeugt)
+_auth_manager: Optional[AuthManager] = None
+_auth_manager_lock = threading.Lock()
+
+def get_auth_manager() -> AuthManager:
+    """Gibt die AuthManager-Instanz des Prozesses zurück"""
+    global _auth_manager
+    if _auth_manager is None:
+        with _auth_manager_lock:
+            if _auth_manager is None:
+                _auth_manager = AuthManager()
+    return _auth_manager
+
+def get_request_token() -> Optional[str]:
+    """Liest das Token der aktuellen Anfrage (Authorization: Bearer oder X-Auth-Token)"""
+    auth_header = request.headers.get('Authorization')
+    if auth_header:
+        parts = auth_header.split(' ', 1)
+        if len(parts) == 2 and parts[0].lower() == 'bearer' and parts[1].strip():
+            return parts[1].strip()
+    return request.headers.get('X-Auth-Token') or None
 
 # Decorator für geschützte Routen
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        auth_header = request.headers.get('Authorization')
+        token = get_request_token()
         
-        if not auth_header:
+        if not token:
             return jsonify({'error': 'Kein Authentifizierungs-Token'}), 401
             
         try:
-            token = auth_header.split(' ')[1]
-            valid, payload = _auth_manager.verify_token(token)
+            valid, payload = get_auth_manager().verify_token(token)
             
             if not valid:
                 return jsonify(payload), 401
@@ -156,16 +908,37 @@ def login_required(f):
 
 # Convenience-Funktionen
 def is_password_set() -> bool:
-    return _auth_manager.is_password_set()
+    return get_auth_manager().is_password_set()
 
 def set_password(password: str) -> bool:
-    return _auth_manager.set_password(password)
+    return get_auth_manager().set_password(password)
 
 def verify_password(password: str) -> bool:
-    return _auth_manager.verify_password(password)
+    return get_auth_manager().verify_password(password)
+
+def check_password(password: str) -> bool:
+    return get_auth_manager().verify_password(password)
+
+def check_if_setup_needed() -> bool:
+    return not get_auth_manager().is_password_set()
+
+def check_login_rate(client: str) -> Tuple[bool, float]:
+    return get_auth_manager().check_login_rate(client)
 
 def generate_token(user_id: str = 'admin') -> str:
-    return _auth_manager.generate_token(user_id)
+    return get_auth_manager().generate_token(user_id)
 
 def verify_token(token: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
-    return _auth_manager.verify_token(token)
+    return get_auth_manager().verify_token(token)
+
+def invalidate_token(token: str) -> bool:
+    return get_auth_manager().invalidate_token(token)
+
+def get_token_cache_stats() -> Dict[str, Any]:
+    return get_auth_manager().get_token_cache_stats()
+
+def rotate_signing_key() -> str:
+    return get_auth_manager().rotate_signing_key()
+
+def get_session_secret() -> str:
+    return get_auth_manager().get_session_secret()
@@ -14,6 +14,7 @@ import datetime
 import subprocess
 import logging
 import json
+import threading
 from typing import Dict, Any, Optional, Tuple
 from pathlib import Path
 
@@ -21,7 +22,7 @@ from pathlib import Path
 logger = logging.getLogger(__name__)
 
 # Importiere manage_folders für zentrale Pfadverwaltung
-from manage_folders import FolderManager, get_config_dir
+from manage_folders import get_folder_manager, get_config_dir
 
 class ServiceError(Exception):
     """Basisklasse für Service-bezogene Fehler"""
@@ -39,7 +40,7 @@ class BackendService:
     """Verwaltung des Fotobox Backend-Services"""
     
     def __init__(self):
-        self.folder_manager = FolderManager()
+        self.folder_manager = get_folder_manager()
         self.config_dir = get_config_dir()
         self.service_file = os.path.join(self.config_dir, 'fotobox-backend.service')
         self.systemd_path = '/etc/systemd/system/fotobox-backend.service'
@@ -259,24 +260,34 @@ class BackendService:
             logger.error(f"Fehler bei Service-Deinstallation: {e}")
             raise ServiceOperationError(f"Deinstallation fehlgeschlagen: {e}")
 
-# Globale Instanz
-_service = BackendService()
+# Globale Instanz (wird beim ersten Zugriff erzeugt)
+_service: Optional[BackendService] = None
+_service_lock = threading.Lock()
+
+def get_backend_service() -> BackendService:
+    """Gibt die BackendService-Instanz des Prozesses zurück"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = BackendService()
+    return _service
 
 # Convenience-Funktionen
 def install_service() -> bool:
-    return _service.install()
+    return get_backend_service().install()
     
 def start_service() -> bool:
-    return _service.start()
+    return get_backend_service().start()
     
 def stop_service() -> bool:
-    return _service.stop()
+    return get_backend_service().stop()
     
 def restart_service() -> bool:
-    return _service.restart()
+    return get_backend_service().restart()
     
 def get_service_status() -> Dict[str, Any]:
-    return _service.status()
+    return get_backend_service().status()
 
 def get_service_status_with_comparison(comparison_status: str = None) -> Tuple[bool, str]:
     """
@@ -288,13 +299,13 @@ def get_service_status_with_comparison(comparison_status: str = None) -> Tuple[b
     Returns:
         Tuple aus (bool, str): Success-Flag und kombinierter Status
     """
-    return _service.get_status_with_comparison(comparison_status)
+    return get_backend_service().get_status_with_comparison(comparison_status)
     
 def enable_service() -> bool:
-    return _service.enable()
+    return get_backend_service().enable()
     
 def disable_service() -> bool:
-    return _service.disable()
+    return get_backend_service().disable()
     
 def uninstall_service() -> bool:
-    return _service.uninstall()
+    return get_backend_service().uninstall()
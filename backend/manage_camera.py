@@ -18,15 +18,18 @@ import json
 import logging
 import threading
 import subprocess
+from contextlib import contextmanager
 from typing import Dict, List, Optional, Tuple, Union, Any
 from pathlib import Path
 
 # Abhängige Module importieren
-from manage_folders import FolderManager, get_config_dir, get_photos_dir
+from manage_folders import get_folder_manager, get_config_dir, get_photos_dir
 import manage_settings
 import manage_logging
 import manage_files
 import manage_camera_config
+import manage_metrics
+import manage_tracing
 import utils
 
 # Logger konfigurieren
@@ -60,6 +63,24 @@ except ImportError:
     REALSENSE_AVAILABLE = False
     logger.info("Intel RealSense SDK nicht verfügbar")
 
+# Metriken der Bildaufnahme
+CAPTURE_STAGE_DURATION = manage_metrics.histogram(
+    'fotobox_capture_stage_seconds', 'Dauer der einzelnen Aufnahmeschritte', ('camera_type', 'stage'))
+CAPTURE_DURATION = manage_metrics.histogram(
+    'fotobox_capture_duration_seconds', 'Gesamtdauer einer Aufnahme', ('camera_type',))
+CAPTURES = manage_metrics.counter(
+    'fotobox_captures_total', 'Anzahl der Aufnahmen', ('camera_type', 'result'))
+PREVIEW_FRAME_DURATION = manage_metrics.histogram(
+    'fotobox_preview_frame_seconds', 'Dauer für das Abrufen eines Vorschaubildes', ('camera_type',),
+    buckets=(0.005, 0.01, 0.02, 0.033, 0.05, 0.1, 0.25, 0.5, 1.0))
+
+@contextmanager
+def _capture_stage(camera_type: str, stage: str):
+    """Misst einen Aufnahmeschritt als Metrik und als Span des aktiven Traces"""
+    with manage_tracing.span(stage, camera_type=camera_type), \
+            CAPTURE_STAGE_DURATION.time(camera_type=camera_type, stage=stage):
+        yield
+
 class CameraError(Exception):
     """Basisklasse für Kamera-bezogene Fehler"""
     pass
@@ -76,7 +97,7 @@ class CameraManager:
     """Zentrale Verwaltungsklasse für Kamerafunktionen"""
     
     def __init__(self):
-        self.folder_manager = FolderManager()
+        self.folder_manager = get_folder_manager()
         self.config_dir = get_config_dir()
         self.photos_dir = get_photos_dir()
         self._cameras: Dict[str, Any] = {}
@@ -125,6 +146,11 @@ _cameras = {}  # Speichert initialisierte Kameraobjekte
 _active_camera = None  # Aktuell aktive Kamera
 _preview_thread = None  # Thread für Vorschau-Stream
 _preview_running = False  # Flag für laufende Vorschau
+_init_thread = None  # Hintergrund-Thread der Kameraerkennung (siehe start_initialization)
+_init_lock = threading.Lock()
+
+# Maximale Wartezeit auf die Kameraerkennung beim ersten Zugriff (Sekunden)
+CAMERA_INIT_TIMEOUT = float(os.environ.get('FOTOBOX_CAMERA_INIT_TIMEOUT', 30))
 
 class Camera:
     """Basisklasse für alle Kameratypen"""
@@ -286,7 +312,8 @@ class WebcamCamera(Camera):
                 options = {}
                 
             # Lese ein Frame von der Kamera
-            ret, frame = self.device.read()
+            with _capture_stage('webcam', 'readout'):
+                ret, frame = self.device.read()
             
             if not ret:
                 self.last_error = "Konnte kein Bild aufnehmen"
@@ -301,8 +328,9 @@ class WebcamCamera(Camera):
             # Speicherpfad erstellen
             file_path = manage_files.get_file_path(filename, directory)
             
-            # Bild speichern
-            success = cv2.imwrite(file_path, frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            # Bild speichern (JPEG-Kodierung und Schreiben in einem Schritt)
+            with _capture_stage('webcam', 'encode_save'):
+                success = cv2.imwrite(file_path, frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
             
             if not success:
                 self.last_error = "Fehler beim Speichern des Bildes"
@@ -310,7 +338,8 @@ class WebcamCamera(Camera):
                 
             # Optional: Thumbnail erstellen
             if options.get('create_thumbnail', True):
-                thumb_path = manage_files.create_thumbnail(file_path)
+                with _capture_stage('webcam', 'thumbnail'):
+                    thumb_path = manage_files.create_thumbnail(file_path)
             else:
                 thumb_path = None
                 
@@ -521,7 +550,8 @@ class DSLRCamera:
             os.makedirs(save_dir, exist_ok=True)
             
             # Kameraeinstellungen vor der Aufnahme anwenden
-            self._apply_capture_settings(options)
+            with _capture_stage('dslr', 'settings'):
+                self._apply_capture_settings(options)
             
             # Definiere den Dateipfad für die Aufnahme
             timestamp = time.strftime("%Y%m%d_%H%M%S")
@@ -529,16 +559,19 @@ class DSLRCamera:
             filepath = os.path.join(save_dir, filename)
             
             # Bild aufnehmen
-            file_path = self.camera.capture(gp.GP_CAPTURE_IMAGE, self.context)
-            camera_file = self.camera.file_get(
-                file_path.folder,
-                file_path.name,
-                gp.GP_FILE_TYPE_NORMAL,
-                self.context
-            )
+            with _capture_stage('dslr', 'trigger'):
+                file_path = self.camera.capture(gp.GP_CAPTURE_IMAGE, self.context)
+            with _capture_stage('dslr', 'transfer'):
+                camera_file = self.camera.file_get(
+                    file_path.folder,
+                    file_path.name,
+                    gp.GP_FILE_TYPE_NORMAL,
+                    self.context
+                )
             
             # Speichere die Datei
-            camera_file.save(filepath)
+            with _capture_stage('dslr', 'save'):
+                camera_file.save(filepath)
             
             # Erstelle Thumbnail, wenn gewünscht
             thumbnail_path = None
@@ -550,12 +583,13 @@ class DSLRCamera:
                 
                 # Thumbnail mit OpenCV erstellen
                 if OPENCV_AVAILABLE:
-                    img = cv2.imread(filepath)
-                    if img is not None:
-                        # Thumbnail erstellen (max. 320x240)
-                        thumbnail_size = (320, 240)
-                        thumbnail = self._resize_image_keep_aspect_ratio(img, thumbnail_size)
-                        cv2.imwrite(thumbnail_path, thumbnail)
+                    with _capture_stage('dslr', 'thumbnail'):
+                        img = cv2.imread(filepath)
+                        if img is not None:
+                            # Thumbnail erstellen (max. 320x240)
+                            thumbnail_size = (320, 240)
+                            thumbnail = self._resize_image_keep_aspect_ratio(img, thumbnail_size)
+                            cv2.imwrite(thumbnail_path, thumbnail)
             
             return {
                 'success': True,
@@ -987,13 +1021,14 @@ class DepthSensorCamera:
             
             # Warte auf einen Frame (mehrere Versuche)
             frames = None
-            for attempt in range(5):
-                try:
-                    frames = self.pipeline.wait_for_frames(timeout_ms=5000)
-                    if frames:
-                        break
-                except:
-                    time.sleep(0.5)
+            with _capture_stage('depth', 'readout'):
+                for attempt in range(5):
+                    try:
+                        frames = self.pipeline.wait_for_frames(timeout_ms=5000)
+                        if frames:
+                            break
+                    except:
+                        time.sleep(0.5)
             
             if not frames:
                 return {'success': False, 'error': "Konnte keinen Frame abrufen"}
@@ -1009,7 +1044,8 @@ class DepthSensorCamera:
                 color_image = np.asanyarray(color_frame.get_data())
                 
                 # Speichere das Bild
-                cv2.imwrite(filepath, color_image)
+                with _capture_stage('depth', 'encode_save'):
+                    cv2.imwrite(filepath, color_image)
                 
                 # Erstelle Thumbnail, wenn gewünscht
                 thumbnail_path = None
@@ -1020,21 +1056,22 @@ class DepthSensorCamera:
                     thumbnail_path = os.path.join(thumbnail_dir, thumbnail_file)
                     
                     # Thumbnail erstellen (max. 320x240)
-                    thumbnail_size = (320, 240)
-                    height, width = color_image.shape[:2]
+                    with _capture_stage('depth', 'thumbnail'):
+                        thumbnail_size = (320, 240)
+                        height, width = color_image.shape[:2]
                     
-                    # Berechne Skalierungsfaktoren
-                    scale_width = thumbnail_size[0] / width
-                    scale_height = thumbnail_size[1] / height
-                    scale = min(scale_width, scale_height)
+                        # Berechne Skalierungsfaktoren
+                        scale_width = thumbnail_size[0] / width
+                        scale_height = thumbnail_size[1] / height
+                        scale = min(scale_width, scale_height)
                     
-                    # Berechne neue Größe
-                    new_width = int(width * scale)
-                    new_height = int(height * scale)
+                        # Berechne neue Größe
+                        new_width = int(width * scale)
+                        new_height = int(height * scale)
                     
-                    # Skaliere das Bild
-                    thumbnail = cv2.resize(color_image, (new_width, new_height))
-                    cv2.imwrite(thumbnail_path, thumbnail)
+                        # Skaliere das Bild
+                        thumbnail = cv2.resize(color_image, (new_width, new_height))
+                        cv2.imwrite(thumbnail_path, thumbnail)
                 
                 return {
                     'success': True,
@@ -1224,6 +1261,43 @@ def initialize() -> bool:
         manage_logging.error(f"Fehler bei Kameramodul-Initialisierung: {str(e)}", exception=e, source="manage_camera")
         return False
 
+def _initialize_in_background() -> None:
+    try:
+        initialize()
+    except Exception as e:
+        manage_logging.error(f"Fehler bei Kameramodul-Initialisierung: {str(e)}", exception=e, source="manage_camera")
+
+def start_initialization() -> threading.Thread:
+    """Startet initialize() einmalig in einem Hintergrund-Thread
+    
+    Die Kameraerkennung (USB-Geräte, gPhoto2) dauert mehrere Sekunden und soll
+    den Start des Backends nicht verzögern. Zugriffe auf die Kameraliste warten
+    bei Bedarf auf das Ende der Erkennung (siehe wait_for_initialization).
+    
+    Returns:
+        threading.Thread: Der (ggf. bereits laufende) Initialisierungs-Thread
+    """
+    global _init_thread
+    
+    with _init_lock:
+        if _init_thread is None:
+            _init_thread = threading.Thread(target=_initialize_in_background,
+                                            name='fotobox-camera-init', daemon=True)
+            _init_thread.start()
+        return _init_thread
+
+def wait_for_initialization(timeout: float = CAMERA_INIT_TIMEOUT) -> bool:
+    """Wartet, bis eine laufende Kameraerkennung abgeschlossen ist
+    
+    Returns:
+        bool: True wenn keine Erkennung (mehr) läuft, False bei Zeitüberschreitung
+    """
+    thread = _init_thread
+    if thread is None or thread is threading.current_thread():
+        return True
+    thread.join(timeout)
+    return not thread.is_alive()
+
 def detect_cameras() -> List[Dict]:
     """Erkennt verfügbare Kameras basierend auf den Kamera-Konfigurationen
     
@@ -1232,6 +1306,9 @@ def detect_cameras() -> List[Dict]:
     """
     global _cameras
     
+    # Nicht parallel zur Erkennung im Hintergrund suchen
+    wait_for_initialization()
+    
     manage_logging.log("Suche nach verfügbaren Kameras", source="manage_camera")
     
     # Leere aktuelle Kameraliste
@@ -1467,6 +1544,7 @@ def get_camera_list() -> List[Dict]:
     global _cameras
     
     # Wenn noch keine Kameras erkannt wurden, führe eine Erkennung durch
+    wait_for_initialization()
     if not _cameras:
         detect_cameras()
         
@@ -1483,6 +1561,7 @@ def connect_camera(camera_id: str) -> Dict:
     """
     global _cameras, _active_camera
     
+    wait_for_initialization()
     if camera_id not in _cameras:
         return {'success': False, 'error': f"Kamera mit ID {camera_id} nicht gefunden"}
         
@@ -1549,8 +1628,22 @@ def capture_image(options: Dict = None) -> Dict:
     # Standardwerte für Optionen
     if options is None:
         options = {}
-        
-    return _active_camera.capture(options)
+    
+    camera_type = _active_camera.type
+    with manage_tracing.start_trace('capture', camera_type=camera_type, camera=_active_camera.name) as trace:
+        # Countdown läuft im Frontend und wird von dort als Dauer mitgeliefert
+        countdown_ms = options.get('countdown_ms')
+        if isinstance(countdown_ms, (int, float)) and countdown_ms > 0:
+            trace.add_span('countdown', float(countdown_ms))
+        with CAPTURE_DURATION.time(camera_type=camera_type):
+            result = _active_camera.capture(options)
+        success = bool(result and result.get('success'))
+        if not success:
+            trace.error = (result or {}).get('error')
+    CAPTURES.inc(camera_type=camera_type, result='success' if success else 'error')
+    if result is not None:
+        result['trace_id'] = trace.trace_id
+    return result
 
 def get_camera_settings() -> Dict:
     """Gibt die Einstellungen der aktiven Kamera zurück
@@ -1618,8 +1711,9 @@ def get_preview_frame() -> Optional[bytes]:
     
     if _active_camera is None or not _active_camera.connected:
         return None
-        
-    return _active_camera.get_preview_frame()
+    
+    with PREVIEW_FRAME_DURATION.time(camera_type=_active_camera.type):
+        return _active_camera.get_preview_frame()
 
 def stop_preview() -> bool:
     """Stoppt den Vorschau-Stream
@@ -1759,9 +1853,3 @@ def cleanup():
     _active_camera = None
     
     manage_logging.log("Kameramodul aufgeräumt", source="manage_camera")
-
-# Initialisiere das Modul beim Import
-try:
-    initialize()
-except Exception as e:
-    manage_logging.error(f"Fehler bei Kameramodul-Initialisierung: {str(e)}", exception=e, source="manage_camera")
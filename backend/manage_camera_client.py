@@ -0,0 +1,258 @@
+"""
+manage_camera_client.py - Kamera-Zugriff für die HTTP-Worker von Fotobox2
+
+Dieses Modul bietet dieselben Funktionen wie manage_camera (get_camera_list,
+capture_image, get_preview_frame, ...), führt sie aber je nach Betriebsart aus:
+
+    local   - direkt im eigenen Prozess über manage_camera (Entwicklung, app.py)
+    daemon  - über den Unix-Socket des Kamera-Daemons (manage_camera_daemon.py),
+              damit mehrere Worker-Prozesse sich die Geräte nicht streitig machen
+
+Die Betriebsart wird über FOTOBOX_CAMERA_MODE festgelegt (Standard: local);
+fotobox_server.py setzt sie für seine Worker auf daemon.
+"""
+
+import os
+import time
+import socket
+import logging
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+from manage_camera_daemon import get_socket_path, send_message, recv_message
+from manage_preview_buffer import PreviewFrameBuffer, PreviewBufferError
+
+# Logger konfigurieren
+logger = logging.getLogger(__name__)
+
+CAMERA_MODE = os.environ.get('FOTOBOX_CAMERA_MODE', 'local').lower()
+
+# Zeitlimit für eine Anfrage an den Daemon (Aufnahmen mit DSLR können dauern)
+REQUEST_TIMEOUT = float(os.environ.get('FOTOBOX_CAMERA_TIMEOUT', 30))
+
+class CameraDaemonError(Exception):
+    """Kamera-Daemon nicht erreichbar oder Fehler bei der Kommunikation"""
+    pass
+
+# Eine Verbindung je Thread: Anfragen einer Verbindung laufen nacheinander,
+# ein langer Preview-Stream blockiert so keine anderen Anfragen
+_local = threading.local()
+
+# Vorschau-Puffer des Daemons (einmal je Prozess geöffnet)
+_preview_buffer: Optional[PreviewFrameBuffer] = None
+_preview_lock = threading.Lock()
+
+# Ältere Bilder im Puffer gelten als veraltet (Vorschau im Daemon ruhte)
+PREVIEW_MAX_AGE = 1.0
+
+# Liefert der Puffer keine aktuellen Bilder, wird höchstens in diesem Abstand (Sekunden)
+# geprüft, ob ein neu gestarteter Daemon ein neues Segment angelegt hat
+PREVIEW_REATTACH_INTERVAL = 2.0
+_preview_checked = 0.0
+
+def is_daemon_mode() -> bool:
+    """Gibt zurück, ob der Kamera-Daemon verwendet wird"""
+    return CAMERA_MODE == 'daemon'
+
+def _connect() -> socket.socket:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(REQUEST_TIMEOUT)
+    try:
+        sock.connect(get_socket_path())
+    except OSError as e:
+        sock.close()
+        raise CameraDaemonError(f"Kamera-Daemon nicht erreichbar: {e}")
+    return sock
+
+def _close() -> None:
+    sock = getattr(_local, 'sock', None)
+    _local.sock = None
+    if sock is not None:
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+def _request(op: str, *args, **kwargs):
+    """Sendet eine Anfrage an den Daemon und gibt (Header, Binärdaten) zurück
+
+    Ist eine bestehende Verbindung inzwischen geschlossen (z.B. nach einem
+    Neustart des Daemons), wird einmal neu verbunden.
+    """
+    while True:
+        sock = getattr(_local, 'sock', None)
+        reused = sock is not None
+        if sock is None:
+            sock = _local.sock = _connect()
+        try:
+            send_message(sock, {'op': op, 'args': list(args), 'kwargs': kwargs})
+            header, payload = recv_message(sock)
+            break
+        except (ConnectionError, OSError) as e:
+            _close()
+            # Nach Zeitüberschreitung nicht wiederholen (die Aufnahme könnte bereits laufen)
+            if not reused or isinstance(e, socket.timeout):
+                raise CameraDaemonError(f"Kommunikation mit dem Kamera-Daemon fehlgeschlagen: {e}")
+    if not header.get('success'):
+        raise CameraDaemonError(header.get('error', 'Unbekannter Fehler im Kamera-Daemon'))
+    return header, payload
+
+def _call(op: str, *args, **kwargs) -> Any:
+    if not is_daemon_mode():
+        import manage_camera
+        return getattr(manage_camera, op)(*args, **kwargs)
+    header, _ = _request(op, *args, **kwargs)
+    return header.get('result')
+
+def _call_with_result(op: str, *args, **kwargs) -> Dict:
+    """Wie _call, liefert bei Daemon-Fehlern aber ein Ergebnis-Dict wie manage_camera"""
+    try:
+        return _call(op, *args, **kwargs)
+    except CameraDaemonError as e:
+        logger.error(str(e))
+        return {'success': False, 'error': str(e)}
+
+def get_camera_list() -> List[Dict]:
+    return _call('get_camera_list')
+
+def detect_cameras() -> List[Dict]:
+    return _call('detect_cameras')
+
+def connect_camera(camera_id: str) -> Dict:
+    return _call_with_result('connect_camera', camera_id)
+
+def disconnect_camera(camera_id: str = None) -> Dict:
+    return _call_with_result('disconnect_camera', camera_id)
+
+def capture_image(options: Dict = None) -> Dict:
+    return _call_with_result('capture_image', options)
+
+def get_camera_settings() -> Dict:
+    return _call_with_result('get_camera_settings')
+
+def update_camera_settings(settings: Dict) -> Dict:
+    return _call_with_result('update_camera_settings', settings)
+
+def get_active_camera() -> Optional[Dict]:
+    return _call('get_active_camera')
+
+def stop_preview() -> bool:
+    return _call('stop_preview')
+
+def _get_preview_buffer(stale: bool = False) -> Optional[PreviewFrameBuffer]:
+    """Gibt den Vorschau-Puffer des Daemons zurück (None, wenn es keinen gibt)
+
+    Mit stale=True (keine aktuellen Bilder) wird der Puffer neu geöffnet, falls
+    der Daemon inzwischen ein neues Segment angelegt hat. Das alte Segment
+    bleibt für Leser, die es noch verwenden, bis zu ihrem Ende abgebildet.
+    """
+    global _preview_buffer, _preview_checked
+    with _preview_lock:
+        if stale and _preview_buffer is not None and time.monotonic() - _preview_checked >= PREVIEW_REATTACH_INTERVAL:
+            _preview_checked = time.monotonic()
+            try:
+                current = PreviewFrameBuffer.attach()
+            except PreviewBufferError:
+                current = None
+            if current is not None and current.segment_id != _preview_buffer.segment_id:
+                logger.info("Vorschau-Puffer wurde vom Kamera-Daemon neu angelegt, verwende das neue Segment")
+                _preview_buffer = current
+            elif current is not None:
+                current.close()
+        if _preview_buffer is None:
+            try:
+                _preview_buffer = PreviewFrameBuffer.attach()
+            except PreviewBufferError:
+                return None
+        return _preview_buffer
+
+def get_preview_frame() -> Optional[bytes]:
+    """Gibt ein Vorschaubild (JPEG) zurück oder None"""
+    if not is_daemon_mode():
+        import manage_camera
+        return manage_camera.get_preview_frame()
+    buffer = _get_preview_buffer()
+    if buffer is not None:
+        result = buffer.read_frame()
+        if result is not None and time.time() - result[2] < PREVIEW_MAX_AGE:
+            return result[1]
+        _get_preview_buffer(stale=True)
+    # Noch kein aktuelles Bild im Puffer (der Daemon startet die Vorschau gerade)
+    _, payload = _request('get_preview_frame')
+    return payload
+
+def iter_preview_frames(interval: float = 0.033) -> Iterator[Optional[bytes]]:
+    """Liefert fortlaufend Vorschaubilder, jedes Bild höchstens einmal
+    
+    None bedeutet, dass gerade kein Bild verfügbar ist (der Aufrufer kann warten).
+    Im Daemon-Betrieb wird auf neue Bilder im Shared Memory gewartet, sonst
+    wird manage_camera im Abstand von interval Sekunden abgefragt.
+    """
+    buffer = _get_preview_buffer() if is_daemon_mode() else None
+    if buffer is None:
+        while True:
+            yield get_preview_frame()
+            time.sleep(interval)
+    # Erst auf das nächste Bild warten; das vorhandene kann von einer ruhenden Vorschau stammen
+    last = buffer.latest_frame()
+    while True:
+        result = buffer.wait_for_frame(last, timeout=1.0)
+        if result is None:
+            current = _get_preview_buffer(stale=True)
+            if current is not buffer:
+                buffer = current
+                last = buffer.latest_frame()
+            yield None
+            continue
+        last, frame, _ = result
+        yield frame
+
+def get_status() -> Dict[str, Any]:
+    """Gibt den Kamerastatus einschließlich der Betriebsart zurück"""
+    status = {'mode': CAMERA_MODE, 'active_camera': None}
+    if is_daemon_mode():
+        try:
+            status['daemon'] = _request('ping')[0].get('result')
+        except CameraDaemonError as e:
+            status['daemon'] = None
+            status['error'] = str(e)
+            return status
+    status['active_camera'] = get_active_camera()
+    return status
+
+def get_traces(limit: int = 20, name: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Gibt die letzten Traces zurück (Aufnahmen laufen im Daemon-Prozess ab)"""
+    import manage_tracing
+    traces = manage_tracing.get_traces(limit=limit, name=name)
+    if is_daemon_mode():
+        try:
+            traces += _request('get_traces', limit=limit, name=name)[0].get('result') or []
+        except CameraDaemonError as e:
+            logger.warning(f"Traces des Kamera-Daemons nicht verfügbar: {e}")
+        traces.sort(key=lambda trace: trace['started_at'], reverse=True)
+    return traces[:limit]
+
+def get_metrics_snapshot() -> Optional[Dict[str, Any]]:
+    """Gibt den Metrik-Stand des Kamera-Daemons zurück (None ohne Daemon)
+
+    Aufnahmen und Vorschaubilder werden im Daemon gemessen; api_metrics
+    führt diesen Stand mit den Metriken der Worker zusammen.
+    """
+    if not is_daemon_mode():
+        return None
+    try:
+        return _request('get_metrics')[0].get('result')
+    except CameraDaemonError as e:
+        logger.warning(f"Metriken des Kamera-Daemons nicht verfügbar: {e}")
+        return None
+
+def wait_for_daemon(timeout: float = 30.0) -> bool:
+    """Wartet, bis der Kamera-Daemon Anfragen annimmt"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _request('ping')
+            return True
+        except CameraDaemonError:
+            time.sleep(0.2)
+    return False
@@ -15,6 +15,7 @@ from typing import Dict, List, Optional, Any
 import manage_logging
 import manage_database
 import manage_folders
+import manage_settings
 import utils
 
 # Pfad zum Konfigurationsordner
@@ -23,16 +24,27 @@ CONFIG_DIR = manage_folders.get_camera_conf_dir()
 # Globale Variablen
 _configs = {}  # Cache für geladene Konfigurationen
 _active_config = None  # Aktuell ausgewählte Konfiguration
+_subscription_id = None  # Abonnement für Änderungen der aktiven Konfiguration
+_config_version = 0  # Änderungszähler für _configs (Schlüssel zwischengespeicherter API-Antworten)
+
+# Einstellungsschlüssel der aktiven Konfiguration
+ACTIVE_CONFIG_KEY = "camera.config_id"
 
 def initialize() -> bool:
     """Initialisiert das Kamera-Konfigurationsmodul
     
+    Wird beim ersten Zugriff auf die Konfigurationen aufgerufen, nicht beim Import.
+    
     Returns:
         bool: True wenn erfolgreich, False sonst
     """
-    global _configs, _active_config
+    global _configs, _active_config, _subscription_id, _config_version
     
     try:
+        # Änderungen der aktiven Konfiguration (andere Worker, Shell-Skripte) übernehmen
+        if _subscription_id is None:
+            _subscription_id = manage_settings.subscribe(_on_settings_changed, [ACTIVE_CONFIG_KEY])
+        
         # Stelle sicher, dass der Konfigurationsordner existiert
         os.makedirs(CONFIG_DIR, exist_ok=True)
         
@@ -61,6 +73,8 @@ def initialize() -> bool:
                 manage_logging.error(f"Fehler beim Laden der Konfigurationsdatei {config_file}: {str(e)}", 
                                     exception=e, source="manage_camera_config")
         
+        _config_version += 1
+        
         # Versuche, die aktive Konfiguration aus den Einstellungen zu laden
         _active_config = get_active_config_from_db()
         
@@ -105,6 +119,16 @@ def get_camera_configs() -> List[Dict]:
     
     return result
 
+def get_config_version() -> int:
+    """Gibt den Änderungszähler der Konfigurationen zurück
+    
+    Der Zähler steigt bei jedem Laden, Anlegen, Ändern und Löschen und dient
+    als Version für zwischengespeicherte API-Antworten.
+    """
+    if not _configs:
+        initialize()
+    return _config_version
+
 def get_config(config_id: str) -> Optional[Dict]:
     """Gibt eine bestimmte Kamera-Konfiguration zurück
     
@@ -170,7 +194,11 @@ def create_config(config_data: Dict) -> Optional[str]:
     Returns:
         ID der erstellten Konfiguration oder None bei Fehler
     """
-    global _configs
+    global _configs, _config_version
+    
+    # Wenn der Cache leer ist, initialisiere
+    if not _configs:
+        initialize()
     
     try:
         # Validiere die erforderlichen Felder
@@ -195,6 +223,7 @@ def create_config(config_data: Dict) -> Optional[str]:
         
         # Füge die Konfiguration zum Cache hinzu
         _configs[config_id] = config_data
+        _config_version += 1
         
         manage_logging.log(f"Neue Kamera-Konfiguration erstellt: {config_data['name']} (ID: {config_id})", 
                          source="manage_camera_config")
@@ -215,7 +244,11 @@ def update_config(config_id: str, config_data: Dict) -> bool:
     Returns:
         bool: True wenn erfolgreich, False sonst
     """
-    global _configs
+    global _configs, _config_version
+    
+    # Wenn der Cache leer ist, initialisiere
+    if not _configs:
+        initialize()
     
     if config_id not in _configs:
         manage_logging.error(f"Kamera-Konfiguration mit ID {config_id} existiert nicht", source="manage_camera_config")
@@ -224,6 +257,7 @@ def update_config(config_id: str, config_data: Dict) -> bool:
     try:
         # Aktualisiere die Konfiguration im Cache
         _configs[config_id] = config_data
+        _config_version += 1
         
         # Speichere die aktualisierte Konfiguration als JSON-Datei
         config_path = os.path.join(CONFIG_DIR, f"{config_id}.json")
@@ -248,7 +282,11 @@ def delete_config(config_id: str) -> bool:
     Returns:
         bool: True wenn erfolgreich, False sonst
     """
-    global _configs, _active_config
+    global _configs, _active_config, _config_version
+    
+    # Wenn der Cache leer ist, initialisiere
+    if not _configs:
+        initialize()
     
     if config_id not in _configs:
         manage_logging.error(f"Kamera-Konfiguration mit ID {config_id} existiert nicht", source="manage_camera_config")
@@ -262,6 +300,7 @@ def delete_config(config_id: str) -> bool:
         
         # Entferne die Konfiguration aus dem Cache
         del _configs[config_id]
+        _config_version += 1
         
         # Wenn die gelöschte Konfiguration die aktive war, setze die aktive Konfiguration zurück
         if _active_config == config_id:
@@ -282,21 +321,15 @@ def delete_config(config_id: str) -> bool:
         return False
 
 def get_active_config_from_db() -> Optional[str]:
-    """Lädt die aktive Kamera-Konfiguration aus der Datenbank
+    """Lädt die aktive Kamera-Konfiguration aus den Einstellungen
     
     Returns:
         ID der aktiven Konfiguration oder None
     """
     try:
-        conn = manage_database.get_db_connection()
-        cursor = conn.cursor()
-        
-        # Prüfe, ob die Einstellung existiert
-        cursor.execute("SELECT value FROM settings WHERE key = 'camera_config_id'")
-        result = cursor.fetchone()
+        config_id = manage_settings.load_single_setting(ACTIVE_CONFIG_KEY)
         
-        if result:
-            config_id = result[0]
+        if config_id:
             # Prüfe, ob die Konfiguration existiert
             if config_id in _configs:
                 return config_id
@@ -312,7 +345,7 @@ def get_active_config_from_db() -> Optional[str]:
         return None
 
 def save_active_config_to_db(config_id: Optional[str]) -> bool:
-    """Speichert die aktive Kamera-Konfiguration in der Datenbank
+    """Speichert die aktive Kamera-Konfiguration in den Einstellungen
     
     Args:
         config_id: ID der aktiven Konfiguration oder None
@@ -321,35 +354,25 @@ def save_active_config_to_db(config_id: Optional[str]) -> bool:
         bool: True wenn erfolgreich, False sonst
     """
     try:
-        conn = manage_database.get_db_connection()
-        cursor = conn.cursor()
-        
-        # Prüfe, ob die Einstellung bereits existiert
-        cursor.execute("SELECT 1 FROM settings WHERE key = 'camera_config_id'")
-        result = cursor.fetchone()
-        
-        if result:
-            # Aktualisiere den vorhandenen Eintrag
-            if config_id is not None:
-                cursor.execute("UPDATE settings SET value = ? WHERE key = 'camera_config_id'", (config_id,))
-            else:
-                cursor.execute("DELETE FROM settings WHERE key = 'camera_config_id'")
-        else:
-            # Füge einen neuen Eintrag hinzu, aber nur wenn config_id nicht None ist
-            if config_id is not None:
-                cursor.execute("INSERT INTO settings (key, value) VALUES ('camera_config_id', ?)", (config_id,))
-        
-        conn.commit()
-        return True
+        if config_id is None:
+            return manage_settings.reset_to_defaults([ACTIVE_CONFIG_KEY])
+        return manage_settings.update_single_setting(ACTIVE_CONFIG_KEY, config_id)
     
     except Exception as e:
         manage_logging.error(f"Fehler beim Speichern der aktiven Kamera-Konfiguration in der DB: {str(e)}", 
                            exception=e, source="manage_camera_config")
         return False
 
-# Initialisiere das Modul beim Import
-try:
-    initialize()
-except Exception as e:
-    manage_logging.error(f"Fehler bei der Initialisierung des Kamera-Konfigurationsmoduls: {str(e)}", 
-                       exception=e, source="manage_camera_config")
+def _on_settings_changed(changes: Dict[str, Any]) -> None:
+    """Übernimmt eine anderweitig geänderte aktive Konfiguration ohne erneutes Laden"""
+    global _active_config
+    
+    config_id = changes.get(ACTIVE_CONFIG_KEY)
+    if config_id == _active_config:
+        return
+    if config_id is None or config_id in _configs:
+        _active_config = config_id
+        manage_logging.log(f"Aktive Kamera-Konfiguration geändert: {config_id}", source="manage_camera_config")
+    else:
+        manage_logging.warn(f"Unbekannte Kamera-Konfiguration {config_id} ignoriert", 
+                          source="manage_camera_config")
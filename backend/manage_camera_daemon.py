@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+manage_camera_daemon.py - Kamera-Prozess für Fotobox2
+
+Dieses Modul stellt einen eigenständigen Prozess bereit, der als einziger
+auf die Kamerageräte (/dev/video*, gPhoto2-USB, RealSense) zugreift. Die
+HTTP-Worker sprechen ihn über einen lokalen Unix-Socket an
+(siehe manage_camera_client.py), statt manage_camera selbst zu importieren
+und sich gegenseitig die Geräte wegzunehmen.
+
+Protokoll (je Nachricht):
+    4 Byte Länge des Headers (big endian), Header als JSON,
+    danach optional payload_size Bytes Binärdaten (z.B. ein JPEG-Bild)
+
+Anfrage:  {"op": "capture_image", "args": [...], "kwargs": {...}}
+Antwort:  {"success": true, "result": ...} bzw. {"success": false, "error": "..."}
+
+Vorschaubilder werden nicht über den Socket verteilt: solange Leser aktiv
+sind, schreibt der Daemon sie in einen Ringpuffer im Shared Memory
+(manage_preview_buffer.py), aus dem jeder Worker direkt liest. Die
+Socket-Operation get_preview_frame bleibt als Rückfallebene bestehen.
+
+Start: python manage_camera_daemon.py (wird von fotobox_server.py gestartet)
+"""
+
+import os
+import sys
+import json
+import errno
+import signal
+import socket
+import struct
+import logging
+import threading
+import time
+import socketserver
+from typing import Any, Dict, Optional, Tuple
+
+import manage_logging  # richtet das Logging des Daemon-Prozesses ein
+import manage_startup
+from manage_folders import get_data_dir
+from manage_preview_buffer import PreviewFrameBuffer
+
+# Logger konfigurieren
+logger = logging.getLogger(__name__)
+
+# Funktionen von manage_camera, die über den Socket aufgerufen werden dürfen
+OPERATIONS = (
+    'get_camera_list',
+    'detect_cameras',
+    'connect_camera',
+    'disconnect_camera',
+    'capture_image',
+    'get_camera_settings',
+    'update_camera_settings',
+    'get_active_camera',
+    'get_preview_frame',
+    'stop_preview',
+)
+
+# Zusätzliche Operationen des Daemons selbst
+DAEMON_OPERATIONS = ('ping', 'get_traces', 'get_metrics')
+
+# Bildrate, mit der Vorschaubilder in den Shared Memory geschrieben werden
+PREVIEW_FPS = float(os.environ.get('FOTOBOX_PREVIEW_FPS', 30))
+
+_HEADER_LENGTH = struct.Struct('>I')
+MAX_HEADER_SIZE = 1024 * 1024
+
+def get_socket_path() -> str:
+    """Pfad des Unix-Sockets (FOTOBOX_CAMERA_SOCKET oder im Datenverzeichnis)"""
+    return os.environ.get('FOTOBOX_CAMERA_SOCKET') or os.path.join(get_data_dir(), 'camera.sock')
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:], size - received)
+        if count == 0:
+            raise ConnectionError("Verbindung vom Gegenüber geschlossen")
+        received += count
+    return bytes(buffer)
+
+def send_message(sock: socket.socket, header: Dict[str, Any], payload: Optional[bytes] = None) -> None:
+    """Sendet eine Nachricht (Header und optionale Binärdaten)"""
+    if payload is not None:
+        header['payload_size'] = len(payload)
+    data = json.dumps(header, default=str).encode('utf-8')
+    sock.sendall(_HEADER_LENGTH.pack(len(data)) + data)
+    if payload:
+        sock.sendall(payload)
+
+def recv_message(sock: socket.socket) -> Tuple[Dict[str, Any], Optional[bytes]]:
+    """Empfängt eine Nachricht
+
+    Raises:
+        ConnectionError: Wenn die Verbindung geschlossen wurde
+    """
+    (length,) = _HEADER_LENGTH.unpack(_recv_exact(sock, _HEADER_LENGTH.size))
+    if length > MAX_HEADER_SIZE:
+        raise ConnectionError(f"Header zu groß ({length} Bytes)")
+    header = json.loads(_recv_exact(sock, length))
+    payload = None
+    if header.get('payload_size') is not None:
+        payload = _recv_exact(sock, header['payload_size'])
+    return header, payload
+
+class _CameraRequestHandler(socketserver.BaseRequestHandler):
+    """Bearbeitet alle Anfragen einer Client-Verbindung nacheinander"""
+
+    def handle(self):
+        while True:
+            try:
+                request, _ = recv_message(self.request)
+            except (ConnectionError, OSError):
+                return
+            except ValueError as e:
+                send_message(self.request, {'success': False, 'error': f"Ungültige Anfrage: {e}"})
+                return
+            try:
+                header, payload = self.server.dispatch(request)
+            except Exception as e:
+                logger.error(f"Fehler bei Kamera-Operation {request.get('op')}: {e}")
+                header, payload = {'success': False, 'error': str(e)}, None
+            try:
+                send_message(self.request, header, payload)
+            except OSError:
+                return
+
+class CameraDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix-Socket-Server, der die Aufrufe an manage_camera weiterreicht
+
+    Gerätezugriffe werden über eine Sperre serialisiert: es gibt genau einen
+    Besitzer der Hardware, und die Kameraklassen sind nicht threadsicher.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, camera_module):
+        self.socket_path = socket_path
+        self._device_lock = threading.RLock()
+        self._camera = camera_module
+        _remove_stale_socket(socket_path)
+        super().__init__(socket_path, _CameraRequestHandler)
+        # Nur Besitzer und Gruppe (fotobox) dürfen die Kamera steuern
+        os.chmod(socket_path, 0o660)
+
+    def dispatch(self, request: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[bytes]]:
+        op = request.get('op')
+        args = request.get('args') or []
+        kwargs = request.get('kwargs') or {}
+
+        if op == 'ping':
+            return {'success': True, 'result': {'pid': os.getpid()}}, None
+        if op == 'get_traces':
+            import manage_tracing
+            return {'success': True, 'result': manage_tracing.get_traces(*args, **kwargs)}, None
+        if op == 'get_metrics':
+            import manage_metrics
+            return {'success': True, 'result': manage_metrics.REGISTRY.snapshot()}, None
+        if op not in OPERATIONS:
+            return {'success': False, 'error': f"Unbekannte Operation: {op}"}, None
+
+        with self._device_lock:
+            result = getattr(self._camera, op)(*args, **kwargs)
+
+        if op == 'get_preview_frame':
+            # JPEG-Daten als Binärteil statt im JSON-Header
+            return {'success': True, 'result': result is not None}, result
+        return {'success': True, 'result': result}, None
+
+    def server_close(self):
+        super().server_close()
+        _remove_stale_socket(self.socket_path)
+
+class PreviewProducer(threading.Thread):
+    """Schreibt Vorschaubilder in den Shared-Memory-Puffer, solange jemand liest
+
+    Ohne Leser (kein Lesezugriff in den letzten Sekunden) ruht die Kamera-
+    vorschau, damit sie weder Rechenzeit noch USB-Bandbreite kostet.
+    """
+
+    def __init__(self, server: CameraDaemon, buffer: PreviewFrameBuffer, fps: float = PREVIEW_FPS):
+        super().__init__(name='fotobox-preview-producer', daemon=True)
+        self.server = server
+        self.buffer = buffer
+        self.interval = 1.0 / max(fps, 1.0)
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            if not self.buffer.has_readers():
+                self._stop_event.wait(0.1)
+                continue
+            started = time.monotonic()
+            try:
+                with self.server._device_lock:
+                    frame = self.server._camera.get_preview_frame()
+                if frame is not None:
+                    self.buffer.write_frame(frame)
+            except Exception as e:
+                logger.error(f"Fehler beim Erzeugen des Vorschaubildes: {e}")
+                self._stop_event.wait(1.0)
+                continue
+            self._stop_event.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def stop(self):
+        self._stop_event.set()
+
+def _remove_stale_socket(path: str) -> None:
+    """Entfernt einen verwaisten Socket, verweigert aber den Start neben einem laufenden Daemon"""
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError as e:
+        if e.errno in (errno.ECONNREFUSED, errno.ENOENT):
+            os.unlink(path)
+            return
+        raise
+    else:
+        raise RuntimeError(f"Kamera-Daemon läuft bereits ({path})")
+    finally:
+        probe.close()
+
+def serve(socket_path: Optional[str] = None) -> int:
+    """Startet den Kamera-Daemon und blockiert bis SIGTERM/SIGINT"""
+    socket_path = socket_path or get_socket_path()
+    import manage_camera
+    server = CameraDaemon(socket_path, manage_camera)
+    # Kameraerkennung im Hintergrund: der Socket nimmt sofort Anfragen an,
+    # Zugriffe auf die Kameraliste warten bis zum Ende der Erkennung
+    manage_startup.startup('camera')
+    preview_buffer = PreviewFrameBuffer.create()
+    producer = PreviewProducer(server, preview_buffer)
+    producer.start()
+
+    def shutdown(signum, frame):
+        logger.info("Beende Kamera-Daemon")
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    logger.info(f"Kamera-Daemon lauscht auf {socket_path}")
+    try:
+        server.serve_forever()
+    finally:
+        producer.stop()
+        producer.join(timeout=2.0)
+        preview_buffer.close()
+        manage_camera.cleanup()
+        server.server_close()
+    return 0
+
+if __name__ == '__main__':
+    try:
+        sys.exit(serve())
+    except Exception as e:
+        logger.error(f"Fehler beim Starten des Kamera-Daemons: {e}")
+        sys.exit(1)
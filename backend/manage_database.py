@@ -15,18 +15,21 @@ stellt sicher, dass Datenbankzugriffe einheitlich und sicher erfolgen.
 
 import os
 import sqlite3
-import shutil
 import json
+import time
+import base64
 import logging
+import threading
 from datetime import datetime
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, List, Tuple, Iterator
 from pathlib import Path
 
 # Modul-Logger konfigurieren
 logger = logging.getLogger(__name__)
 
 # Importiere FolderManager für zentrale Pfadverwaltung
-from manage_folders import FolderManager, get_data_dir, get_backup_dir
+from manage_folders import get_folder_manager, get_data_dir, get_backup_dir
+import manage_metrics
 
 class DatabaseError(Exception):
     """Basisklasse für Datenbank-bezogene Fehler"""
@@ -36,11 +39,19 @@ class DatabaseConfigError(DatabaseError):
     """Fehler in der Datenbank-Konfiguration"""
     pass
 
+class QueryNotAllowedError(DatabaseError):
+    """Abfrage enthält nicht erlaubte (schreibende) Operationen"""
+    pass
+
+class QueryTimeoutError(DatabaseError):
+    """Abfrage hat das Zeitlimit überschritten"""
+    pass
+
 class DatabaseManager:
     """Zentrale Verwaltungsklasse für Datenbankoperationen"""
     
     def __init__(self):
-        self.folder_manager = FolderManager()
+        self.folder_manager = get_folder_manager()
         self.data_dir = get_data_dir()
         self.backup_dir = get_backup_dir()
         self.db_path = os.path.join(self.data_dir, 'fotobox_settings.db')
@@ -55,6 +66,10 @@ class DatabaseManager:
         """Initialisiert die Datenbankstruktur"""
         try:
             with sqlite3.connect(self.db_path) as conn:
+                # Inkrementelles VACUUM greift nur bei neu angelegten Datenbanken,
+                # muss daher vor der ersten Tabelle gesetzt werden
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute("PRAGMA journal_mode = WAL")
                 conn.execute("""
                     CREATE TABLE IF NOT EXISTS settings (
                         key TEXT PRIMARY KEY,
@@ -62,6 +77,21 @@ class DatabaseManager:
                         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     )
                 """)
+                # Gesperrte Tokens (Logout), gemeinsam für alle Worker-Prozesse
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS revoked_tokens (
+                        key TEXT PRIMARY KEY,
+                        exp REAL NOT NULL
+                    )
+                """)
+                # Login-Ratenbegrenzung je Client, gemeinsam für alle Worker-Prozesse
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS login_buckets (
+                        client TEXT PRIMARY KEY,
+                        tokens REAL NOT NULL,
+                        updated REAL NOT NULL
+                    )
+                """)
                 conn.execute("""
                     CREATE TABLE IF NOT EXISTS camera_configs (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -77,16 +107,21 @@ class DatabaseManager:
             raise DatabaseError(f"Datenbankinitialisierung fehlgeschlagen: {e}")
             
     def backup_database(self) -> str:
-        """Erstellt ein Backup der Datenbank"""
+        """Erstellt ein Backup der Datenbank (einschließlich noch nicht übertragener WAL-Inhalte)"""
         try:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             backup_path = os.path.join(
                 self.backup_dir,
                 f"fotobox_settings_{timestamp}.db"
             )
+            # Ein Backup derselben Sekunde nicht überschreiben (z.B. das wiederherzustellende)
+            counter = 1
+            while os.path.exists(backup_path):
+                backup_path = os.path.join(self.backup_dir, f"fotobox_settings_{timestamp}_{counter}.db")
+                counter += 1
             
             if os.path.exists(self.db_path):
-                shutil.copy2(self.db_path, backup_path)
+                copy_database(self.db_path, backup_path)
                 logger.info(f"Datenbank-Backup erstellt: {backup_path}")
                 return backup_path
             else:
@@ -97,7 +132,12 @@ class DatabaseManager:
             raise DatabaseError(f"Backup fehlgeschlagen: {e}")
             
     def restore_database(self, backup_path: str) -> bool:
-        """Stellt ein Datenbank-Backup wieder her"""
+        """Stellt ein Datenbank-Backup wieder her
+        
+        Der Inhalt wird über die Backup-API von SQLite in die laufende Datenbank
+        übertragen, statt die Datei zu überschreiben; eine vorhandene -wal/-shm
+        bleibt so konsistent und andere Prozesse sehen den neuen Stand.
+        """
         try:
             if not os.path.exists(backup_path):
                 raise DatabaseError(f"Backup-Datei nicht gefunden: {backup_path}")
@@ -106,7 +146,7 @@ class DatabaseManager:
             self.backup_database()
             
             # Backup wiederherstellen
-            shutil.copy2(backup_path, self.db_path)
+            copy_database(backup_path, self.db_path)
             logger.info(f"Datenbank wiederhergestellt von: {backup_path}")
             return True
             
@@ -114,14 +154,73 @@ class DatabaseManager:
             logger.error(f"Fehler bei Datenbank-Wiederherstellung: {e}")
             raise DatabaseError(f"Wiederherstellung fehlgeschlagen: {e}")
 
-# Globale Instanz
-_db_manager = DatabaseManager()
+def copy_database(source_path: str, target_path: str) -> None:
+    """Kopiert eine SQLite-Datenbank über die Backup-API
+    
+    Anders als eine Dateikopie berücksichtigt das Commits, die im WAL-Modus
+    noch in der -wal-Datei stehen, und schreibt in ein Ziel mit eigener
+    -wal-Datei über dessen Journal.
+    """
+    source = sqlite3.connect(source_path)
+    try:
+        target = sqlite3.connect(target_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+# Globale Instanz (wird beim ersten Zugriff erzeugt und legt dabei das Schema an)
+_db_manager: Optional[DatabaseManager] = None
+_db_manager_lock = threading.Lock()
+
+def get_db_manager() -> DatabaseManager:
+    """Gibt die DatabaseManager-Instanz des Prozesses zurück"""
+    global _db_manager
+    if _db_manager is None:
+        with _db_manager_lock:
+            if _db_manager is None:
+                _db_manager = DatabaseManager()
+    return _db_manager
+
+def get_db_path() -> str:
+    """Gibt den Pfad der Einstellungsdatenbank zurück"""
+    return get_db_manager().db_path
+
+def __getattr__(name: str) -> Any:
+    # DB_PATH war früher eine Modulkonstante und bleibt für bestehende Aufrufer erhalten
+    if name == 'DB_PATH':
+        return get_db_path()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Bekannte Datenbankdateien im Datenverzeichnis
+DATABASE_FILES = {
+    'settings': 'fotobox_settings.db',
+    'logs': 'fotobox_logs.db'
+}
+
+# Intervall für die geplante Wartung (ANALYZE / inkrementelles VACUUM) in Sekunden
+MAINTENANCE_INTERVAL = int(os.environ.get('FOTOBOX_DB_MAINTENANCE_INTERVAL', 6 * 3600))
+# Maximale Anzahl freier Seiten, die pro Wartungslauf zurückgegeben werden
+MAINTENANCE_VACUUM_PAGES = 1000
+
+# Grenzen für Nur-Lese-Abfragen über die API
+QUERY_TIMEOUT = 10.0  # Sekunden
+QUERY_MAX_ROWS = 1000  # Zeilen bei JSON-Antworten
+QUERY_CHUNK_SIZE = 500  # Zeilen pro gestreamtem NDJSON-Block
+# Anzahl SQLite-VM-Instruktionen zwischen zwei Prüfungen des Zeitlimits
+_PROGRESS_STEPS = 10000
+
+_maintenance_thread: Optional[threading.Thread] = None
+_maintenance_stop = threading.Event()
+_last_maintenance: Dict[str, Dict[str, Any]] = {}
 
 # Convenience-Funktionen
 def get_connection() -> sqlite3.Connection:
     """Gibt eine Datenbankverbindung zurück"""
     try:
-        conn = sqlite3.connect(_db_manager.db_path)
+        conn = sqlite3.connect(get_db_manager().db_path)
         conn.row_factory = sqlite3.Row
         return conn
     except sqlite3.Error as e:
@@ -130,14 +229,16 @@ def get_connection() -> sqlite3.Connection:
 
 def backup_db() -> str:
     """Erstellt ein Backup der Datenbank"""
-    return _db_manager.backup_database()
+    return get_db_manager().backup_database()
 
 def restore_db(backup_path: str) -> bool:
     """Stellt ein Datenbank-Backup wieder her"""
-    return _db_manager.restore_database(backup_path)
+    return get_db_manager().restore_database(backup_path)
 
 def execute_query(query: str, params: tuple = (), fetch: bool = False) -> Optional[List[sqlite3.Row]]:
     """Führt eine SQL-Query aus"""
+    operation = query.lstrip().split(None, 1)[0].upper() if query.strip() else 'UNKNOWN'
+    start = time.perf_counter()
     try:
         with get_connection() as conn:
             cur = conn.execute(query, params)
@@ -148,6 +249,8 @@ def execute_query(query: str, params: tuple = (), fetch: bool = False) -> Option
     except sqlite3.Error as e:
         logger.error(f"Fehler bei Query-Ausführung: {e}")
         raise DatabaseError(f"Query-Ausführung fehlgeschlagen: {e}")
+    finally:
+        manage_metrics.DB_QUERY_DURATION.observe(time.perf_counter() - start, db='settings', operation=operation)
 
 def get_setting(key: str, default: Any = None) -> Any:
     """Liest eine Einstellung aus der Datenbank"""
@@ -178,3 +281,404 @@ def set_setting(key: str, value: Any) -> bool:
     except Exception as e:
         logger.error(f"Fehler beim Speichern von Einstellung {key}: {e}")
         return False
+
+def get_database_path(name: str = 'settings') -> str:
+    """Gibt den Pfad einer bekannten Datenbank ('settings', 'logs') zurück"""
+    if name not in DATABASE_FILES:
+        raise DatabaseConfigError(f"Unbekannte Datenbank: {name}")
+    return os.path.join(get_db_manager().data_dir, DATABASE_FILES[name])
+
+def _connect_readonly(db_path: str) -> sqlite3.Connection:
+    """Öffnet eine Nur-Lese-Verbindung, die den Schreibzugriff nicht blockiert"""
+    if not os.path.exists(db_path):
+        raise DatabaseError(f"Datenbank nicht gefunden: {db_path}")
+    return sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+
+def _quote_identifier(name: str) -> str:
+    """Maskiert einen Tabellennamen für die Verwendung in SQL"""
+    return '"' + name.replace('"', '""') + '"'
+
+def _read_stat1(conn: sqlite3.Connection) -> Dict[str, int]:
+    """
+    Liest die Zeilenschätzungen aus sqlite_stat1
+
+    Die erste Zahl der Spalte 'stat' ist die von ANALYZE ermittelte
+    Zeilenanzahl der Tabelle (bzw. des Index).
+    """
+    estimates: Dict[str, int] = {}
+    try:
+        rows = conn.execute("SELECT tbl, stat FROM sqlite_stat1").fetchall()
+    except sqlite3.OperationalError:
+        # ANALYZE wurde noch nie ausgeführt
+        return estimates
+
+    for table, stat in rows:
+        try:
+            count = int(str(stat).split()[0])
+        except (ValueError, IndexError):
+            continue
+        estimates[table] = max(count, estimates.get(table, 0))
+    return estimates
+
+def get_database_stats(db_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Ermittelt Statistiken einer Datenbank ohne Tabellen-Scans
+
+    Zeilenzahlen stammen aus sqlite_stat1 (gepflegt durch die geplante
+    Wartung). Fehlt dort ein Eintrag, wird MAX(rowid) als Schätzung
+    verwendet, was über den B-Baum in logarithmischer Zeit gelesen wird.
+
+    Args:
+        db_path: Pfad zur Datenbank, Standard ist die Einstellungsdatenbank
+
+    Returns:
+        Dict mit Tabellen, Zeilenschätzungen, Seiten-, Freelist- und WAL-Größen
+    """
+    db_path = db_path or get_db_manager().db_path
+    try:
+        conn = _connect_readonly(db_path)
+        try:
+            tables = [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master "
+                "WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+            )]
+            estimates = _read_stat1(conn)
+
+            stats = {}
+            for table in tables:
+                if table in estimates:
+                    stats[table] = {'rows': estimates[table], 'source': 'sqlite_stat1'}
+                    continue
+                try:
+                    max_rowid = conn.execute(
+                        f"SELECT MAX(rowid) FROM {_quote_identifier(table)}"
+                    ).fetchone()[0]
+                    stats[table] = {'rows': max_rowid or 0, 'source': 'max_rowid'}
+                except sqlite3.OperationalError:
+                    # WITHOUT ROWID-Tabellen ohne Statistik
+                    stats[table] = {'rows': None, 'source': 'unknown'}
+
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            freelist_count = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+            journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        finally:
+            conn.close()
+
+        wal_path = f"{db_path}-wal"
+        db_size = os.path.getsize(db_path)
+        wal_size = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+
+        return {
+            'path': db_path,
+            'tables': tables,
+            'stats': stats,
+            'page_size': page_size,
+            'page_count': page_count,
+            'freelist_count': freelist_count,
+            'freelist_bytes': freelist_count * page_size,
+            'auto_vacuum': {0: 'none', 1: 'full', 2: 'incremental'}.get(auto_vacuum, auto_vacuum),
+            'journal_mode': journal_mode,
+            'size_bytes': db_size,
+            'size_mb': round(db_size / (1024 * 1024), 2),
+            'wal_size_bytes': wal_size,
+            'last_maintenance': _last_maintenance.get(db_path)
+        }
+    except sqlite3.Error as e:
+        logger.error(f"Fehler beim Ermitteln der Datenbankstatistiken: {e}")
+        raise DatabaseError(f"Statistikabfrage fehlgeschlagen: {e}")
+
+def check_integrity(db_path: Optional[str] = None, max_errors: int = 10) -> Dict[str, Any]:
+    """
+    Prüft die Datenbankintegrität mit PRAGMA quick_check
+
+    quick_check überspringt den Abgleich der Indexinhalte und ist damit
+    deutlich schneller als integrity_check.
+
+    Args:
+        db_path: Pfad zur Datenbank, Standard ist die Einstellungsdatenbank
+        max_errors: Maximale Anzahl zurückgegebener Fehlermeldungen
+
+    Returns:
+        Dict mit Ergebnis ('ok') und ggf. Fehlermeldungen
+    """
+    db_path = db_path or get_db_manager().db_path
+    try:
+        conn = _connect_readonly(db_path)
+        try:
+            start = datetime.now()
+            messages = [row[0] for row in conn.execute(f"PRAGMA quick_check({int(max_errors)})")]
+            duration = (datetime.now() - start).total_seconds()
+        finally:
+            conn.close()
+
+        ok = messages == ['ok']
+        if not ok:
+            logger.warning(f"Integritätsprüfung für {db_path} meldet Fehler: {messages}")
+        return {
+            'path': db_path,
+            'ok': ok,
+            'errors': [] if ok else messages,
+            'duration_seconds': round(duration, 3)
+        }
+    except sqlite3.Error as e:
+        logger.error(f"Fehler bei der Integritätsprüfung: {e}")
+        raise DatabaseError(f"Integritätsprüfung fehlgeschlagen: {e}")
+
+def run_maintenance(db_path: Optional[str] = None,
+                    vacuum_pages: int = MAINTENANCE_VACUUM_PAGES) -> Dict[str, Any]:
+    """
+    Aktualisiert die Planer-Statistiken und gibt freie Seiten zurück
+
+    Führt ANALYZE (hält sqlite_stat1 für get_database_stats aktuell),
+    ein inkrementelles VACUUM und einen WAL-Checkpoint aus.
+
+    Args:
+        db_path: Pfad zur Datenbank, Standard ist die Einstellungsdatenbank
+        vacuum_pages: Maximale Anzahl freizugebender Seiten
+
+    Returns:
+        Dict mit Ergebnis der Wartung
+    """
+    db_path = db_path or get_db_manager().db_path
+    if not os.path.exists(db_path):
+        raise DatabaseError(f"Datenbank nicht gefunden: {db_path}")
+
+    try:
+        start = datetime.now()
+        conn = sqlite3.connect(db_path, timeout=30)
+        try:
+            conn.execute("PRAGMA analysis_limit = 1000")
+            conn.execute("ANALYZE")
+            conn.commit()
+
+            freed = 0
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                conn.execute(f"PRAGMA incremental_vacuum({int(vacuum_pages)})").fetchall()
+                freed = before - conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+            conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+        finally:
+            conn.close()
+
+        result = {
+            'timestamp': start.isoformat(),
+            'duration_seconds': round((datetime.now() - start).total_seconds(), 3),
+            'freed_pages': freed
+        }
+        _last_maintenance[db_path] = result
+        logger.info(f"Datenbankwartung für {db_path} abgeschlossen: {result}")
+        return result
+    except sqlite3.Error as e:
+        logger.error(f"Fehler bei der Datenbankwartung: {e}")
+        raise DatabaseError(f"Wartung fehlgeschlagen: {e}")
+
+def _maintenance_loop(interval: int) -> None:
+    """Führt die Wartung aller bekannten Datenbanken periodisch aus"""
+    while not _maintenance_stop.wait(interval):
+        for name in DATABASE_FILES:
+            db_path = get_database_path(name)
+            if not os.path.exists(db_path):
+                continue
+            try:
+                run_maintenance(db_path)
+            except DatabaseError as e:
+                logger.warning(f"Geplante Wartung für {name} fehlgeschlagen: {e}")
+
+def start_maintenance_scheduler(interval: int = MAINTENANCE_INTERVAL) -> bool:
+    """Startet die geplante Datenbankwartung in einem Hintergrund-Thread"""
+    global _maintenance_thread
+
+    if interval <= 0:
+        logger.info("Geplante Datenbankwartung deaktiviert")
+        return False
+    if _maintenance_thread and _maintenance_thread.is_alive():
+        return True
+
+    _maintenance_stop.clear()
+    _maintenance_thread = threading.Thread(
+        target=_maintenance_loop,
+        args=(interval,),
+        name='db-maintenance',
+        daemon=True
+    )
+    _maintenance_thread.start()
+    logger.info(f"Geplante Datenbankwartung gestartet (Intervall: {interval}s)")
+    return True
+
+def stop_maintenance_scheduler() -> None:
+    """Beendet die geplante Datenbankwartung"""
+    global _maintenance_thread
+
+    _maintenance_stop.set()
+    if _maintenance_thread:
+        _maintenance_thread.join(timeout=5.0)
+        _maintenance_thread = None
+
+# Erlaubte Aktionen für Nur-Lese-Abfragen (sqlite3.Connection.set_authorizer)
+_READONLY_ACTIONS = {
+    sqlite3.SQLITE_SELECT,
+    sqlite3.SQLITE_READ,
+    sqlite3.SQLITE_FUNCTION,
+    getattr(sqlite3, 'SQLITE_RECURSIVE', 33)
+}
+
+def _readonly_authorizer(action: int, arg1: Optional[str], arg2: Optional[str],
+                         db_name: Optional[str], trigger: Optional[str]) -> int:
+    """Authorizer, der ausschließlich lesende Anweisungen zulässt"""
+    if action in _READONLY_ACTIONS:
+        return sqlite3.SQLITE_OK
+    return sqlite3.SQLITE_DENY
+
+def _json_value(value: Any) -> Any:
+    """Wandelt SQLite-Werte in JSON-serialisierbare Werte um"""
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode('ascii')
+    return value
+
+def _set_query_deadline(conn: sqlite3.Connection, timeout: float) -> None:
+    """Bricht die laufende SQLite-Arbeit ab, sobald timeout Sekunden ab jetzt vergangen sind"""
+    deadline = time.monotonic() + timeout
+    conn.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, _PROGRESS_STEPS)
+
+def open_readonly_query(sql: str, params: Any = (), db_path: Optional[str] = None,
+                        timeout: float = QUERY_TIMEOUT) -> sqlite3.Cursor:
+    """
+    Bereitet eine Nur-Lese-Abfrage vor und führt sie aus
+
+    Die Verbindung wird im URI-Modus mode=ro geöffnet, jede Anweisung wird
+    über set_authorizer auf lesende Aktionen geprüft und ein Progress-Handler
+    bricht die Abfrage nach Ablauf des Zeitlimits ab. Der Aufrufer liest die
+    Zeilen über den zurückgegebenen Cursor und muss dessen Verbindung schließen.
+
+    Args:
+        sql: Die SQL-Anweisung (genau eine)
+        params: Positions- (Liste) oder benannte (Dict) Parameter
+        db_path: Pfad zur Datenbank, Standard ist die Einstellungsdatenbank
+        timeout: Zeitlimit in Sekunden für die Ausführung (beim Streamen über
+            iter_query_ndjson gilt es je Block, nicht für den ganzen Download)
+
+    Returns:
+        sqlite3.Cursor: Cursor mit dem Ergebnis
+
+    Raises:
+        QueryNotAllowedError: Wenn die Anweisung schreibend ist
+        QueryTimeoutError: Wenn das Zeitlimit bereits bei der Ausführung überschritten wird
+        DatabaseError: Bei sonstigen Datenbankfehlern
+    """
+    db_path = db_path or get_db_manager().db_path
+    conn = _connect_readonly(db_path)
+    _set_query_deadline(conn, timeout)
+    conn.set_authorizer(_readonly_authorizer)
+
+    try:
+        if isinstance(params, list):
+            params = tuple(params)
+        return conn.execute(sql, params or ())
+    except sqlite3.DatabaseError as e:
+        conn.close()
+        message = str(e)
+        if 'not authorized' in message:
+            raise QueryNotAllowedError(f"Nur lesende Abfragen sind erlaubt: {message}")
+        if 'interrupted' in message:
+            raise QueryTimeoutError(f"Zeitlimit von {timeout}s überschritten")
+        raise DatabaseError(f"Abfrage fehlgeschlagen: {message}")
+    except sqlite3.Warning as e:
+        # Ältere Python-Versionen melden mehrere Anweisungen als Warning
+        conn.close()
+        raise DatabaseError(f"Abfrage fehlgeschlagen: {e}")
+
+def query(sql: str, params: Any = (), db_path: Optional[str] = None,
+          max_rows: int = QUERY_MAX_ROWS) -> Dict[str, Any]:
+    """
+    Führt eine Nur-Lese-Abfrage aus und gibt höchstens max_rows Zeilen zurück
+
+    Args:
+        sql: Die SQL-Anweisung
+        params: Parameter der Abfrage
+        db_path: Pfad zur Datenbank, Standard ist die Einstellungsdatenbank
+        max_rows: Maximale Anzahl zurückgegebener Zeilen
+
+    Returns:
+        Dict mit 'success', 'columns', 'data', 'truncated' bzw. 'error'
+    """
+    try:
+        cursor = open_readonly_query(sql, params, db_path)
+    except QueryNotAllowedError:
+        raise
+    except DatabaseError as e:
+        return {'success': False, 'error': str(e)}
+
+    conn = cursor.connection
+    try:
+        columns = [col[0] for col in cursor.description or []]
+        rows = cursor.fetchmany(max_rows + 1)
+        truncated = len(rows) > max_rows
+        data = [
+            {col: _json_value(value) for col, value in zip(columns, row)}
+            for row in rows[:max_rows]
+        ]
+        return {'success': True, 'columns': columns, 'data': data, 'truncated': truncated}
+    except sqlite3.OperationalError as e:
+        if 'interrupted' in str(e):
+            return {'success': False, 'error': "Zeitlimit der Abfrage überschritten"}
+        return {'success': False, 'error': str(e)}
+    finally:
+        conn.close()
+
+def iter_query_ndjson(cursor: sqlite3.Cursor, max_rows: Optional[int] = None,
+                      chunk_size: int = QUERY_CHUNK_SIZE,
+                      timeout: float = QUERY_TIMEOUT) -> Iterator[str]:
+    """
+    Liefert das Ergebnis eines Cursors blockweise als NDJSON
+
+    Die erste Zeile enthält die Spaltennamen, danach folgt je Datensatz ein
+    JSON-Array und abschließend eine Statuszeile. Es wird immer nur ein Block
+    von chunk_size Zeilen im Speicher gehalten. Die Verbindung des Cursors wird
+    am Ende (auch bei Abbruch durch den Client) geschlossen.
+
+    Das Zeitlimit beginnt vor jedem Block neu: es begrenzt die Arbeit der
+    Datenbank je Block, nicht die Dauer des Downloads (ein langsamer Client
+    hält den Generator zwischen zwei Blöcken beliebig lange an).
+
+    Args:
+        cursor: Cursor aus open_readonly_query
+        max_rows: Optionale Obergrenze für die Anzahl Zeilen
+        chunk_size: Anzahl Zeilen pro geliefertem Block
+        timeout: Zeitlimit in Sekunden je Block
+
+    Yields:
+        str: Block aus NDJSON-Zeilen
+    """
+    conn = cursor.connection
+    count = 0
+    truncated = False
+    try:
+        columns = [col[0] for col in cursor.description or []]
+        yield json.dumps({'columns': columns}) + '\n'
+
+        while True:
+            size = chunk_size if max_rows is None else min(chunk_size, max_rows - count)
+            try:
+                _set_query_deadline(conn, timeout)
+                if size <= 0:
+                    # Nur prüfen, ob es weitere Zeilen gibt (kann ebenfalls das Zeitlimit erreichen)
+                    truncated = cursor.fetchone() is not None
+                    break
+                rows = cursor.fetchmany(size)
+            except sqlite3.OperationalError as e:
+                message = "Zeitlimit der Abfrage überschritten" if 'interrupted' in str(e) else str(e)
+                yield json.dumps({'done': False, 'rows': count, 'error': message}) + '\n'
+                return
+            if not rows:
+                break
+            count += len(rows)
+            yield ''.join(
+                json.dumps([_json_value(value) for value in row]) + '\n' for row in rows
+            )
+
+        yield json.dumps({'done': True, 'rows': count, 'truncated': truncated}) + '\n'
+    finally:
+        conn.close()
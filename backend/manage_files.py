@@ -18,16 +18,19 @@ import psutil
 from PIL import Image
 from werkzeug.utils import secure_filename
 
+import manage_metrics
+import manage_tracing
+
 # Logger einrichten
 logger = logging.getLogger(__name__)
 
 # Verzeichnisverwaltung initialisieren
 try:
     from manage_folders import (
-        FolderManager, get_data_dir, get_photos_dir, 
+        get_folder_manager, get_data_dir, get_photos_dir, 
         get_photos_gallery_dir, get_photos_originals_dir
     )
-    folder_manager = FolderManager()
+    folder_manager = get_folder_manager()
     DATA_DIR = get_data_dir()
     PHOTOS_DIR = get_photos_dir()
     DEFAULT_GALLERY_DIR = get_photos_gallery_dir()
@@ -44,6 +47,12 @@ except ImportError as e:
 THUMBNAIL_SIZE = (200, 200)
 PREVIEW_SIZE = (800, 800)
 
+# Metriken der Thumbnail-Erstellung
+THUMBNAILS_IN_PROGRESS = manage_metrics.gauge(
+    'fotobox_thumbnails_in_progress', 'Gleichzeitig laufende Thumbnail-Erstellungen')
+THUMBNAIL_DURATION = manage_metrics.histogram(
+    'fotobox_thumbnail_duration_seconds', 'Dauer der Thumbnail-Erstellung')
+
 def secure_directory(directory: str) -> str:
     """
     Bereinigt einen Verzeichnisnamen für sichere Verwendung
@@ -146,11 +155,14 @@ def get_image_list(directory: str = 'gallery') -> Dict[str, Any]:
         image_extensions = ['*.jpg', '*.jpeg', '*.png', '*.gif', '*.bmp', '*.webp']
         photos = []
         
-        for ext in image_extensions:
-            photos.extend(glob.glob(os.path.join(target_dir, ext)))
-        
-        # Nur Dateinamen zurückgeben, nicht die vollständigen Pfade
-        photos = [os.path.basename(photo) for photo in sorted(photos, key=os.path.getmtime, reverse=True)]
+        # Eigener Trace: zeigt, wie lange ein neues Foto bis zur Anzeige in der Galerie braucht
+        with manage_tracing.start_trace('gallery_list', directory=directory) as trace:
+            for ext in image_extensions:
+                photos.extend(glob.glob(os.path.join(target_dir, ext)))
+            
+            # Nur Dateinamen zurückgeben, nicht die vollständigen Pfade
+            photos = [os.path.basename(photo) for photo in sorted(photos, key=os.path.getmtime, reverse=True)]
+            trace.attributes['count'] = len(photos)
         
         logger.info(f"{len(photos)} Bilder im Verzeichnis '{directory}' gefunden")
         return {
@@ -192,7 +204,7 @@ def save_image(image_data: bytes, filename: str, directory: str = 'gallery',
         file_path = os.path.join(target_dir, safe_filename)
         
         # Speichern der Bilddaten
-        with open(file_path, 'wb') as f:
+        with manage_tracing.span('files.write', size=len(image_data)), open(file_path, 'wb') as f:
             f.write(image_data)
         
         # Optionales Thumbnail erstellen
@@ -421,14 +433,18 @@ def create_image_thumbnail(source_path: str, target_path: str, size: Tuple[int,
     Raises:
         Exception: Wenn das Bild nicht gelesen oder verarbeitet werden kann
     """
-    with Image.open(source_path) as img:
-        img.thumbnail(size)
-        # Format aus dem Zieldateipfad ableiten
-        format_name = os.path.splitext(target_path)[1].strip('.').upper()
-        # Wenn das Format nicht unterstützt wird, JPEG verwenden
-        if format_name not in ('JPEG', 'PNG', 'GIF', 'BMP', 'WEBP'):
-            format_name = 'JPEG'
-        img.save(target_path, format_name)
+    THUMBNAILS_IN_PROGRESS.inc()
+    try:
+        with manage_tracing.span('files.thumbnail'), THUMBNAIL_DURATION.time(), Image.open(source_path) as img:
+            img.thumbnail(size)
+            # Format aus dem Zieldateipfad ableiten
+            format_name = os.path.splitext(target_path)[1].strip('.').upper()
+            # Wenn das Format nicht unterstützt wird, JPEG verwenden
+            if format_name not in ('JPEG', 'PNG', 'GIF', 'BMP', 'WEBP'):
+                format_name = 'JPEG'
+            img.save(target_path, format_name)
+    finally:
+        THUMBNAILS_IN_PROGRESS.dec()
 
 def get_directory_size(path: str) -> int:
     """
@@ -701,6 +717,3 @@ def write_file_content(file_path: str, content: str, encoding: str = 'utf-8') ->
     except Exception as e:
         logger.error(f"Fehler beim Schreiben in Datei {file_path}: {str(e)}")
         return False
-
-# Initialisierung
-ensure_directories_exist()
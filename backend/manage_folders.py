@@ -4,13 +4,16 @@
 Modul zur Verwaltung der Fotobox-Ordnerstruktur.
 
 Dieses Modul stellt Funktionen zum Zugriff auf die Ordnerstruktur der Fotobox bereit.
-Es dient als Python-Wrapper für die Shell-Implementierung (manage_folders.sh) und
-bietet einen einheitlichen Zugriff auf Verzeichnispfade in der gesamten Anwendung.
+Die Pfade legt die Shell-Implementierung (manage_folders.sh) fest; sie schreibt sie
+bei der Installation einmalig nach conf/folders.json (write_folder_config). Python
+liest nur diese Datei, ein Pfadzugriff ist damit ein Dictionary-Zugriff. Fehlt die
+Datei oder ist sie veraltet, wird die Shell genau einmal aufgerufen, um sie zu erzeugen.
 """
 
 import os
 import sys
 import logging
+import threading
 import subprocess
 import json
 from typing import Optional, Dict, Any, List, Tuple
@@ -26,15 +29,63 @@ class ShellScriptError(Exception):
     """Ausnahme für Fehler bei der Shell-Skript-Ausführung"""
     pass
 
+# Zwischengespeicherte Ordnerstruktur (siehe write_folder_config in manage_folders.sh)
+FOLDER_CONFIG_NAME = 'folders.json'
+FOLDER_CONFIG_VERSION = 1
+
+# Verzeichnistypen in folders.json (entsprechen get_<typ>_dir in manage_folders.sh)
+PATH_TYPES = (
+    'install', 'backend', 'script', 'venv',
+    'backup', 'data_backup', 'nginx_backup', 'https_backup', 'systemd_backup',
+    'config', 'camera_conf', 'https_conf', 'nginx_conf', 'template',
+    'data', 'frontend', 'frontend_css', 'frontend_fonts', 'frontend_js',
+    'photos', 'photos_originals', 'photos_gallery', 'frontend_picture',
+    'log', 'tmp'
+)
+
+# Ältere Bezeichnungen der Python-Module
+PATH_ALIASES = {
+    'gallery': 'photos_gallery',
+    'originals': 'photos_originals',
+    'conf': 'config',
+    'scripts': 'script',
+}
+
+# Verzeichnisse, die ensure_folder_structure nicht selbst anlegt
+UNMANAGED_PATH_TYPES = ('venv',)
+
+def _config_candidates() -> List[Path]:
+    """Mögliche Orte von folders.json (FOTOBOX_FOLDER_CONFIG hat Vorrang)"""
+    configured = os.environ.get('FOTOBOX_FOLDER_CONFIG')
+    if configured:
+        return [Path(configured)]
+    project_dir = Path(__file__).resolve().parent.parent
+    return [
+        project_dir / 'conf' / FOLDER_CONFIG_NAME,
+        Path('/opt/fotobox/conf') / FOLDER_CONFIG_NAME,
+        Path('/etc/fotobox') / FOLDER_CONFIG_NAME
+    ]
+
+def _parse_folder_config(data: Any) -> Optional[Dict[str, str]]:
+    """Gibt die Pfade einer gültigen, aktuellen Konfiguration zurück, sonst None"""
+    if not isinstance(data, dict) or data.get('version') != FOLDER_CONFIG_VERSION:
+        return None
+    paths = data.get('paths')
+    if not isinstance(paths, dict) or any(not paths.get(path_type) for path_type in PATH_TYPES):
+        return None
+    return {path_type: str(path) for path_type, path in paths.items()}
+
 class FolderManager:
-    """Verwaltung der Fotobox-Ordnerstruktur"""
-    
-    def __init__(self):
-        self._cache: Dict[str, str] = {}
-        self._script_path = self._find_shell_script()
-        self._lib_core_path = self._find_lib_core()
-        self._initialized = False
-        self._init_shell_environment()
+    """Verwaltung der Fotobox-Ordnerstruktur
+    
+    Die Pfade werden beim ersten Zugriff einmal aus folders.json geladen. Nur
+    wenn die Datei fehlt oder veraltet ist, wird manage_folders.sh aufgerufen.
+    """
+    
+    def __init__(self, config_file: Optional[str] = None):
+        self._paths: Optional[Dict[str, str]] = None
+        self._config_file = Path(config_file) if config_file else None
+        self._lock = threading.Lock()
         
     def _find_shell_script(self) -> str:
         """Findet den Pfad zum manage_folders.sh Skript"""
@@ -53,10 +104,10 @@ class FolderManager:
                 
         raise FolderConfigError("manage_folders.sh nicht gefunden")
         
-    def _find_lib_core(self) -> str:
+    def _find_lib_core(self, script_path: str) -> str:
         """Findet den Pfad zur lib_core.sh"""
         lib_name = "lib_core.sh"
-        script_dir = Path(self._script_path).parent
+        script_dir = Path(script_path).parent
         lib_path = script_dir / lib_name
         
         if not lib_path.is_file():
@@ -64,93 +115,186 @@ class FolderManager:
             
         return str(lib_path)
         
-    def _init_shell_environment(self) -> None:
-        """Initialisiert die Shell-Umgebung"""
+    def _read_config_file(self) -> Optional[Dict[str, str]]:
+        """Liest die erste gültige folders.json"""
+        candidates = [self._config_file] if self._config_file else _config_candidates()
+        for candidate in candidates:
+            try:
+                with open(candidate, 'r', encoding='utf-8') as f:
+                    paths = _parse_folder_config(json.load(f))
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ordnerkonfiguration {candidate} nicht lesbar: {e}")
+                continue
+            if paths is None:
+                logger.info(f"Ordnerkonfiguration {candidate} ist veraltet und wird neu erzeugt")
+                continue
+            logger.debug(f"Ordnerkonfiguration geladen: {candidate}")
+            return paths
+        return None
+        
+    def _run_shell_bootstrap(self) -> Dict[str, str]:
+        """Ermittelt die Ordnerstruktur einmalig über manage_folders.sh"""
+        script_path = self._find_shell_script()
+        lib_core_path = self._find_lib_core(script_path)
         try:
-            # Source lib_core.sh und prüfe Rückgabewert
-            result = subprocess.run(
-                ['/bin/bash', '-c', f'source "{self._lib_core_path}" && echo $?'],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            
-            if result.stdout.strip() != "0":
-                raise ShellScriptError("Fehler beim Laden von lib_core.sh")
-                
-            # Initialisiere Ordnerstruktur via Shell-Skript
             result = subprocess.run(
-                ['/bin/bash', self._script_path, '--init'],
+                ['/bin/bash', '-c',
+                 'source "$1" >/dev/null && source "$2" >/dev/null && write_folder_config -',
+                 'manage_folders', lib_core_path, script_path],
                 capture_output=True,
                 text=True,
                 check=True
             )
-            
-            if "ERROR" in result.stderr:
-                raise ShellScriptError(f"Fehler bei Ordnerinitialisierung: {result.stderr}")
-                
-            self._initialized = True
-            logger.info("Shell-Umgebung erfolgreich initialisiert")
-            
         except subprocess.CalledProcessError as e:
             raise ShellScriptError(f"Shell-Skript-Fehler: {e.stderr}")
-        except Exception as e:
-            raise FolderConfigError(f"Initialisierungsfehler: {e}")
-            
-    def _execute_shell_command(self, command: str, *args: str) -> str:
-        """Führt ein Shell-Kommando aus und gibt das Ergebnis zurück"""
-        if not self._initialized:
-            raise FolderConfigError("Shell-Umgebung nicht initialisiert")
+        except OSError as e:
+            raise ShellScriptError(f"Shell konnte nicht gestartet werden: {e}")
             
         try:
-            cmd = ['/bin/bash', '-c', 
-                  f'source "{self._lib_core_path}" && source "{self._script_path}" && {command} {" ".join(args)}']
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            return result.stdout.strip()
-        except subprocess.CalledProcessError as e:
-            raise ShellScriptError(f"Fehler bei '{command}': {e.stderr}")
+            paths = _parse_folder_config(json.loads(result.stdout))
+        except ValueError as e:
+            raise ShellScriptError(f"Ungültige Ausgabe von write_folder_config: {e}")
+        if paths is None:
+            raise ShellScriptError("Unvollständige Ausgabe von write_folder_config")
+        
+        self._save_config_file(paths, result.stdout)
+        logger.info("Ordnerstruktur über manage_folders.sh ermittelt")
+        return paths
+        
+    def _save_config_file(self, paths: Dict[str, str], content: str) -> None:
+        """Speichert die Ausgabe der Shell für die nächsten Starts (falls möglich)"""
+        # Gleiche Vorrangregel wie beim Lesen (_config_candidates): FOTOBOX_FOLDER_CONFIG zuerst
+        configured = os.environ.get('FOTOBOX_FOLDER_CONFIG')
+        target = self._config_file or (Path(configured) if configured else Path(paths['config']) / FOLDER_CONFIG_NAME)
+        tmp_path = target.with_name(target.name + '.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_path, target)
+        except OSError as e:
+            logger.warning(f"Ordnerkonfiguration konnte nicht gespeichert werden ({target}): {e}")
             
-    def get_path(self, path_type: str) -> str:
-        """Holt einen Pfad über das Shell-Skript"""
-        if path_type in self._cache:
-            return self._cache[path_type]
+    def _load(self) -> Dict[str, str]:
+        """Lädt die Pfade beim ersten Zugriff (einmalig je Prozess)"""
+        paths = self._paths
+        if paths is not None:
+            return paths
+        with self._lock:
+            if self._paths is None:
+                self._paths = self._read_config_file() or self._run_shell_bootstrap()
+            return self._paths
+            
+    def reload(self) -> None:
+        """Ermittelt die Ordnerstruktur neu über manage_folders.sh (z.B. nach einem Update)"""
+        with self._lock:
+            self._paths = self._run_shell_bootstrap()
             
+    def get_path(self, path_type: str) -> str:
+        """Gibt den Pfad eines Verzeichnistyps zurück (z.B. "data", "photos_gallery")"""
+        path_type = PATH_ALIASES.get(path_type, path_type)
         try:
-            path = self._execute_shell_command(f"get_{path_type}_dir")
-            self._cache[path_type] = path
-            return path
-        except Exception as e:
-            logger.error(f"Fehler beim Abrufen von {path_type}_dir: {e}")
-            raise
+            return self._load()[path_type]
+        except KeyError:
+            raise FolderConfigError(f"Unbekannter Verzeichnistyp: {path_type}")
+            
+    def get_paths(self) -> Dict[str, str]:
+        """Gibt alle bekannten Verzeichnisse zurück"""
+        return dict(self._load())
+        
+    def _create_missing_directories(self) -> List[str]:
+        """Legt fehlende Verzeichnisse an und gibt die nicht anlegbaren zurück"""
+        failed = []
+        for path_type, path in self._load().items():
+            if path_type in UNMANAGED_PATH_TYPES or os.path.isdir(path):
+                continue
+            try:
+                os.makedirs(path, mode=0o755, exist_ok=True)
+                logger.info(f"Verzeichnis angelegt: {path}")
+            except OSError as e:
+                logger.warning(f"Verzeichnis {path} konnte nicht angelegt werden: {e}")
+                failed.append(path)
+        return failed
             
     def ensure_folder_structure(self) -> None:
-        """Stellt sicher, dass alle benötigten Verzeichnisse existieren"""
+        """Stellt sicher, dass alle benötigten Verzeichnisse existieren
+        
+        Fehlende Verzeichnisse werden direkt angelegt. Gelingt das nicht, wird die
+        Ordnerstruktur über manage_folders.sh neu ermittelt (die Shell weicht dann
+        auf ihre Ersatzpfade aus).
+        """
         try:
-            self._execute_shell_command("init_folders")
+            if self._create_missing_directories():
+                self.reload()
+                failed = self._create_missing_directories()
+                if failed:
+                    raise FolderConfigError(f"Verzeichnisse konnten nicht angelegt werden: {', '.join(failed)}")
         except Exception as e:
             logger.error(f"Fehler bei Verzeichnisinitialisierung: {e}")
             raise
 
-# Globale Instanz und Convenience-Funktionen
-_folder_manager = FolderManager()
+# Globale Instanz (wird beim ersten Zugriff erzeugt und von allen Modulen geteilt)
+_folder_manager: Optional[FolderManager] = None
+_folder_manager_lock = threading.Lock()
 
+def get_folder_manager() -> FolderManager:
+    """Gibt die gemeinsame FolderManager-Instanz des Prozesses zurück"""
+    global _folder_manager
+    if _folder_manager is None:
+        with _folder_manager_lock:
+            if _folder_manager is None:
+                _folder_manager = FolderManager()
+    return _folder_manager
+
+# Convenience-Funktionen
+def get_install_dir() -> str:
+    return get_folder_manager().get_path("install")
+    
+def get_script_dir() -> str:
+    return get_folder_manager().get_path("script")
+    
 def get_data_dir() -> str:
-    return _folder_manager.get_path("data")
+    return get_folder_manager().get_path("data")
     
 def get_config_dir() -> str:
-    return _folder_manager.get_path("config")
+    return get_folder_manager().get_path("config")
+    
+def get_conf_dir() -> str:
+    return get_folder_manager().get_path("config")
+    
+def get_camera_conf_dir() -> str:
+    return get_folder_manager().get_path("camera_conf")
+    
+def get_nginx_conf_dir() -> str:
+    return get_folder_manager().get_path("nginx_conf")
+    
+def get_template_dir() -> str:
+    return get_folder_manager().get_path("template")
     
 def get_backup_dir() -> str:
-    return _folder_manager.get_path("backup")
+    return get_folder_manager().get_path("backup")
     
 def get_log_dir() -> str:
-    return _folder_manager.get_path("log")
+    return get_folder_manager().get_path("log")
+    
+def get_tmp_dir() -> str:
+    return get_folder_manager().get_path("tmp")
+    
+def get_frontend_dir() -> str:
+    return get_folder_manager().get_path("frontend")
     
 def get_photos_dir() -> str:
-    return _folder_manager.get_path("photos")
+    return get_folder_manager().get_path("photos")
+    
+def get_photos_originals_dir() -> str:
+    return get_folder_manager().get_path("photos_originals")
     
 def get_photos_gallery_dir() -> str:
-    return _folder_manager.get_path("gallery")
+    return get_folder_manager().get_path("photos_gallery")
     
 def ensure_folder_structure() -> None:
-    _folder_manager.ensure_folder_structure()
+    get_folder_manager().ensure_folder_structure()
+    
+def reload_folder_config() -> None:
+    get_folder_manager().reload()
@@ -0,0 +1,146 @@
+"""
+manage_http.py - Antwortoptimierung für die Fotobox2-API
+
+Dieses Modul enthält die Middleware, die app.create_app() für jede Antwort
+ausführt:
+
+    ETag      - JSON-Antworten erhalten einen schwachen ETag. ApiResponse setzt
+                ihn selbst (ohne den sekündlich wechselnden Zeitstempel), für
+                andere JSON-Antworten wird er aus dem Inhalt berechnet.
+    304       - Stimmt If-None-Match mit dem ETag überein, wird nur ein leeres
+                304 Not Modified gesendet; gestreamte Listen werden dann gar
+                nicht erst serialisiert.
+    gzip      - Komprimierbare Antworten (JSON, Text) ab COMPRESS_MIN_SIZE
+                werden mit gzip bzw. deflate komprimiert, gestreamte Antworten
+                fortlaufend. Bilder (JPEG, MJPEG-Vorschau) und Server-Sent
+                Events bleiben unkomprimiert.
+
+Außerdem TrustedProxyFix, das die X-Forwarded-*-Kopfzeilen nur vom lokalen
+nginx übernimmt. Direkte Clients könnten sonst mit einem gefälschten
+X-Forwarded-For die Login-Begrenzung je Adresse und die Beschränkung von
+/metrics auf lokale Adressen umgehen.
+
+Der ETag bezieht sich auf den unkomprimierten Inhalt und gilt daher (schwach)
+für alle Kodierungen.
+"""
+
+import os
+import zlib
+import hashlib
+import logging
+from typing import Iterable, Iterator
+
+from flask import request, Response
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+# Logger konfigurieren
+logger = logging.getLogger(__name__)
+
+# Kleinere Antworten werden nicht komprimiert (Kopfdaten überwiegen)
+COMPRESS_MIN_SIZE = int(os.environ.get('FOTOBOX_COMPRESS_MIN_SIZE', 1024))
+
+# Kompressionsstufe (1-9); niedrig gehalten, da die Fotobox oft auf einem Raspberry Pi läuft
+COMPRESS_LEVEL = int(os.environ.get('FOTOBOX_COMPRESS_LEVEL', 5))
+
+# Unterstützte Kodierungen in der bevorzugten Reihenfolge und ihre zlib-Formate
+ENCODINGS = {
+    'gzip': 31,
+    'deflate': 15,
+}
+
+# Komprimierbare Inhaltstypen (Bilder und Videostreams sind bereits komprimiert)
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/javascript', 'image/svg+xml')
+COMPRESSIBLE_PREFIXES = ('text/',)
+
+# Nie komprimieren: Live-Streams, bei denen jedes Stück sofort beim Client ankommen muss
+UNCOMPRESSED_MIMETYPES = ('text/event-stream', 'multipart/x-mixed-replace')
+
+# Adressen, von denen X-Forwarded-* übernommen wird (nginx auf demselben Gerät)
+TRUSTED_PROXIES = ('127.0.0.1', '::1')
+
+# Kopfzeilen, die eine 304-Antwort von der ursprünglichen Antwort übernimmt
+NOT_MODIFIED_HEADERS = ('ETag', 'Cache-Control', 'Vary', 'Expires', 'Content-Location')
+
+class TrustedProxyFix(ProxyFix):
+    """ProxyFix, das nur Anfragen vertrauenswürdiger Proxys (TRUSTED_PROXIES) umschreibt"""
+
+    def __call__(self, environ, start_response):
+        if environ.get('REMOTE_ADDR') not in TRUSTED_PROXIES:
+            return self.app(environ, start_response)
+        return super().__call__(environ, start_response)
+
+def weak_etag(*parts: bytes) -> str:
+    """Berechnet den Wert eines schwachen ETags aus Inhaltsstücken"""
+    digest = hashlib.blake2b(digest_size=12)
+    for part in parts:
+        digest.update(part)
+    return digest.hexdigest()
+
+def _is_compressible(mimetype: str) -> bool:
+    if not mimetype or mimetype in UNCOMPRESSED_MIMETYPES:
+        return False
+    return mimetype in COMPRESSIBLE_MIMETYPES or mimetype.startswith(COMPRESSIBLE_PREFIXES)
+
+def _iter_compressed(chunks: Iterable[bytes], wbits: int) -> Iterator[bytes]:
+    compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, wbits)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def _add_etag(response: Response) -> None:
+    """Setzt einen schwachen ETag für vollständig vorliegende JSON-Antworten ohne ETag"""
+    if response.is_streamed or response.mimetype != 'application/json' or 'ETag' in response.headers:
+        return
+    response.set_etag(weak_etag(response.get_data()), weak=True)
+
+def _not_modified(response: Response) -> Response:
+    not_modified = Response(status=304)
+    for header in NOT_MODIFIED_HEADERS:
+        value = response.headers.get(header)
+        if value is not None:
+            not_modified.headers[header] = value
+    # Nicht verbrauchte Generatoren (gestreamte Listen) freigeben
+    response.close()
+    return not_modified
+
+def _compress(response: Response) -> None:
+    """Komprimiert die Antwort, falls Client und Inhalt es zulassen"""
+    if 'Content-Encoding' in response.headers or not _is_compressible(response.mimetype):
+        return
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(list(ENCODINGS))
+    if encoding is None:
+        return
+    wbits = ENCODINGS[encoding]
+    if response.is_streamed:
+        response.response = _iter_compressed(response.response, wbits)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return
+        response.set_data(b''.join(_iter_compressed((data,), wbits)))
+    response.headers['Content-Encoding'] = encoding
+
+def process_response(response: Response) -> Response:
+    """Middleware für app.after_request: ETag, 304 Not Modified und Kompression"""
+    # send_file/send_from_directory behandeln bedingte Anfragen selbst
+    if response.direct_passthrough or response.status_code != 200:
+        return response
+
+    if request.method in ('GET', 'HEAD'):
+        _add_etag(response)
+        etag, _ = response.get_etag()
+        if etag is not None:
+            if 'Cache-Control' not in response.headers:
+                # Zwischenspeichern erlaubt, aber vor jeder Verwendung nachfragen
+                response.headers['Cache-Control'] = 'private, no-cache'
+            if request.if_none_match.contains_weak(etag):
+                return _not_modified(response)
+
+    _compress(response)
+    return response
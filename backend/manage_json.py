@@ -0,0 +1,238 @@
+"""
+manage_json.py - JSON-Serialisierung für Fotobox2
+
+Dieses Modul bündelt die Umwandlung von API-Daten in JSON:
+
+    - orjson wird verwendet, wenn es installiert ist (deutlich schneller als
+      das json-Modul der Standardbibliothek), sonst json mit kompakter Ausgabe
+    - Dataclasses, Objekte mit __slots__ oder to_dict(), Datumswerte, Mengen,
+      Pfade usw. werden direkt serialisiert, ohne sie vorher in Dicts zu kopieren
+    - große Listen können abschnittsweise ausgegeben werden (iter_json_array),
+      statt den gesamten Antworttext im Speicher aufzubauen
+    - serialisierte Antworttexte unveränderlicher Ressourcen werden je
+      Schlüssel und Version zwischengespeichert (cached_dumps)
+
+Über init_app wird der Serializer auch als JSON-Provider der Flask-App
+gesetzt, sodass jsonify denselben Weg nimmt.
+"""
+
+import os
+import json
+import enum
+import time
+import uuid
+import logging
+import threading
+import dataclasses
+from collections import OrderedDict
+from datetime import date, datetime
+from datetime import time as dt_time
+from decimal import Decimal
+from pathlib import PurePath
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import manage_metrics
+
+# Logger konfigurieren
+logger = logging.getLogger(__name__)
+
+# Optionaler schneller Encoder
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# JSON-Provider-Schnittstelle von Flask (ab Flask 2.2)
+try:
+    from flask.json.provider import JSONProvider
+    JSON_PROVIDER_AVAILABLE = True
+except ImportError:
+    JSONProvider = object
+    JSON_PROVIDER_AVAILABLE = False
+
+# Anzahl der Listeneinträge, die iter_json_array gemeinsam ausgibt
+STREAM_CHUNK_SIZE = int(os.environ.get('FOTOBOX_JSON_STREAM_CHUNK', 256))
+
+# Maximale Anzahl zwischengespeicherter Antworttexte
+BODY_CACHE_SIZE = int(os.environ.get('FOTOBOX_JSON_CACHE_SIZE', 128))
+
+JSON_CACHE_REQUESTS = manage_metrics.counter(
+    'fotobox_json_cache_requests_total', 'Zugriffe auf zwischengespeicherte JSON-Antworten', ('result',))
+
+if ORJSON_AVAILABLE:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | getattr(orjson, 'OPT_SERIALIZE_NUMPY', 0)
+
+# Attributnamen aus __slots__ je Klasse (einschließlich Basisklassen)
+_slot_names: Dict[type, Tuple[str, ...]] = {}
+
+def _get_slot_names(cls: type) -> Tuple[str, ...]:
+    names = _slot_names.get(cls)
+    if names is None:
+        collected = []
+        for klass in reversed(cls.__mro__):
+            slots = klass.__dict__.get('__slots__', ())
+            if isinstance(slots, str):
+                slots = (slots,)
+            collected.extend(name for name in slots
+                             if name not in ('__dict__', '__weakref__') and name not in collected)
+        names = _slot_names[cls] = tuple(collected)
+    return names
+
+def default(obj: Any) -> Any:
+    """Wandelt Objekte um, die der Encoder nicht selbst kennt
+
+    Verschachtelte Werte werden nicht kopiert; der Encoder ruft default
+    für sie bei Bedarf erneut auf.
+
+    Raises:
+        TypeError: Wenn das Objekt nicht serialisierbar ist
+    """
+    to_dict = getattr(obj, 'to_dict', None)
+    if callable(to_dict):
+        return to_dict()
+    cls = type(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return {field.name: getattr(obj, field.name) for field in dataclasses.fields(obj)}
+    if isinstance(obj, (datetime, date, dt_time)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (PurePath, uuid.UUID)):
+        return str(obj)
+    if hasattr(cls, '__slots__'):
+        names = _get_slot_names(cls)
+        if names:
+            return {name: getattr(obj, name) for name in names if hasattr(obj, name)}
+    raise TypeError(f"Object of type {cls.__name__} is not JSON serializable")
+
+_encoder = json.JSONEncoder(default=default, ensure_ascii=False, separators=(',', ':'))
+
+def dumps(obj: Any) -> bytes:
+    """Serialisiert obj als UTF-8-kodiertes JSON"""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(obj, default=default, option=_ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # z.B. Ganzzahlen über 64 Bit, die nur das json-Modul beherrscht
+            pass
+    return _encoder.encode(obj).encode('utf-8')
+
+def loads(data: Any) -> Any:
+    """Liest JSON aus str, bytes oder bytearray"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def iter_json_array(items: Iterable[Any], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """Gibt eine Liste abschnittsweise als JSON-Array aus
+
+    Es wird immer nur ein Abschnitt von chunk_size Einträgen serialisiert,
+    items kann daher auch ein Generator (z.B. über einen Datenbank-Cursor) sein.
+    """
+    yield b'['
+    chunk = []
+    first = True
+    for item in items:
+        chunk.append(dumps(item))
+        if len(chunk) >= chunk_size:
+            yield (b'' if first else b',') + b','.join(chunk)
+            first = False
+            chunk = []
+    if chunk:
+        yield (b'' if first else b',') + b','.join(chunk)
+    yield b']'
+
+# Zeitstempel der API-Antworten, einmal je Sekunde formatiert: (Sekunde, Text, JSON)
+_timestamp: Tuple[int, str, bytes] = (-1, '', b'""')
+
+def _current_timestamp() -> Tuple[int, str, bytes]:
+    global _timestamp
+    second = int(time.time())
+    cached = _timestamp
+    if cached[0] != second:
+        text = datetime.fromtimestamp(second).isoformat()
+        cached = _timestamp = (second, text, b'"' + text.encode('ascii') + b'"')
+    return cached
+
+def current_timestamp() -> str:
+    """Aktueller Zeitpunkt im ISO-Format (sekundengenau, je Sekunde nur einmal formatiert)"""
+    return _current_timestamp()[1]
+
+def current_timestamp_json() -> bytes:
+    """Wie current_timestamp, bereits als JSON-String kodiert"""
+    return _current_timestamp()[2]
+
+class ResponseBodyCache:
+    """Zwischenspeicher für serialisierte JSON-Texte unveränderlicher Ressourcen
+
+    Ein Eintrag gilt, solange die übergebene Version gleich bleibt (z.B. ein
+    Änderungszähler oder die mtime einer Datei). Die ältesten Einträge
+    werden verworfen, sobald max_entries erreicht ist.
+    """
+
+    def __init__(self, max_entries: int = BODY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Any, Tuple[Any, bytes]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: Any, version: Any, build: Callable[[], Any]) -> bytes:
+        """Gibt den JSON-Text zu key zurück und serialisiert build() nur bei neuer Version"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                JSON_CACHE_REQUESTS.inc(result='hit')
+                return entry[1]
+        JSON_CACHE_REQUESTS.inc(result='miss')
+        body = dumps(build())
+        with self._lock:
+            self._entries[key] = (version, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return body
+
+    def invalidate(self, key: Any = None) -> None:
+        """Verwirft einen Eintrag (bzw. ohne key alle Einträge)"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+# Globale Instanz
+_body_cache = ResponseBodyCache()
+
+def cached_dumps(key: Any, version: Any, build: Callable[[], Any]) -> bytes:
+    """Serialisiert build() einmal je (key, version) und liefert danach den gespeicherten Text"""
+    return _body_cache.get_or_build(key, version, build)
+
+def invalidate_cache(key: Any = None) -> None:
+    """Verwirft zwischengespeicherte Antworttexte"""
+    _body_cache.invalidate(key)
+
+class FotoboxJSONProvider(JSONProvider):
+    """JSON-Provider für Flask (jsonify, request.get_json) auf Basis von dumps/loads"""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype='application/json')
+
+def init_app(app) -> None:
+    """Setzt den Fotobox-Serializer als JSON-Provider der Flask-App"""
+    if not JSON_PROVIDER_AVAILABLE:
+        logger.info("Flask ohne JSON-Provider-Schnittstelle, jsonify verwendet den Standard-Encoder")
+        return
+    app.json = FotoboxJSONProvider(app)
+    logger.debug(f"JSON-Provider gesetzt (orjson: {'ja' if ORJSON_AVAILABLE else 'nein'})")
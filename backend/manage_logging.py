@@ -7,23 +7,40 @@
 
 import os
 import logging
+import logging.handlers
 import json
+import re
+import html
+import csv
+import io
+import zlib
+import glob
+import copy
 import sqlite3
-from datetime import datetime
+import queue
+import atexit
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, date, timedelta
 import traceback
 
+import manage_metrics
+
 # Initialisiere Basis-Logging für Bootstrapping-Phase
 bootstrap_logger = logging.getLogger('bootstrap')
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(logging.Formatter('[%(levelname)s] %(message)s'))
 bootstrap_logger.addHandler(console_handler)
 bootstrap_logger.setLevel(logging.INFO)
+bootstrap_logger.propagate = False
 
 # Pfadkonfiguration über das zentrale Verzeichnismanagement
 try:
-    from manage_folders import get_log_dir, get_data_dir
+    from manage_folders import get_log_dir, get_data_dir, get_backup_dir
     LOG_DIR = get_log_dir()
     DB_DIR = get_data_dir()
+    BACKUP_DIR = get_backup_dir()
     
     # Stelle sicher, dass die Verzeichnisse existieren
     os.makedirs(LOG_DIR, exist_ok=True)
@@ -37,6 +54,7 @@ except ImportError as e:
     # Fallback falls manage_folders nicht verfügbar ist
     LOG_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'log'))
     DB_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
+    BACKUP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backup'))
     
     try:
         os.makedirs(LOG_DIR, exist_ok=True)
@@ -47,38 +65,546 @@ except ImportError as e:
         raise
 
 DB_PATH = os.path.join(DB_DIR, 'fotobox_logs.db')
-LOG_FILE = os.path.join(LOG_DIR, f"{datetime.now().strftime('%Y-%m-%d')}_fotobox.log")
-DEBUG_LOG_FILE = os.path.join(LOG_DIR, f"{datetime.now().strftime('%Y-%m-%d')}_fotobox_debug.log")
+
+# Dateinamen als strftime-Vorlagen; der Wechsel erfolgt um Mitternacht, passend zu lib_core.sh
+LOG_FILE_PATTERN = "%Y-%m-%d_fotobox.log"
+DEBUG_LOG_FILE_PATTERN = "%Y-%m-%d_fotobox_debug.log"
+JSON_LOG_FILE_PATTERN = "%Y-%m-%d_fotobox.jsonl"
+LOG_RETENTION_DAYS = int(os.environ.get('FOTOBOX_LOG_RETENTION_DAYS', 30))
+
+# JSON-Lines-Ausgabe zusätzlich zur Textdatei (z.B. für Log-Sammler)
+LOG_JSON_LINES = os.environ.get('FOTOBOX_LOG_JSON', '').lower() in ('1', 'true', 'yes')
 
 # Logging-Level konfigurieren - kann aus einer Konfigurationsdatei geladen werden
 DEFAULT_LOG_LEVEL = logging.INFO
 
-try:
-    # Setup für Dateilogging
-    file_handler = logging.FileHandler(LOG_FILE)
+# Maximale Anzahl wartender Logeinträge zwischen Aufrufer und Listener-Thread
+LOG_RECORD_QUEUE_SIZE = int(os.environ.get('FOTOBOX_LOG_RECORD_QUEUE_SIZE', 10000))
+
+VALID_LOG_LEVELS = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']
+
+class DailyFileHandler(logging.FileHandler):
+    """
+    FileHandler, der um Mitternacht in eine neue, datierte Datei wechselt
+    
+    Beim Wechsel werden Dateien, die älter als retention_days sind, gelöscht.
+    """
+
+    def __init__(self, directory, pattern, retention_days=LOG_RETENTION_DAYS, encoding='utf-8'):
+        self.directory = directory
+        self.pattern = pattern
+        self.retention_days = retention_days
+        self._next_rollover = self._compute_rollover(time.time())
+        super().__init__(self._current_filename(), encoding=encoding, delay=True)
+
+    def _current_filename(self, now=None):
+        moment = datetime.fromtimestamp(now) if now is not None else datetime.now()
+        return os.path.join(self.directory, moment.strftime(self.pattern))
+
+    @staticmethod
+    def _compute_rollover(now):
+        tomorrow = datetime.fromtimestamp(now).date() + timedelta(days=1)
+        return datetime.combine(tomorrow, datetime.min.time()).timestamp()
+
+    def emit(self, record):
+        if record.created >= self._next_rollover:
+            self._rollover(record.created)
+        super().emit(record)
+
+    def _rollover(self, now):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        self.baseFilename = self._current_filename(now)
+        self._next_rollover = self._compute_rollover(now)
+        self._remove_old_files()
+
+    def _remove_old_files(self):
+        """Löscht datierte Logdateien außerhalb des Aufbewahrungszeitraums"""
+        if self.retention_days <= 0:
+            return
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).strftime(self.pattern)
+        for path in glob.glob(os.path.join(self.directory, '*' + os.path.splitext(self.pattern)[1])):
+            name = os.path.basename(path)
+            # Gleiche Vorlage, aber älteres Datum (Datumspräfix ist lexikografisch sortierbar)
+            if len(name) == len(cutoff) and name[10:] == cutoff[10:] and name < cutoff:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    bootstrap_logger.warning(f"Alte Logdatei {path} konnte nicht gelöscht werden: {e}")
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formatiert Logeinträge als einzelne JSON-Zeilen"""
+
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+            "thread": record.threadName
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class _RecordQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler, der auf dem aufrufenden Thread nur das Nötigste erledigt
+    
+    Die Nachricht wird mit ihren Argumenten zusammengesetzt (diese könnten sich
+    sonst noch ändern); Formatierung, Tracebacks und Datei-I/O übernimmt der
+    Listener-Thread. Bei voller Warteschlange wird der Eintrag verworfen.
+    """
+
+    dropped = 0
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        if _listener_pid != os.getpid():
+            # Nach fork() läuft der Listener des Elternprozesses hier nicht
+            _start_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _RecordQueueHandler.dropped += 1
+
+# Anzahl der letzten Logeinträge, die neuen Live-Zuhörern vorab geliefert werden können
+LIVE_LOG_BUFFER_SIZE = int(os.environ.get('FOTOBOX_LIVE_LOG_BUFFER', 500))
+
+# Mehrprozessbetrieb (gunicorn, siehe fotobox_server.py): Live-Log und Log-Level
+# werden über Dateien im Log-Verzeichnis zwischen allen Server-Prozessen geteilt
+LOG_SHARED = os.environ.get('FOTOBOX_LOG_SHARED', '').lower() in ('1', 'true', 'yes')
+LIVE_LOG_FILE = os.path.join(LOG_DIR, 'fotobox_live.jsonl')
+LIVE_LOG_MAX_BYTES = int(os.environ.get('FOTOBOX_LIVE_LOG_MAX_BYTES', 1024 * 1024))
+LIVE_LOG_POLL_INTERVAL = 0.25  # Sekunden
+LOG_LEVELS_FILE = os.path.join(LOG_DIR, 'fotobox_log_levels.json')
+LOG_LEVELS_POLL_INTERVAL = 2.0  # Sekunden
+_log_shared = LOG_SHARED
+
+class LiveLogHandler(logging.Handler):
+    """
+    Verteilt Logeinträge im Listener-Thread an Live-Zuhörer (z.B. /api/logs/stream)
+    
+    Die letzten Einträge werden in einem Ringpuffer gehalten. Jeder Zuhörer hat eine
+    eigene, begrenzte Warteschlange; läuft sie über, werden Einträge verworfen und
+    gezählt, statt die Logging-Pipeline aufzuhalten.
+    
+    Im Mehrprozessbetrieb wird jeder Eintrag zusätzlich an LIVE_LOG_FILE angehängt,
+    der die Zuhörer aller Prozesse folgen.
+    """
+
+    def __init__(self, buffer_size=LIVE_LOG_BUFFER_SIZE):
+        super().__init__()
+        self.buffer = deque(maxlen=buffer_size)
+        self.listeners = []
+        self.sequence = 0
+        self._listeners_lock = threading.Lock()
+
+    def emit(self, record):
+        try:
+            self.sequence += 1
+            entry = {
+                "id": self.sequence,
+                "timestamp": datetime.fromtimestamp(record.created).isoformat(),
+                "level": record.levelname,
+                "levelno": record.levelno,
+                "source": getattr(record, 'source', None) or record.name,
+                "message": record.getMessage(),
+                "pid": os.getpid()
+            }
+            if record.exc_text:
+                entry["exception"] = record.exc_text
+            self.buffer.append(entry)
+            
+            with self._listeners_lock:
+                listeners = list(self.listeners)
+            for listener in listeners:
+                listener.offer(entry)
+            if _log_shared:
+                self._append_shared(entry)
+        except Exception:
+            self.handleError(record)
+            
+    @staticmethod
+    def _append_shared(entry):
+        """Hängt den Eintrag an die gemeinsame Live-Logdatei an und rotiert sie bei Bedarf"""
+        line = (json.dumps(entry, ensure_ascii=False, default=str) + "\n").encode('utf-8')
+        # Bei jedem Eintrag neu öffnen, damit nach einer Rotation die neue Datei verwendet wird
+        fd = os.open(LIVE_LOG_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+            stat = os.fstat(fd)
+        finally:
+            os.close(fd)
+        if stat.st_size > LIVE_LOG_MAX_BYTES:
+            try:
+                # Nur rotieren, wenn nicht bereits ein anderer Prozess rotiert hat
+                if os.stat(LIVE_LOG_FILE).st_ino == stat.st_ino:
+                    os.replace(LIVE_LOG_FILE, LIVE_LOG_FILE + '.1')
+            except FileNotFoundError:
+                pass
+
+    def add_listener(self, listener):
+        with self._listeners_lock:
+            self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self._listeners_lock:
+            if listener in self.listeners:
+                self.listeners.remove(listener)
+
+class _LiveLogListener:
+    """Gefilterte, begrenzte Warteschlange eines Live-Zuhörers"""
+
+    def __init__(self, min_level, source, max_pending):
+        self.min_level = min_level
+        self.source = source
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+
+    def matches(self, entry):
+        return entry["levelno"] >= self.min_level and (not self.source or entry["source"] == self.source)
+
+    def offer(self, entry):
+        if not self.matches(entry):
+            return
+        try:
+            self.pending.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+_live_handler = LiveLogHandler()
+
+def _parse_live_lines(data):
+    for line in data.split(b'\n'):
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+def _iter_shared_live_logs(listener, replay, heartbeat):
+    """Folgt der gemeinsamen Live-Logdatei aller Prozesse (wie tail -F)"""
+    stream = open(LIVE_LOG_FILE, 'a+b')
+    try:
+        recent = deque(maxlen=replay)
+        if replay:
+            try:
+                with open(LIVE_LOG_FILE + '.1', 'rb') as rotated:
+                    recent.extend(e for e in _parse_live_lines(rotated.read()) if listener.matches(e))
+            except FileNotFoundError:
+                pass
+        stream.seek(0)
+        complete, _, pending = stream.read().rpartition(b'\n')
+        recent.extend(e for e in _parse_live_lines(complete) if listener.matches(e))
+        yield from recent
+        
+        idle_since = time.monotonic()
+        while True:
+            data = stream.read()
+            if data:
+                complete, _, pending = (pending + data).rpartition(b'\n')
+                for entry in _parse_live_lines(complete):
+                    if listener.matches(entry):
+                        idle_since = time.monotonic()
+                        yield entry
+                continue
+            try:
+                rotated = os.stat(LIVE_LOG_FILE).st_ino != os.fstat(stream.fileno()).st_ino
+            except FileNotFoundError:
+                rotated = True
+            if rotated:
+                # Die alte Datei ist vollständig gelesen, weiter mit der neuen
+                stream.close()
+                stream = open(LIVE_LOG_FILE, 'a+b')
+                stream.seek(0)
+                pending = b''
+                continue
+            if time.monotonic() - idle_since >= heartbeat:
+                idle_since = time.monotonic()
+                yield None
+            time.sleep(LIVE_LOG_POLL_INTERVAL)
+    finally:
+        stream.close()
+
+def iter_live_logs(level=None, source=None, replay=50, heartbeat=15.0, max_pending=1000):
+    """
+    Liefert neue Logeinträge als Generator (ohne Datenbankzugriff)
+    
+    Im Mehrprozessbetrieb (enable_shared_logging) kommen die Einträge aller
+    Server-Prozesse aus LIVE_LOG_FILE, sonst die dieses Prozesses aus dem
+    Ringpuffer des LiveLogHandler.
+    
+    Args:
+        level: Optional - Mindest-Log-Level (z.B. "WARNING")
+        source: Optional - Nur Einträge dieser Quelle (Quelle oder Loggername)
+        replay: Anzahl der letzten passenden Einträge, die zuerst geliefert werden
+        heartbeat: Sekunden ohne Eintrag, nach denen None geliefert wird
+        max_pending: Maximale Anzahl wartender Einträge
+        
+    Yields:
+        Logeintrag als Dict, {'dropped': n} nach verworfenen Einträgen oder None
+        
+    Raises:
+        ValueError: Bei ungültigem Log-Level
+    """
+    min_level = logging.NOTSET
+    if level:
+        if level.upper() not in VALID_LOG_LEVELS:
+            raise ValueError(f"Ungültiges Log-Level: {level}")
+        min_level = getattr(logging, level.upper())
+    
+    listener = _LiveLogListener(min_level, source, max_pending)
+    if _log_shared:
+        yield from _iter_shared_live_logs(listener, replay, heartbeat)
+        return
+    # Erst anmelden, dann den Puffer lesen: Doppelte werden über die ID aussortiert
+    _live_handler.add_listener(listener)
+    try:
+        last_id = 0
+        if replay:
+            for entry in [e for e in list(_live_handler.buffer) if listener.matches(e)][-replay:]:
+                last_id = entry["id"]
+                yield entry
+        
+        while True:
+            try:
+                entry = listener.pending.get(timeout=heartbeat)
+            except queue.Empty:
+                yield None
+                continue
+            if listener.dropped:
+                dropped, listener.dropped = listener.dropped, 0
+                yield {"dropped": dropped}
+            if entry["id"] > last_id:
+                last_id = entry["id"]
+                yield entry
+    finally:
+        _live_handler.remove_listener(listener)
+
+logger = logging.getLogger('fotobox')
+
+_record_queue = queue.Queue(maxsize=LOG_RECORD_QUEUE_SIZE)
+_queue_handler = _RecordQueueHandler(_record_queue)
+_listener = None
+_listener_pid = None
+_listener_lock = threading.Lock()
+_json_lines = LOG_JSON_LINES
+
+# Modulspezifische Log-Level (Loggername -> Levelname)
+_module_levels = {}
+
+def _build_handlers():
+    """Erstellt die Handler, die im Listener-Thread ausgeführt werden"""
+    file_handler = DailyFileHandler(LOG_DIR, LOG_FILE_PATTERN)
     file_handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(message)s'))
 
-    # Setup für Debug-Logging
-    debug_handler = logging.FileHandler(DEBUG_LOG_FILE)
+    debug_handler = DailyFileHandler(LOG_DIR, DEBUG_LOG_FILE_PATTERN)
     debug_handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(message)s - %(pathname)s:%(lineno)d'))
     debug_handler.setLevel(logging.DEBUG)
 
-    # Root Logger konfigurieren
-    logger = logging.getLogger('fotobox')
-    logger.setLevel(DEFAULT_LOG_LEVEL)
-    logger.addHandler(file_handler)
-    logger.addHandler(debug_handler)
-    logger.addHandler(console_handler)
+    handlers = [file_handler, debug_handler, console_handler, _live_handler]
+    if _json_lines:
+        json_handler = DailyFileHandler(LOG_DIR, JSON_LOG_FILE_PATTERN)
+        json_handler.setFormatter(JsonLinesFormatter())
+        handlers.append(json_handler)
+    return handlers
+
+def _start_listener():
+    """Startet den Listener-Thread (neu), der die Logeinträge formatiert und schreibt"""
+    global _listener, _listener_pid
+
+    with _listener_lock:
+        if _listener is not None and _listener_pid == os.getpid():
+            _listener.stop()
+        _listener = logging.handlers.QueueListener(_record_queue, *_build_handlers(), respect_handler_level=True)
+        _listener_pid = os.getpid()
+        _listener.start()
+    if _log_shared:
+        _start_level_watcher()
+
+def _stop_listener():
+    """Schreibt ausstehende Einträge und beendet den Listener-Thread"""
+    global _listener
+
+    with _listener_lock:
+        if _listener is not None and _listener_pid == os.getpid():
+            _listener.stop()
+        _listener = None
+
+# Zuletzt übernommener Stand von LOG_LEVELS_FILE (mtime in ns) und Watcher-Thread je Prozess
+_levels_mtime = None
+_level_watcher_pid = None
+
+def _save_shared_levels():
+    """Schreibt die aktuellen Log-Level für die anderen Server-Prozesse nach LOG_LEVELS_FILE"""
+    global _levels_mtime
+
+    if not _log_shared:
+        return
+    data = {
+        "level": logging.getLevelName(logging.getLogger().level),
+        "modules": dict(_module_levels)
+    }
+    temp_path = f"{LOG_LEVELS_FILE}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(temp_path, LOG_LEVELS_FILE)
+        _levels_mtime = os.stat(LOG_LEVELS_FILE).st_mtime_ns
+    except OSError as e:
+        bootstrap_logger.warning(f"Log-Level konnten nicht geteilt werden: {e}")
+
+def _apply_shared_levels():
+    """Übernimmt die Log-Level aus LOG_LEVELS_FILE, falls ein anderer Prozess sie geändert hat"""
+    global _levels_mtime
+
+    try:
+        mtime = os.stat(LOG_LEVELS_FILE).st_mtime_ns
+        if mtime == _levels_mtime:
+            return
+        with open(LOG_LEVELS_FILE, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return
+    _levels_mtime = mtime
+    level = str(data.get("level", "")).upper()
+    if level in VALID_LOG_LEVELS:
+        logging.getLogger().setLevel(getattr(logging, level))
+    modules = {name: str(value).upper() for name, value in data.get("modules", {}).items()
+               if str(value).upper() in VALID_LOG_LEVELS}
+    for name in [n for n in _module_levels if n not in modules]:
+        logging.getLogger(name).setLevel(logging.NOTSET)
+        del _module_levels[name]
+    for name, module_level in modules.items():
+        logging.getLogger(name).setLevel(getattr(logging, module_level))
+        _module_levels[name] = module_level
+
+def _watch_shared_levels():
+    while True:
+        time.sleep(LOG_LEVELS_POLL_INTERVAL)
+        _apply_shared_levels()
+
+def _start_level_watcher():
+    """Startet (nach fork erneut) den Thread, der geänderte Log-Level übernimmt"""
+    global _level_watcher_pid
+
+    if _level_watcher_pid == os.getpid():
+        return
+    _level_watcher_pid = os.getpid()
+    _apply_shared_levels()
+    threading.Thread(target=_watch_shared_levels, name='fotobox-log-levels', daemon=True).start()
+
+def enable_shared_logging():
+    """
+    Schaltet auf den Mehrprozessbetrieb um (von fotobox_server.py vor dem Start der Worker)
     
+    Live-Log und Log-Level werden danach über LIVE_LOG_FILE bzw. LOG_LEVELS_FILE
+    mit allen Server-Prozessen geteilt. Kindprozesse erben die Einstellung über
+    FOTOBOX_LOG_SHARED; die aktuellen Level dieses Prozesses gelten als Startstand.
+    """
+    global _log_shared
+
+    os.environ['FOTOBOX_LOG_SHARED'] = '1'
+    _log_shared = True
+    _save_shared_levels()
+    _start_level_watcher()
+
+def _parse_module_levels(spec):
+    """Liest Modul-Level im Format "modul=LEVEL,modul2=LEVEL" """
+    levels = {}
+    for part in (spec or '').split(','):
+        if '=' in part:
+            name, level = part.split('=', 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def setup_logging(level=None, json_lines=None, module_levels=None):
+    """
+    Richtet die Logging-Pipeline ein: alle Logger schreiben über eine Warteschlange,
+    ein Listener-Thread formatiert die Einträge und schreibt die Dateien
+    
+    Kann mehrfach aufgerufen werden; Handler werden dabei nur einmal angehängt.
+    
+    Args:
+        level: Optional - Globales Log-Level (z.B. "DEBUG")
+        json_lines: Optional - Zusätzliche Ausgabe als JSON-Lines-Datei
+        module_levels: Optional - Dict Loggername -> Log-Level
+            (Standard: Umgebungsvariable FOTOBOX_LOG_LEVELS)
+    """
+    global _json_lines
+
+    root = logging.getLogger()
+    if _queue_handler not in root.handlers:
+        root.addHandler(_queue_handler)
+        root.setLevel(DEFAULT_LOG_LEVEL)
+        # Der fotobox-Logger schreibt über den Root-Logger und erbt dessen Level
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        logger.setLevel(logging.NOTSET)
+        logger.propagate = True
+
+    if json_lines is not None and json_lines != _json_lines:
+        _json_lines = json_lines
+        _start_listener()
+    elif _listener is None or _listener_pid != os.getpid():
+        _start_listener()
+
+    if level:
+        set_log_level(level)
+    if module_levels is None:
+        # Im Mehrprozessbetrieb gilt der bereits übernommene gemeinsame Stand
+        module_levels = {} if _levels_mtime is not None else _parse_module_levels(os.environ.get('FOTOBOX_LOG_LEVELS'))
+    for name, module_level in module_levels.items():
+        set_module_log_level(name, module_level)
+
+def get_log_file(debug=False):
+    """
+    Gibt den Pfad der aktuellen Logdatei zurück
+    
+    Args:
+        debug: True für die Debug-Logdatei
+        
+    Returns:
+        Pfad der Logdatei des heutigen Tages
+    """
+    pattern = DEBUG_LOG_FILE_PATTERN if debug else LOG_FILE_PATTERN
+    return os.path.join(LOG_DIR, datetime.now().strftime(pattern))
+
+try:
+    setup_logging()
+    atexit.register(_stop_listener)
     bootstrap_logger.info("Logging-System erfolgreich initialisiert")
     
 except Exception as e:
     bootstrap_logger.error(f"Fehler bei der Logger-Initialisierung: {e}")
     raise
 
+# Aufbewahrungsdauer der Logeinträge in der Datenbank (Tage, 0 = unbegrenzt)
+LOG_DB_RETENTION_DAYS = int(os.environ.get('FOTOBOX_LOG_DB_RETENTION_DAYS', 90))
+RETENTION_CHECK_INTERVAL = 3600  # Sekunden
+RETENTION_DELETE_CHUNK = 5000
+
+# Zwischengespeicherte Anzahl je Filter: Filter -> (Anzahl, höchste gezählte ID, Löschzähler)
+COUNT_CACHE_SIZE = 128
+_count_cache = OrderedDict()
+_count_cache_lock = threading.Lock()
+
 def _init_db():
     """
     Initialisiert die Datenbank für die Log-Speicherung
+    
+    Neben der Tabelle logs wird je Kalendertag eine Partition (zusammenhängender
+    ID-Bereich mit Anzahl) in log_partitions geführt. Darüber werden Zählungen
+    ohne Tabellenscan beantwortet und alte Tage als Ganzes gelöscht.
     """
     try:
         conn = sqlite3.connect(DB_PATH)
@@ -94,15 +620,396 @@ def _init_db():
             user_id TEXT
         )
         ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON logs (timestamp)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_logs_level_timestamp ON logs (level, timestamp)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_logs_source_timestamp ON logs (source, timestamp)")
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS log_partitions (
+            day TEXT PRIMARY KEY,
+            min_id INTEGER NOT NULL,
+            max_id INTEGER NOT NULL,
+            row_count INTEGER NOT NULL
+        )
+        ''')
+        # Zähler, den jedes Löschen erhöht (prozessübergreifende Gültigkeit von _count_cache)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS log_meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+        ''')
+        
+        _init_fts(cursor)
+        
+        # Einmalige Übernahme bestehender Einträge (ältere Installationen)
+        if cursor.execute("SELECT 1 FROM log_partitions LIMIT 1").fetchone() is None:
+            cursor.execute('''
+            INSERT INTO log_partitions (day, min_id, max_id, row_count)
+            SELECT substr(timestamp, 1, 10), MIN(id), MAX(id), COUNT(*) FROM logs GROUP BY 1
+            ''')
         conn.commit()
         conn.close()
     except Exception as e:
         # Fallback zu Dateilogging, wenn DB nicht verfügbar ist
         logger.error(f"Fehler bei DB-Initialisierung: {e}")
 
+_FTS_DELETE_TRIGGER = '''
+CREATE TRIGGER IF NOT EXISTS logs_fts_delete AFTER DELETE ON logs BEGIN
+    INSERT INTO logs_fts (logs_fts, rowid, message, context) VALUES ('delete', old.id, old.message, old.context);
+END
+'''
+
+def _init_fts(cursor):
+    """
+    Legt den Volltextindex logs_fts (FTS5) über Nachricht und Kontext an
+    
+    Der Index verweist auf die Tabelle logs (external content) und speichert
+    den Text daher nicht doppelt. Trigger halten ihn bei jedem Einfügen und
+    Löschen aktuell, auch bei Retention und clear_logs. Der JSON-Kontext wird
+    vom Tokenizer in seine Schlüssel und Werte zerlegt.
+    """
+    try:
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'logs_fts'"
+        ).fetchone()
+        # Fehlt der Lösch-Trigger, wurde clear_logs unterbrochen (siehe _clear_all_logs)
+        interrupted = exists and not cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'logs_fts_delete'"
+        ).fetchone()
+        cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS logs_fts USING fts5(
+            message, context, content='logs', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        )
+        ''')
+        cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS logs_fts_insert AFTER INSERT ON logs BEGIN
+            INSERT INTO logs_fts (rowid, message, context) VALUES (new.id, new.message, new.context);
+        END
+        ''')
+        cursor.execute(_FTS_DELETE_TRIGGER)
+        if not exists or interrupted:
+            # Bestehende Einträge (neu) indizieren
+            cursor.execute("INSERT INTO logs_fts (logs_fts) VALUES ('rebuild')")
+    except sqlite3.OperationalError as e:
+        # SQLite ohne FTS5: Logging funktioniert weiter, nur die Suche fehlt
+        logger.warning(f"Volltextindex für Logs nicht verfügbar: {e}")
+
+def _update_partitions(conn, batch, last_id):
+    """Trägt einen gerade geschriebenen Stapel in die Tagespartitionen ein
+    
+    Der Stapel wurde in einer Transaktion von der einzigen schreibenden
+    Verbindung eingefügt, seine IDs sind daher lückenlos aufsteigend.
+    """
+    partitions = {}
+    next_id = last_id - len(batch) + 1
+    for row in batch:
+        day = row[0][:10]
+        if day in partitions:
+            min_id, _, row_count = partitions[day]
+            partitions[day] = (min_id, next_id, row_count + 1)
+        else:
+            partitions[day] = (next_id, next_id, 1)
+        next_id += 1
+
+    conn.executemany('''
+        INSERT INTO log_partitions (day, min_id, max_id, row_count) VALUES (?, ?, ?, ?)
+        ON CONFLICT(day) DO UPDATE SET
+            min_id = MIN(min_id, excluded.min_id),
+            max_id = MAX(max_id, excluded.max_id),
+            row_count = row_count + excluded.row_count
+    ''', [(day,) + values for day, values in partitions.items()])
+
+def _refresh_partitions(conn, days=None):
+    """Berechnet Tagespartitionen nach gezieltem Löschen neu (nur innerhalb ihrer ID-Bereiche)"""
+    query = "SELECT day, min_id, max_id FROM log_partitions"
+    params = []
+    if days is not None:
+        query += f" WHERE day IN ({','.join('?' * len(days))})"
+        params = list(days)
+    for day, min_id, max_id in conn.execute(query, params).fetchall():
+        new_min, new_max, row_count = conn.execute(
+            "SELECT MIN(id), MAX(id), COUNT(*) FROM logs WHERE id BETWEEN ? AND ? AND substr(timestamp, 1, 10) = ?",
+            (min_id, max_id, day)
+        ).fetchone()
+        if row_count:
+            conn.execute(
+                "UPDATE log_partitions SET min_id = ?, max_id = ?, row_count = ? WHERE day = ?",
+                (new_min, new_max, row_count, day)
+            )
+        else:
+            conn.execute("DELETE FROM log_partitions WHERE day = ?", (day,))
+
+def _drop_partitions(conn, before_day):
+    """Löscht alle Tagespartitionen vor dem angegebenen Tag über ihre ID-Bereiche
+    
+    Returns:
+        Anzahl gelöschter Logeinträge
+    """
+    deleted = 0
+    partitions = conn.execute(
+        "SELECT day, min_id, max_id FROM log_partitions WHERE day < ? ORDER BY day", (before_day,)
+    ).fetchall()
+    for day, min_id, max_id in partitions:
+        # Zeitstempel zusätzlich prüfen, falls sich ID-Bereiche bei verstellter Uhr überlappen
+        deleted += _delete_id_range(conn, min_id, max_id, "timestamp < ?", (before_day,))
+        with conn:
+            conn.execute("DELETE FROM log_partitions WHERE day = ?", (day,))
+    if partitions:
+        _invalidate_count_cache()
+    return deleted
+
+def _delete_id_range(conn, min_id, max_id, condition=None, params=()):
+    """Löscht Logeinträge eines ID-Bereichs in Teilstücken
+
+    Jedes Teilstück ist eine eigene kurze Transaktion, damit der Writer nicht
+    lange blockiert wird, und erhöht den Löschzähler.
+
+    Returns:
+        Anzahl gelöschter Logeinträge
+    """
+    deleted = 0
+    query = "DELETE FROM logs WHERE id BETWEEN ? AND ?"
+    if condition:
+        query += " AND " + condition
+    for start in range(min_id, max_id + 1, RETENTION_DELETE_CHUNK):
+        end = min(start + RETENTION_DELETE_CHUNK - 1, max_id)
+        with conn:
+            count = conn.execute(query, (start, end) + tuple(params)).rowcount
+            if count:
+                _bump_delete_generation(conn)
+        deleted += count
+    return deleted
+
+def _clear_all_logs(conn):
+    """Löscht alle Logeinträge, die beim Aufruf vorhanden sind
+
+    Der Volltextindex wird vorab mit 'delete-all' geleert und der Lösch-Trigger
+    bis zum Ende entfernt; sonst würde jede Zeile einzeln aus dem Index
+    ausgetragen. Die Einträge selbst werden in Teilstücken gelöscht. Einträge,
+    die währenddessen geschrieben werden, bleiben erhalten und indiziert.
+
+    Returns:
+        Anzahl gelöschter Logeinträge
+    """
+    has_fts = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'logs_fts'"
+    ).fetchone() is not None
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        min_id, max_id = conn.execute("SELECT MIN(id), MAX(id) FROM logs").fetchone()
+        if has_fts and max_id is not None:
+            conn.execute("DROP TRIGGER IF EXISTS logs_fts_delete")
+            conn.execute("INSERT INTO logs_fts (logs_fts) VALUES ('delete-all')")
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    if max_id is None:
+        return 0
+    try:
+        deleted = _delete_id_range(conn, min_id, max_id)
+    finally:
+        if has_fts:
+            conn.execute(_FTS_DELETE_TRIGGER)
+    with conn:
+        _refresh_partitions(conn)
+    return deleted
+
+def _bump_delete_generation(conn):
+    """Erhöht den Löschzähler (in der Transaktion des Aufrufers)"""
+    conn.execute(
+        "INSERT INTO log_meta (key, value) VALUES ('delete_generation', 1) "
+        "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+    )
+
+def _get_delete_generation(conn):
+    row = conn.execute("SELECT value FROM log_meta WHERE key = 'delete_generation'").fetchone()
+    return row[0] if row else 0
+
+def _invalidate_count_cache():
+    """Verwirft alle zwischengespeicherten Zählungen (nach dem Löschen von Einträgen)"""
+    with _count_cache_lock:
+        _count_cache.clear()
+
+# Asynchroner Log-Writer: Logeinträge werden in eine Warteschlange gestellt und von
+# einem Hintergrund-Thread gesammelt in einer Transaktion geschrieben. Aufrufer
+# (z.B. Kameraaufnahmen) warten so nie auf Datenbank- oder Festplattenzugriffe.
+LOG_QUEUE_SIZE = int(os.environ.get('FOTOBOX_LOG_QUEUE_SIZE', 10000))
+LOG_BATCH_SIZE = int(os.environ.get('FOTOBOX_LOG_BATCH_SIZE', 200))
+LOG_FLUSH_INTERVAL = float(os.environ.get('FOTOBOX_LOG_FLUSH_INTERVAL', 0.25))  # Sekunden
+
+_log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+_writer_thread = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_writer_stats = {"written": 0, "dropped": 0, "failed": 0, "batches": 0}
+
+# Metriken des Log-Writers
+manage_metrics.gauge('fotobox_log_queue_depth', 'Wartende Logeinträge für die Datenbank').set_function(
+    lambda: _log_queue.qsize())
+manage_metrics.gauge('fotobox_log_entries_dropped', 'Verworfene Logeinträge (Warteschlange voll)').set_function(
+    lambda: _writer_stats["dropped"])
+
+# Markierung in der Warteschlange zum Beenden des Writers
+_STOP = object()
+
+def _count(name, amount=1):
+    """Erhöht einen Zähler der Writer-Statistik"""
+    with _stats_lock:
+        _writer_stats[name] += amount
+
+def _open_writer_connection():
+    """Öffnet die dauerhafte Verbindung des Log-Writers"""
+    conn = sqlite3.connect(DB_PATH)
+    # WAL mit synchronous=NORMAL: kein fsync pro Commit, Lesezugriffe blockieren nicht
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+def _write_batch(conn, batch):
+    """Schreibt einen Stapel Logeinträge in einer Transaktion"""
+    start = time.perf_counter()
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT INTO logs (timestamp, level, message, context, source, user_id) VALUES (?, ?, ?, ?, ?, ?)",
+                batch
+            )
+            last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            _update_partitions(conn, batch, last_id)
+        manage_metrics.DB_QUERY_DURATION.observe(time.perf_counter() - start, db='logs', operation='INSERT')
+        _count("written", len(batch))
+        _count("batches")
+    except Exception as e:
+        _count("failed", len(batch))
+        # Nur in die Logdateien schreiben, sonst entstünde eine Schleife
+        logger.error(f"Fehler beim Speichern von {len(batch)} Logs in DB: {e}")
+
+def _writer_loop():
+    """Sammelt Logeinträge und schreibt sie alle LOG_FLUSH_INTERVAL bzw. LOG_BATCH_SIZE Einträge"""
+    conn = None
+    running = True
+    next_retention = 0.0
+    while running:
+        item = _log_queue.get()
+        batch = []
+        waiters = []
+        deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+
+        # Weitere Einträge sammeln, bis der Stapel voll oder das Intervall abgelaufen ist
+        while True:
+            if item is _STOP:
+                running = False
+                break
+            if isinstance(item, threading.Event):
+                waiters.append(item)
+                break
+            batch.append(item)
+            if len(batch) >= LOG_BATCH_SIZE:
+                break
+            remaining = deadline - time.monotonic()
+            try:
+                item = _log_queue.get(timeout=remaining) if remaining > 0 else _log_queue.get_nowait()
+            except queue.Empty:
+                break
+
+        if batch:
+            try:
+                if conn is None:
+                    conn = _open_writer_connection()
+                _write_batch(conn, batch)
+            except Exception as e:
+                _count("failed", len(batch))
+                logger.error(f"Fehler beim Öffnen der Log-Datenbank: {e}")
+                conn = None
+
+        # Abgelaufene Tage gelegentlich auf der Writer-Verbindung entfernen
+        if conn is not None and LOG_DB_RETENTION_DAYS > 0 and time.monotonic() >= next_retention:
+            next_retention = time.monotonic() + RETENTION_CHECK_INTERVAL
+            try:
+                _drop_partitions(conn, _retention_cutoff(LOG_DB_RETENTION_DAYS))
+            except Exception as e:
+                logger.error(f"Fehler beim Entfernen alter Logs: {e}")
+
+        for waiter in waiters:
+            waiter.set()
+
+    if conn is not None:
+        conn.close()
+
+def _ensure_writer():
+    """Startet den Writer-Thread bei Bedarf (auch neu nach einem fork())"""
+    global _writer_thread, _writer_pid
+
+    if _writer_thread is not None and _writer_pid == os.getpid():
+        return
+    with _writer_lock:
+        if _writer_thread is not None and _writer_pid == os.getpid():
+            return
+        _writer_thread = threading.Thread(target=_writer_loop, name="log-db-writer", daemon=True)
+        _writer_pid = os.getpid()
+        _writer_thread.start()
+
+def flush_logs(timeout=5.0):
+    """
+    Wartet, bis alle bisher übergebenen Logeinträge in der Datenbank stehen
+    
+    Args:
+        timeout: Maximale Wartezeit in Sekunden
+        
+    Returns:
+        Boolean, ob alle Einträge geschrieben wurden
+    """
+    if _writer_thread is None or _writer_pid != os.getpid() or not _writer_thread.is_alive():
+        return True
+    done = threading.Event()
+    try:
+        _log_queue.put(done, timeout=timeout)
+    except queue.Full:
+        return False
+    return done.wait(timeout)
+
+def shutdown_log_writer(timeout=5.0):
+    """
+    Schreibt ausstehende Logeinträge und beendet den Writer-Thread
+    
+    Args:
+        timeout: Maximale Wartezeit in Sekunden
+    """
+    global _writer_thread
+
+    thread = _writer_thread
+    if thread is None or _writer_pid != os.getpid() or not thread.is_alive():
+        return
+    try:
+        _log_queue.put(_STOP, timeout=timeout)
+        thread.join(timeout)
+    except queue.Full:
+        logger.warning("Log-Writer konnte nicht rechtzeitig beendet werden")
+    _writer_thread = None
+
+atexit.register(shutdown_log_writer)
+
+def get_log_writer_stats():
+    """
+    Gibt die Statistik des asynchronen Log-Writers zurück
+    
+    Returns:
+        Dict mit geschriebenen, verworfenen und fehlgeschlagenen Einträgen,
+        Anzahl der Transaktionen und aktueller Länge der Warteschlange
+    """
+    with _stats_lock:
+        stats = dict(_writer_stats)
+    stats["queued"] = _log_queue.qsize()
+    return stats
+
 def _store_log_in_db(level, message, context=None, source=None, user_id=None):
     """
-    Speichert einen Logeintrag in der Datenbank
+    Übergibt einen Logeintrag an den asynchronen Log-Writer
+    
+    Ist die Warteschlange voll, wird der Eintrag verworfen und gezählt,
+    statt den Aufrufer zu blockieren.
     
     Args:
         level: Log-Level (INFO, WARNING, ERROR, etc.)
@@ -112,20 +1019,21 @@ def _store_log_in_db(level, message, context=None, source=None, user_id=None):
         user_id: Optionale Benutzer-ID
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
         timestamp = datetime.now().isoformat()
-        context_json = json.dumps(context) if context else None
-        cursor.execute(
-            "INSERT INTO logs (timestamp, level, message, context, source, user_id) VALUES (?, ?, ?, ?, ?, ?)",
-            (timestamp, level, message, context_json, source, user_id)
-        )
-        conn.commit()
-        conn.close()
+        # Kontext sofort serialisieren, da der Aufrufer das Dict danach verändern kann
+        context_json = json.dumps(context, default=str, ensure_ascii=False) if context else None
+        _ensure_writer()
+        _log_queue.put_nowait((timestamp, level, message, context_json, source, user_id))
+    except queue.Full:
+        _count("dropped")
     except Exception as e:
         # Falls ein Fehler beim DB-Speichern auftritt, loggen wir in die Datei
         logger.error(f"Fehler beim Speichern des Logs in DB: {e}")
 
+def _source_logger(source):
+    """Logger für source, damit modulspezifische Log-Level (set_module_log_level) greifen"""
+    return logging.getLogger(source) if source else logger
+
 def log(message, context=None, source=None, user_id=None):
     """
     Loggt eine Informationsnachricht
@@ -136,7 +1044,7 @@ def log(message, context=None, source=None, user_id=None):
         source: Quelle des Logs (Funktion, Modul, etc.)
         user_id: Optionale Benutzer-ID
     """
-    logger.info(message)
+    _source_logger(source).info(message, extra={"source": source})
     _store_log_in_db("INFO", message, context, source, user_id)
 
 def error(message, exception=None, context=None, source=None, user_id=None):
@@ -160,9 +1068,9 @@ def error(message, exception=None, context=None, source=None, user_id=None):
             context.update(error_details)
         else:
             context = error_details
-        logger.error(f"{message}: {exception}")
+        _source_logger(source).error(f"{message}: {exception}", extra={"source": source})
     else:
-        logger.error(message)
+        _source_logger(source).error(message, extra={"source": source})
     
     _store_log_in_db("ERROR", message, context, source, user_id)
 
@@ -176,7 +1084,7 @@ def warn(message, context=None, source=None, user_id=None):
         source: Quelle des Logs (Funktion, Modul, etc.)
         user_id: Optionale Benutzer-ID
     """
-    logger.warning(message)
+    _source_logger(source).warning(message, extra={"source": source})
     _store_log_in_db("WARNING", message, context, source, user_id)
 
 def debug(message, context=None, source=None, user_id=None):
@@ -189,58 +1097,137 @@ def debug(message, context=None, source=None, user_id=None):
         source: Quelle des Logs (Funktion, Modul, etc.)
         user_id: Optionale Benutzer-ID
     """
-    logger.debug(message)
+    source_logger = _source_logger(source)
+    source_logger.debug(message, extra={"source": source})
     # Debug-Logs werden optional auch in DB gespeichert
-    if logger.level <= logging.DEBUG:
+    if source_logger.isEnabledFor(logging.DEBUG):
         _store_log_in_db("DEBUG", message, context, source, user_id)
 
-def get_logs(level=None, limit=100, offset=0, start_date=None, end_date=None, source=None):
+def _retention_cutoff(retention_days):
+    """Erster Tag (YYYY-MM-DD), der bei der angegebenen Aufbewahrungsdauer erhalten bleibt"""
+    return (date.today() - timedelta(days=retention_days - 1)).isoformat()
+
+def _as_day(value):
+    """Gibt YYYY-MM-DD zurück, wenn der Wert einen ganzen Tag bezeichnet, sonst None"""
+    if isinstance(value, datetime):
+        return value.date().isoformat() if value.time() == datetime.min.time() else None
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, str) and len(value) == 10:
+        return value
+    return None
+
+def _as_timestamp(value):
+    """Wandelt eine Zeitangabe in das gespeicherte ISO-Format um"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+def _build_filter(level=None, start_date=None, end_date=None, source=None):
+    """
+    Erstellt die WHERE-Bedingungen für Logabfragen
+    
+    Tagesangaben (YYYY-MM-DD bzw. datetime um Mitternacht) gelten ganztägig,
+    das Enddatum schließt den ganzen Tag ein.
+    
+    Returns:
+        Tuple (Bedingungen, Parameter, Tagesbereich oder None)
+    """
+    conditions = []
+    params = []
+    start_day = end_day = None
+    
+    if level:
+        conditions.append("level = ?")
+        params.append(level.upper())
+        
+    if start_date:
+        start_day = _as_day(start_date)
+        conditions.append("timestamp >= ?")
+        params.append(start_day or _as_timestamp(start_date))
+        
+    if end_date:
+        end_day = _as_day(end_date)
+        if end_day:
+            end_day = (date.fromisoformat(end_day) + timedelta(days=1)).isoformat()
+            conditions.append("timestamp < ?")
+            params.append(end_day)
+        else:
+            conditions.append("timestamp <= ?")
+            params.append(_as_timestamp(end_date))
+        
+    if source:
+        conditions.append("source = ?")
+        params.append(source)
+    
+    day_aligned = (not start_date or start_day) and (not end_date or end_day)
+    day_range = (start_day, end_day) if day_aligned else None
+    return conditions, params, day_range
+
+def encode_log_cursor(entry):
     """
-    Ruft Logs aus der Datenbank ab
+    Erzeugt den Cursor für die nächste Seite aus dem letzten Logeintrag einer Seite
+    
+    Args:
+        entry: Logeintrag (Dict mit timestamp und id)
+        
+    Returns:
+        Cursor-String
+    """
+    return f"{entry['timestamp']}|{entry['id']}"
+
+def decode_log_cursor(cursor):
+    """
+    Zerlegt einen Cursor in Zeitstempel und ID
+    
+    Raises:
+        ValueError: Bei ungültigem Cursor
+    """
+    timestamp, separator, log_id = str(cursor).rpartition('|')
+    if not separator or not timestamp:
+        raise ValueError(f"Ungültiger Cursor: {cursor}")
+    return timestamp, int(log_id)
+
+def get_logs(level=None, limit=100, offset=0, start_date=None, end_date=None, source=None, cursor=None):
+    """
+    Ruft Logs aus der Datenbank ab (neueste zuerst)
+    
+    Mit cursor wird per Keyset-Paginierung ab dem letzten Eintrag der vorigen
+    Seite gelesen; die Kosten hängen dann nicht von der Position in der Tabelle ab.
     
     Args:
         level: Optional - Filter nach Log-Level
         limit: Maximale Anzahl zurückzugebender Logs
-        offset: Offset für Paginierung
-        start_date: Filter - Logs nach diesem Datum (ISO-Format)
-        end_date: Filter - Logs vor diesem Datum (ISO-Format)
+        offset: Offset für Paginierung (nur ohne cursor)
+        start_date: Filter - Logs ab diesem Datum (ISO-Format)
+        end_date: Filter - Logs bis zu diesem Datum (ISO-Format)
         source: Filter nach Log-Quelle
+        cursor: Optional - Cursor aus encode_log_cursor()
         
     Returns:
         Liste von Logeinträgen
     """
+    query = "SELECT id, timestamp, level, message, context, source, user_id FROM logs"
+    conditions, params, _ = _build_filter(level, start_date, end_date, source)
+    
+    if cursor:
+        timestamp, log_id = decode_log_cursor(cursor)
+        conditions.append("(timestamp, id) < (?, ?)")
+        params.extend([timestamp, log_id])
+        offset = 0
+    
     try:
         conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        query = "SELECT id, timestamp, level, message, context, source, user_id FROM logs"
-        conditions = []
-        params = []
-        
-        if level:
-            conditions.append("level = ?")
-            params.append(level)
-            
-        if start_date:
-            conditions.append("timestamp >= ?")
-            params.append(start_date)
-            
-        if end_date:
-            conditions.append("timestamp <= ?")
-            params.append(end_date)
-            
-        if source:
-            conditions.append("source = ?")
-            params.append(source)
+        cursor_db = conn.cursor()
             
         if conditions:
             query += " WHERE " + " AND ".join(conditions)
             
-        query += " ORDER BY timestamp DESC LIMIT ? OFFSET ?"
+        query += " ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?"
         params.extend([limit, offset])
         
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
+        cursor_db.execute(query, params)
+        rows = cursor_db.fetchall()
         
         logs = []
         for row in rows:
@@ -261,38 +1248,420 @@ def get_logs(level=None, limit=100, offset=0, start_date=None, end_date=None, so
         logger.error(f"Fehler beim Abrufen der Logs: {e}")
         return []
 
-def clear_logs(older_than=None):
+def get_log_count(level=None, start_date=None, end_date=None, source=None):
+    """
+    Zählt Logeinträge für einen Filter
+    
+    Ganztägige Zeiträume ohne weitere Filter werden aus den Tagespartitionen
+    summiert. Andere Filter werden je Filter zwischengespeichert und danach
+    nur noch um die seitdem hinzugekommenen Einträge ergänzt. Hat seitdem ein
+    beliebiger Prozess Einträge gelöscht (Löschzähler in log_meta), wird neu gezählt.
+    
+    Args:
+        level: Optional - Filter nach Log-Level
+        start_date: Filter - Logs ab diesem Datum
+        end_date: Filter - Logs bis zu diesem Datum
+        source: Filter nach Log-Quelle
+        
+    Returns:
+        Anzahl der Logeinträge
+    """
+    conditions, params, day_range = _build_filter(level, start_date, end_date, source)
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            if day_range is not None and not level and not source:
+                start_day, end_day = day_range
+                query = "SELECT COALESCE(SUM(row_count), 0) FROM log_partitions WHERE day >= ?"
+                partition_params = [start_day or '']
+                if end_day:
+                    query += " AND day < ?"
+                    partition_params.append(end_day)
+                return conn.execute(query, partition_params).fetchone()[0]
+            
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'logs'").fetchone()
+            max_id = row[0] if row else 0
+            generation = _get_delete_generation(conn)
+            cache_key = (level, _as_timestamp(start_date) if start_date else None,
+                         _as_timestamp(end_date) if end_date else None, source)
+            
+            with _count_cache_lock:
+                cached_count, cached_max_id, cached_generation = _count_cache.get(cache_key, (0, 0, None))
+            if cached_generation != generation:
+                cached_count, cached_max_id = 0, 0
+            elif cached_max_id == max_id:
+                return cached_count
+            
+            # Nur Einträge zählen, die seit der letzten Zählung hinzugekommen sind
+            query = "SELECT COUNT(*) FROM logs WHERE id > ? AND id <= ?"
+            if conditions:
+                query += " AND " + " AND ".join(conditions)
+            count = cached_count + conn.execute(query, [cached_max_id, max_id] + params).fetchone()[0]
+            
+            with _count_cache_lock:
+                _count_cache[cache_key] = (count, max_id, generation)
+                _count_cache.move_to_end(cache_key)
+                while len(_count_cache) > COUNT_CACHE_SIZE:
+                    _count_cache.popitem(last=False)
+            return count
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.error(f"Fehler beim Zählen der Logs: {e}")
+        return 0
+
+def get_log_sources():
+    """
+    Ruft alle vorhandenen Log-Quellen ab
+    
+    Returns:
+        Sortierte Liste der Quellen
+    """
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            rows = conn.execute(
+                "SELECT DISTINCT source FROM logs WHERE source IS NOT NULL ORDER BY source"
+            ).fetchall()
+            return [row[0] for row in rows]
+        finally:
+            conn.close()
+    except Exception as e:
+        logger.error(f"Fehler beim Abrufen der Log-Quellen: {e}")
+        return []
+
+def clear_logs(older_than=None, source=None):
     """
     Löscht Logs aus der Datenbank
     
+    Es wird immer über ID-Bereiche in Teilstücken gelöscht; ganze Tage vor
+    older_than (ohne source) direkt über ihre Tagespartitionen.
+
     Args:
         older_than: Optional - Nur Logs älter als dieses Datum (ISO-Format) löschen
+        source: Optional - Nur Logs dieser Quelle löschen
         
     Returns:
         Anzahl gelöschter Logeinträge
     """
+    conn = None
     try:
+        # Noch ausstehende Einträge zuerst schreiben, damit sie mitgelöscht werden
+        flush_logs()
         conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        deleted_count = 0
         
-        if older_than:
-            cursor.execute("DELETE FROM logs WHERE timestamp < ?", (older_than,))
+        if not older_than and not source:
+            deleted_count = _clear_all_logs(conn)
         else:
-            cursor.execute("DELETE FROM logs")
+            conditions = []
+            params = []
+            affected_days = None
+            if older_than:
+                older_than = _as_timestamp(older_than)
+                if not source:
+                    deleted_count += _drop_partitions(conn, older_than[:10])
+                conditions.append("timestamp < ?")
+                params.append(older_than)
+                affected_days = [row[0] for row in conn.execute(
+                    "SELECT day FROM log_partitions WHERE day <= ?", (older_than[:10],)
+                )]
+            if source:
+                conditions.append("source = ?")
+                params.append(source)
             
-        deleted_count = cursor.rowcount
-        conn.commit()
-        conn.close()
+            min_id, max_id = conn.execute("SELECT MIN(id), MAX(id) FROM logs").fetchone()
+            if max_id is not None:
+                deleted_count += _delete_id_range(conn, min_id, max_id, " AND ".join(conditions), params)
+            with conn:
+                _refresh_partitions(conn, affected_days)
+            
+        _invalidate_count_cache()
         
         logger.info(f"{deleted_count} Logeinträge wurden gelöscht")
         return deleted_count
     except Exception as e:
         logger.error(f"Fehler beim Löschen der Logs: {e}")
         return 0
+    finally:
+        if conn is not None:
+            conn.close()
+
+def apply_log_retention(retention_days=None):
+    """
+    Löscht alle Tage, die außerhalb der Aufbewahrungsdauer liegen
+    
+    Args:
+        retention_days: Optional - Aufbewahrungsdauer in Tagen (Standard: LOG_DB_RETENTION_DAYS)
+        
+    Returns:
+        Anzahl gelöschter Logeinträge
+    """
+    retention_days = LOG_DB_RETENTION_DAYS if retention_days is None else retention_days
+    if retention_days <= 0:
+        return 0
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            deleted_count = _drop_partitions(conn, _retention_cutoff(retention_days))
+        finally:
+            conn.close()
+        if deleted_count:
+            logger.info(f"{deleted_count} Logeinträge außerhalb der Aufbewahrungsdauer gelöscht")
+        return deleted_count
+    except Exception as e:
+        logger.error(f"Fehler beim Entfernen alter Logs: {e}")
+        return 0
+
+def backup_logs(source=None):
+    """
+    Sichert die Log-Datenbank in das Backup-Verzeichnis
+    
+    Die Sicherung enthält immer alle Einträge (Online-Backup von SQLite),
+    unabhängig von der angegebenen Quelle.
+    
+    Args:
+        source: Optional - Quelle, die anschließend gelöscht werden soll (nur für den Dateinamen)
+        
+    Returns:
+        Pfad der Sicherung oder None bei Fehler
+    """
+    try:
+        flush_logs()
+        os.makedirs(BACKUP_DIR, exist_ok=True)
+        suffix = "_" + "".join(c if c.isalnum() else "_" for c in source) if source else ""
+        backup_path = os.path.join(
+            BACKUP_DIR, f"fotobox_logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}{suffix}.db"
+        )
+        src = sqlite3.connect(DB_PATH)
+        dst = sqlite3.connect(backup_path)
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
+        return backup_path
+    except Exception as e:
+        logger.error(f"Fehler beim Sichern der Logs: {e}")
+        return None
+
+# Markierungen für Treffer: FTS5 setzt zunächst Zeichen aus dem Private-Use-Bereich,
+# die nach dem HTML-Escaping durch <mark>-Tags ersetzt werden
+_MARK_START = '\ue000'
+_MARK_END = '\ue001'
+SEARCH_MAX_RESULTS = 200
+
+# Suchbegriff: "Phrase", Wort oder Präfix* (optional mit vorangestelltem -)
+_SEARCH_TOKEN = re.compile(r'(-?)(?:"([^"]*)"|(\S+?))(\*?)(?=\s|$)')
+
+def build_search_query(text):
+    """
+    Übersetzt eine Benutzereingabe in einen sicheren FTS5-Ausdruck
+    
+    Unterstützt "exakte Phrasen", Präfixe (kamera*) und Ausschlüsse (-debug);
+    alle Begriffe müssen vorkommen. Sonderzeichen der FTS5-Syntax werden
+    nie direkt übernommen.
+    
+    Args:
+        text: Suchtext
+        
+    Returns:
+        FTS5-Ausdruck
+        
+    Raises:
+        ValueError: Wenn kein Suchbegriff enthalten ist
+    """
+    include = []
+    exclude = []
+    for negate, phrase, word, prefix in _SEARCH_TOKEN.findall(text or ''):
+        term = (phrase if phrase else word).replace('"', ' ').strip()
+        if not term:
+            continue
+        expression = f'"{term}"' + ('*' if prefix else '')
+        (exclude if negate else include).append(expression)
+    if not include:
+        raise ValueError("Kein Suchbegriff angegeben")
+    query = ' '.join(include)
+    if exclude:
+        query += ' NOT ' + ' NOT '.join(exclude)
+    return query
+
+def _render_highlight(text):
+    """Escaped Text für HTML und setzt die Treffer in <mark>-Tags"""
+    if text is None:
+        return None
+    return html.escape(text).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+
+def search_logs(text, level=None, start_date=None, end_date=None, source=None, limit=50, cursor=None):
+    """
+    Durchsucht Nachricht und Kontext der Logs über den Volltextindex (neueste zuerst)
+    
+    Args:
+        text: Suchtext (siehe build_search_query)
+        level: Optional - Filter nach Log-Level
+        start_date: Filter - Logs ab diesem Datum
+        end_date: Filter - Logs bis zu diesem Datum
+        source: Filter nach Log-Quelle
+        limit: Maximale Anzahl Treffer (höchstens SEARCH_MAX_RESULTS)
+        cursor: Optional - ID des letzten Treffers der vorigen Seite
+        
+    Returns:
+        Dict mit 'results' (Logeinträge mit 'highlight' und 'context_snippet')
+        und 'next_cursor'
+        
+    Raises:
+        ValueError: Bei leerem Suchtext oder ungültigem Cursor
+    """
+    match = build_search_query(text)
+    limit = max(1, min(int(limit), SEARCH_MAX_RESULTS))
+    conditions, params, _ = _build_filter(level, start_date, end_date, source)
+    conditions = ["l." + condition for condition in conditions]
+    if cursor:
+        conditions.append("logs_fts.rowid < ?")
+        params.append(int(cursor))
+    
+    query = f'''
+        SELECT l.id, l.timestamp, l.level, l.message, l.context, l.source, l.user_id,
+               highlight(logs_fts, 0, ?, ?),
+               snippet(logs_fts, 1, ?, ?, '…', 16)
+        FROM logs_fts JOIN logs l ON l.id = logs_fts.rowid
+        WHERE logs_fts MATCH ? {''.join(' AND ' + c for c in conditions)}
+        ORDER BY logs_fts.rowid DESC
+        LIMIT ?
+    '''
+    
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        rows = conn.execute(
+            query, [_MARK_START, _MARK_END, _MARK_START, _MARK_END, match] + params + [limit]
+        ).fetchall()
+    finally:
+        conn.close()
+    
+    results = []
+    for row in rows:
+        results.append({
+            "id": row[0],
+            "timestamp": row[1],
+            "level": row[2],
+            "message": row[3],
+            "context": json.loads(row[4]) if row[4] else None,
+            "source": row[5],
+            "user_id": row[6],
+            "highlight": _render_highlight(row[7]),
+            "context_snippet": _render_highlight(row[8]) if row[4] and _MARK_START in (row[8] or '') else None
+        })
+    
+    return {
+        "results": results,
+        "next_cursor": results[-1]["id"] if len(results) == limit else None
+    }
+
+# Formate für den Log-Export: Dateiendung -> MIME-Typ
+EXPORT_FORMATS = {
+    'json': 'application/json',
+    'csv': 'text/csv',
+    'txt': 'text/plain'
+}
+EXPORT_FIELDS = ['id', 'timestamp', 'level', 'source', 'user_id', 'message', 'context']
+EXPORT_CHUNK_SIZE = 500
+
+def iter_export_logs(format_type='json', level=None, start_date=None, end_date=None, source=None,
+                     chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Exportiert Logs als Generator von Textstücken (älteste zuerst)
+    
+    Die Einträge werden blockweise vom Datenbank-Cursor gelesen und sofort
+    formatiert; der Speicherbedarf ist unabhängig von der Anzahl der Einträge.
+    
+    Args:
+        format_type: 'json', 'csv' oder 'txt'
+        level: Optional - Filter nach Log-Level
+        start_date: Filter - Logs ab diesem Datum
+        end_date: Filter - Logs bis zu diesem Datum
+        source: Filter nach Log-Quelle
+        chunk_size: Anzahl Einträge je gelesenem Block
+        
+    Yields:
+        Formatierte Textstücke
+        
+    Raises:
+        ValueError: Bei unbekanntem Format
+    """
+    if format_type not in EXPORT_FORMATS:
+        raise ValueError(f"Ungültiges Format: {format_type}")
+    
+    conditions, params, _ = _build_filter(level, start_date, end_date, source)
+    query = "SELECT id, timestamp, level, source, user_id, message, context FROM logs"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY timestamp, id"
+    
+    # Bereits übergebene Einträge sollen im Export enthalten sein
+    flush_logs()
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        cursor = conn.execute(query, params)
+        first = True
+        if format_type == 'json':
+            yield '['
+        elif format_type == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_FIELDS)
+            yield buffer.getvalue()
+        
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            
+            if format_type == 'json':
+                parts = []
+                for row in rows:
+                    entry = dict(zip(EXPORT_FIELDS, row))
+                    entry['context'] = json.loads(row[6]) if row[6] else None
+                    parts.append(json.dumps(entry, ensure_ascii=False))
+                yield ('\n' if first else ',\n') + ',\n'.join(parts)
+            elif format_type == 'csv':
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(rows)
+                yield buffer.getvalue()
+            else:
+                yield ''.join(
+                    f"{row[1]} [{row[2]}] {f'({row[3]}) ' if row[3] else ''}{row[5]}"
+                    f"{f' {row[6]}' if row[6] else ''}\n"
+                    for row in rows
+                )
+            first = False
+        
+        if format_type == 'json':
+            yield '\n]\n' if not first else ']\n'
+    finally:
+        conn.close()
+
+def iter_gzip(chunks, level=6):
+    """
+    Komprimiert einen Generator von Textstücken fortlaufend im gzip-Format
+    
+    Args:
+        chunks: Iterierbare Textstücke
+        level: Kompressionsstufe (1-9)
+        
+    Yields:
+        Komprimierte Bytes
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
 
 def set_log_level(level):
     """
-    Setzt das Log-Level
+    Setzt das globale Log-Level (im Mehrprozessbetrieb für alle Server-Prozesse)
     
     Args:
         level: Das zu setzende Log-Level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
@@ -302,12 +1671,59 @@ def set_log_level(level):
     """
     try:
         log_level = getattr(logging, level.upper())
-        logger.setLevel(log_level)
+        logging.getLogger().setLevel(log_level)
+        _save_shared_levels()
         logger.info(f"Log-Level auf {level.upper()} gesetzt")
         return True
     except (AttributeError, TypeError):
         logger.error(f"Ungültiges Log-Level: {level}")
         return False
 
+def set_module_log_level(module, level):
+    """
+    Setzt das Log-Level für ein einzelnes Modul (Loggername, z.B. "manage_camera")
+    
+    Gilt auch für log/debug/warn/error mit gleichnamiger source, da diese über
+    logging.getLogger(source) schreiben. Im Mehrprozessbetrieb übernehmen die
+    anderen Server-Prozesse das Level innerhalb von LOG_LEVELS_POLL_INTERVAL.
+    
+    Args:
+        module: Name des Loggers
+        level: Log-Level oder None, um wieder das globale Level zu verwenden
+        
+    Returns:
+        Boolean, ob das Log-Level erfolgreich gesetzt wurde
+    """
+    if not module:
+        logger.error("Kein Modul für das Log-Level angegeben")
+        return False
+    if level is None:
+        logging.getLogger(module).setLevel(logging.NOTSET)
+        _module_levels.pop(module, None)
+        _save_shared_levels()
+        logger.info(f"Log-Level für {module} zurückgesetzt")
+        return True
+    if not isinstance(level, str) or level.upper() not in VALID_LOG_LEVELS:
+        logger.error(f"Ungültiges Log-Level für {module}: {level}")
+        return False
+    logging.getLogger(module).setLevel(getattr(logging, level.upper()))
+    _module_levels[module] = level.upper()
+    _save_shared_levels()
+    logger.info(f"Log-Level für {module} auf {level.upper()} gesetzt")
+    return True
+
+def get_log_levels():
+    """
+    Gibt das globale und die modulspezifischen Log-Level zurück
+    
+    Returns:
+        Dict mit 'level', 'modules' und der Anzahl verworfener Einträge
+    """
+    return {
+        "level": logging.getLevelName(logging.getLogger().level),
+        "modules": dict(_module_levels),
+        "dropped": _RecordQueueHandler.dropped
+    }
+
 # Initialisiere die Datenbank beim Import des Moduls
 _init_db()
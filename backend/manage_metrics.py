@@ -0,0 +1,474 @@
+"""
+manage_metrics.py - Metriken (Zähler, Messwerte, Histogramme) für Fotobox2
+
+Dieses Modul stellt eine prozessweite Metrik-Registry bereit. Module registrieren
+ihre Metriken einmalig beim Import und aktualisieren sie mit geringem Aufwand
+(ein Lock, ein Dict-Zugriff). Die Ausgabe erfolgt im Prometheus-Textformat
+über den Endpunkt /metrics (api_metrics.py).
+
+Im Mehrprozessbetrieb (gunicorn, siehe fotobox_server.py) schreibt jeder
+Worker seinen Stand alle METRICS_WRITE_INTERVAL Sekunden als JSON in das
+Verzeichnis aus FOTOBOX_METRICS_DIR. /metrics führt diese Stände zusammen:
+Zähler und Histogramme werden über alle Prozesse summiert (auch beendete,
+damit die Summen nicht zurückspringen), Messwerte laufender Prozesse
+erhalten ein zusätzliches Label pid.
+"""
+
+import os
+import json
+import glob
+import math
+import atexit
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Logger konfigurieren
+logger = logging.getLogger(__name__)
+
+# Standard-Buckets für Latenzen in Sekunden
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Gemeinsames Verzeichnis der Prozess-Stände (Mehrprozessbetrieb) und Schreibintervall
+METRICS_DIR_ENV = 'FOTOBOX_METRICS_DIR'
+METRICS_WRITE_INTERVAL = float(os.environ.get('FOTOBOX_METRICS_WRITE_INTERVAL', 5))
+
+LabelValues = Tuple[str, ...]
+
+def _escape_label(value: str) -> str:
+    """Escaped einen Label-Wert für das Prometheus-Textformat"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels_text(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + '}'
+
+def _format_value(value: float) -> str:
+    """Formatiert einen Zahlenwert für das Prometheus-Textformat"""
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class Metric:
+    """Basisklasse aller Metriken mit optionalen Labels"""
+
+    metric_type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"Metrik {self.name} erwartet die Labels {self.label_names}")
+        try:
+            return tuple(str(labels[name]) for name in self.label_names)
+        except KeyError as e:
+            raise ValueError(f"Metrik {self.name}: Label {e} fehlt")
+
+    def _label_text(self, key: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+        return _labels_text(self.label_names, key, extra)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def snapshot_values(self) -> List[List[Any]]:
+        raise NotImplementedError
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Stand der Metrik als JSON-fähiges Dict (für die Zusammenführung mehrerer Prozesse)"""
+        return {
+            'type': self.metric_type,
+            'help': self.documentation,
+            'labels': list(self.label_names),
+            'values': self.snapshot_values()
+        }
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        lines.extend(self.samples())
+        return lines
+
+class Counter(Metric):
+    """Monoton steigender Zähler"""
+
+    metric_type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{self._label_text(key)} {_format_value(value)}" for key, value in values]
+
+    def snapshot_values(self) -> List[List[Any]]:
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+class Gauge(Metric):
+    """Messwert, der steigen und fallen kann
+
+    Alternativ zu set()/inc()/dec() kann mit set_function() eine Funktion
+    hinterlegt werden, die den Wert erst beim Abruf ermittelt (z.B. Warteschlangenlängen).
+    """
+
+    metric_type = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._functions: Dict[LabelValues, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float], **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = function
+
+    def get(self, **labels: Any) -> float:
+        key = self._key(labels)
+        with self._lock:
+            function = self._functions.get(key)
+            value = self._values.get(key, 0)
+        return function() if function else value
+
+    def _current_values(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, function in functions.items():
+            try:
+                values[key] = function()
+            except Exception:
+                # Ein fehlerhafter Messwert darf den Abruf der übrigen Metriken nicht verhindern
+                continue
+        return values
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{self._label_text(key)} {_format_value(value)}"
+                for key, value in sorted(self._current_values().items())]
+
+    def snapshot_values(self) -> List[List[Any]]:
+        return [[list(key), value] for key, value in self._current_values().items()]
+
+class Histogram(Metric):
+    """Verteilung von Messwerten (z.B. Latenzen) in kumulativen Buckets"""
+
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Label-Werte -> [Zähler je Bucket..., +Inf, Summe]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0] * (len(self.buckets) + 2)
+            data[index] += 1
+            data[-1] += value
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """Misst die Dauer des Blocks in Sekunden"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def get_count(self, **labels: Any) -> int:
+        with self._lock:
+            data = self._values.get(self._key(labels))
+            return int(sum(data[:-1])) if data else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, list(data)) for key, data in self._values.items())
+        lines = []
+        for key, data in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), data[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._label_text(key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {_format_value(data[-1])}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {cumulative}")
+        return lines
+
+    def snapshot_values(self) -> List[List[Any]]:
+        with self._lock:
+            return [[list(key), list(data)] for key, data in self._values.items()]
+
+    def snapshot(self) -> Dict[str, Any]:
+        snapshot = super().snapshot()
+        snapshot['buckets'] = list(self.buckets)
+        return snapshot
+
+class MetricsRegistry:
+    """Sammlung aller Metriken eines Prozesses"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._sections: Dict[str, Callable[[], Any]] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric_class, name: str, documentation: str, labels: Sequence[str], **kwargs) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_class(name, documentation, labels, **kwargs)
+            elif not isinstance(metric, metric_class) or metric.label_names != tuple(labels):
+                raise ValueError(f"Metrik {name} ist bereits mit anderem Typ oder anderen Labels registriert")
+            return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labels)
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labels)
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labels, buckets=buckets)
+
+    def render(self) -> str:
+        """Gibt alle Metriken im Prometheus-Textformat (Version 0.0.4) zurück"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def register_section(self, name: str, provider: Callable[[], Any]) -> None:
+        """Hinterlegt zusätzliche JSON-Daten, die mit dem Stand des Prozesses geteilt werden"""
+        with self._lock:
+            self._sections[name] = provider
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Stand aller Metriken und Zusatzdaten dieses Prozesses als JSON-fähiges Dict"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            sections = dict(self._sections)
+        return {
+            'pid': os.getpid(),
+            'metrics': {metric.name: metric.snapshot() for metric in metrics},
+            'sections': {name: provider() for name, provider in sections.items()}
+        }
+
+# Globale Registry
+REGISTRY = MetricsRegistry()
+
+# MIME-Typ des Prometheus-Textformats
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def counter(name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+    """Registriert einen Zähler (oder gibt den bestehenden zurück)"""
+    return REGISTRY.counter(name, documentation, labels)
+
+def gauge(name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+    """Registriert einen Messwert (oder gibt den bestehenden zurück)"""
+    return REGISTRY.gauge(name, documentation, labels)
+
+def histogram(name: str, documentation: str, labels: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    """Registriert ein Histogramm (oder gibt das bestehende zurück)"""
+    return REGISTRY.histogram(name, documentation, labels, buckets)
+
+def register_section(name: str, provider: Callable[[], Any]) -> None:
+    """Hinterlegt Zusatzdaten (z.B. die Zugriffsstatistik), die get_sections prozessübergreifend liefert"""
+    REGISTRY.register_section(name, provider)
+
+# Prozess, der seinen Stand in das gemeinsame Verzeichnis schreibt (nach fork neu)
+_export_pid: Optional[int] = None
+_write_lock = threading.Lock()
+
+def enable_shared_metrics(directory: str, clear: bool = True) -> None:
+    """Gibt das gemeinsame Verzeichnis an die Worker weiter (Hauptprozess, vor dem Start der Worker)
+
+    Args:
+        directory: Verzeichnis für die Stände der Prozesse
+        clear: Stände eines früheren Serverlaufs entfernen
+    """
+    os.makedirs(directory, exist_ok=True)
+    if clear:
+        for path in glob.glob(os.path.join(directory, '*.json')):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    os.environ[METRICS_DIR_ENV] = directory
+
+def start_shared_export() -> bool:
+    """Schreibt den Stand dieses Prozesses regelmäßig in das gemeinsame Verzeichnis
+
+    Wird von create_app in jedem Worker aufgerufen und tut nichts, wenn
+    FOTOBOX_METRICS_DIR nicht gesetzt ist (Einzelprozessbetrieb).
+    """
+    global _export_pid
+
+    directory = os.environ.get(METRICS_DIR_ENV)
+    if not directory:
+        return False
+    if _export_pid == os.getpid():
+        return True
+    _export_pid = os.getpid()
+    threading.Thread(target=_export_loop, args=(directory,), name='fotobox-metrics-export', daemon=True).start()
+    atexit.register(_write_snapshot, directory)
+    return True
+
+def _write_snapshot(directory: str) -> None:
+    if _export_pid != os.getpid():
+        return
+    path = os.path.join(directory, f"{os.getpid()}.json")
+    temp_path = path + '.tmp'
+    # Export-Thread, /metrics und atexit schreiben dieselbe Datei
+    with _write_lock:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(REGISTRY.snapshot(), f, default=str)
+        os.replace(temp_path, path)
+
+def _export_loop(directory: str) -> None:
+    while True:
+        try:
+            _write_snapshot(directory)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Metriken konnten nicht geschrieben werden: {e}")
+        time.sleep(METRICS_WRITE_INTERVAL)
+
+def _process_alive(pid: Any) -> bool:
+    try:
+        os.kill(int(pid), 0)
+    except (TypeError, ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def collect_snapshots() -> List[Dict[str, Any]]:
+    """Stände aller Prozesse (im Einzelprozessbetrieb nur der eigene)"""
+    directory = os.environ.get(METRICS_DIR_ENV)
+    if not directory or _export_pid != os.getpid():
+        return [REGISTRY.snapshot()]
+    try:
+        # Den eigenen Stand aktuell halten, die übrigen sind höchstens METRICS_WRITE_INTERVAL alt
+        _write_snapshot(directory)
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning(f"Metriken konnten nicht geschrieben werden: {e}")
+    snapshots = []
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        try:
+            with open(path, encoding='utf-8') as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+def get_sections(name: str) -> List[Any]:
+    """Zusatzdaten name aller Prozesse (siehe register_section)"""
+    return [snapshot['sections'][name] for snapshot in collect_snapshots()
+            if name in snapshot.get('sections', {})]
+
+def render_snapshots(snapshots: Sequence[Dict[str, Any]]) -> str:
+    """Führt die Stände mehrerer Prozesse zusammen und gibt sie im Prometheus-Textformat zurück"""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for snapshot in snapshots:
+        pid = str(snapshot.get('pid', ''))
+        alive = _process_alive(snapshot.get('pid')) if pid else True
+        for name, metric in snapshot.get('metrics', {}).items():
+            is_gauge = metric['type'] == 'gauge'
+            if is_gauge and not alive:
+                # Messwerte beendeter Prozesse sind nicht mehr gültig
+                continue
+            labels = list(metric['labels']) + (['pid'] if is_gauge else [])
+            target = merged.setdefault(name, {
+                'type': metric['type'], 'help': metric['help'], 'labels': labels,
+                'buckets': metric.get('buckets'), 'values': {}
+            })
+            if target['type'] != metric['type'] or target['labels'] != labels \
+                    or target['buckets'] != metric.get('buckets'):
+                # Unterschiedlicher Code-Stand der Prozesse, nicht zusammenführbar
+                continue
+            values = target['values']
+            for key, value in metric['values']:
+                key = tuple(key) + ((pid,) if is_gauge else ())
+                if target['type'] == 'histogram':
+                    existing = values.get(key)
+                    values[key] = list(value) if existing is None else [a + b for a, b in zip(existing, value)]
+                elif target['type'] == 'counter':
+                    values[key] = values.get(key, 0) + value
+                else:
+                    values[key] = value
+
+    lines: List[str] = []
+    for name in sorted(merged):
+        metric = merged[name]
+        names = metric['labels']
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for key, value in sorted(metric['values'].items()):
+            if metric['type'] != 'histogram':
+                lines.append(f"{name}{_labels_text(names, key)} {_format_value(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(list(metric['buckets']) + [math.inf], value[:-1]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels_text(names, key, ('le', _format_value(bound)))} {_format_value(cumulative)}")
+            lines.append(f"{name}_sum{_labels_text(names, key)} {_format_value(value[-1])}")
+            lines.append(f"{name}_count{_labels_text(names, key)} {_format_value(cumulative)}")
+    return '\n'.join(lines) + '\n'
+
+def render_metrics(extra: Sequence[Dict[str, Any]] = ()) -> str:
+    """Gibt alle Metriken im Prometheus-Textformat zurück
+
+    Im Mehrprozessbetrieb über alle Worker zusammengeführt; extra sind
+    Stände weiterer Prozesse (z.B. des Kamera-Daemons, siehe api_metrics).
+    """
+    if not extra and not os.environ.get(METRICS_DIR_ENV):
+        return REGISTRY.render()
+    return render_snapshots(collect_snapshots() + list(extra))
+
+# Gemeinsame Metrik für Datenbankzugriffe (Einstellungen und Logs)
+DB_QUERY_DURATION = histogram(
+    'fotobox_db_query_duration_seconds', 'Dauer der Datenbankabfragen', ('db', 'operation'),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0))
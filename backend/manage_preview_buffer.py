@@ -0,0 +1,229 @@
+"""
+manage_preview_buffer.py - Vorschaubilder im Shared Memory für Fotobox2
+
+Dieses Modul stellt einen Ringpuffer für JPEG-Vorschaubilder in einem
+multiprocessing.shared_memory-Segment bereit. Der Kamera-Daemon schreibt
+die Bilder hinein, beliebig viele HTTP-Worker lesen sie ohne Umweg über
+Sockets oder Pipes.
+
+Aufbau des Segments:
+
+    Kopf (64 Byte):  Magic, Version, Anzahl Slots, Slotgröße,
+                     Nummer des zuletzt geschriebenen Bildes,
+                     Zeitpunkt des letzten Lesezugriffs (für den Daemon),
+                     Kennung des Segments (neu bei jedem create)
+    Slots:           je Slot 32 Byte Kopf (Sequenzzähler, Bildnummer,
+                     Länge, Zeitstempel) und slot_size Byte Bilddaten
+
+Jeder Slot ist mit einem Seqlock geschützt: der Schreiber setzt den
+Sequenzzähler vor dem Schreiben auf einen ungeraden und danach auf den
+nächsten geraden Wert. Ein Leser kopiert die Daten einmal aus dem
+memoryview und prüft danach, ob sich der Zähler verändert hat; falls ja,
+wird erneut gelesen. So kostet jedes Bild je Client höchstens eine Kopie,
+und der Schreiber wartet nie auf Leser.
+"""
+
+import os
+import time
+import struct
+import logging
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+# Logger konfigurieren
+logger = logging.getLogger(__name__)
+
+# Name des Segments unter /dev/shm und Standardgrößen
+PREVIEW_BUFFER_NAME = os.environ.get('FOTOBOX_PREVIEW_SHM', 'fotobox_preview')
+PREVIEW_SLOTS = int(os.environ.get('FOTOBOX_PREVIEW_SLOTS', 4))
+PREVIEW_SLOT_SIZE = int(os.environ.get('FOTOBOX_PREVIEW_SLOT_SIZE', 1024 * 1024))
+
+_MAGIC = 0x46425056  # "FBPV"
+_VERSION = 1
+
+# magic, version, slots, slot_size, latest_frame, reader_heartbeat
+_HEADER = struct.Struct('<IIIIQd')
+_HEADER_SIZE = 64
+_LATEST_OFFSET = 16
+_HEARTBEAT_OFFSET = 24
+_SEGMENT_ID_OFFSET = 32
+
+# seq, frame, length, timestamp
+_SLOT_HEADER = struct.Struct('<QQId')
+_SLOT_HEADER_SIZE = 32
+
+_U64 = struct.Struct('<Q')
+_F64 = struct.Struct('<d')
+
+# Versuche beim Lesen, bevor aufgegeben wird (der Schreiber war zu schnell)
+_READ_RETRIES = 5
+
+class PreviewBufferError(Exception):
+    """Fehler beim Zugriff auf den Vorschau-Puffer"""
+    pass
+
+def _attach_untracked(name: str) -> shared_memory.SharedMemory:
+    """Öffnet ein bestehendes Segment, ohne es beim Prozessende zu löschen
+
+    Vor Python 3.13 registriert jeder Prozess angehängte Segmente beim
+    resource_tracker, der sie beim Beenden entfernt – auch wenn sie einem
+    anderen Prozess (hier dem Kamera-Daemon) gehören.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except Exception:
+            pass
+        return shm
+
+class PreviewFrameBuffer:
+    """Ringpuffer für Vorschaubilder im Shared Memory
+
+    Es gibt genau einen Schreiber (create) und beliebig viele Leser (attach).
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self._shm = shm
+        self._owner = owner
+        self._buf = shm.buf
+        magic, version, slots, slot_size, _, _ = _HEADER.unpack_from(self._buf, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise PreviewBufferError(f"Shared-Memory-Segment {shm.name} ist kein Vorschau-Puffer")
+        self.slots = slots
+        self.slot_size = slot_size
+        self.segment_id = _U64.unpack_from(self._buf, _SEGMENT_ID_OFFSET)[0]
+        self._frame = self.latest_frame()
+
+    @classmethod
+    def create(cls, name: str = PREVIEW_BUFFER_NAME, slots: int = PREVIEW_SLOTS,
+               slot_size: int = PREVIEW_SLOT_SIZE) -> 'PreviewFrameBuffer':
+        """Legt den Puffer an (Kamera-Daemon); ein verwaistes Segment wird ersetzt"""
+        size = _HEADER_SIZE + slots * (_SLOT_HEADER_SIZE + slot_size)
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            stale = _attach_untracked(name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        # Neue Segmente sind mit Nullen gefüllt, nur die Kopfdaten setzen
+        _HEADER.pack_into(shm.buf, 0, _MAGIC, _VERSION, slots, slot_size, 0, 0.0)
+        # Leser erkennen daran, dass ein neu gestarteter Daemon das Segment ersetzt hat
+        _U64.pack_into(shm.buf, _SEGMENT_ID_OFFSET, int.from_bytes(os.urandom(8), 'little'))
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str = PREVIEW_BUFFER_NAME) -> 'PreviewFrameBuffer':
+        """Öffnet den Puffer eines anderen Prozesses (HTTP-Worker)
+
+        Raises:
+            PreviewBufferError: Wenn der Puffer (noch) nicht existiert
+        """
+        try:
+            shm = _attach_untracked(name)
+        except FileNotFoundError:
+            raise PreviewBufferError(f"Vorschau-Puffer {name} existiert nicht")
+        return cls(shm, owner=False)
+
+    @staticmethod
+    def _slot_offset_for(index: int, slot_size: int) -> int:
+        return _HEADER_SIZE + index * (_SLOT_HEADER_SIZE + slot_size)
+
+    def _slot_offset(self, index: int) -> int:
+        return self._slot_offset_for(index, self.slot_size)
+
+    def latest_frame(self) -> int:
+        """Nummer des zuletzt vollständig geschriebenen Bildes (0 = noch keins)"""
+        return _U64.unpack_from(self._buf, _LATEST_OFFSET)[0]
+
+    def write_frame(self, data: bytes) -> int:
+        """Schreibt ein Bild in den nächsten Slot (nur der Besitzer)
+
+        Returns:
+            int: Nummer des Bildes (0, falls es nicht in einen Slot passt)
+        """
+        length = len(data)
+        if length > self.slot_size:
+            logger.warning(f"Vorschaubild zu groß für den Puffer ({length} > {self.slot_size} Bytes)")
+            return 0
+        self._frame += 1
+        frame = self._frame
+        offset = self._slot_offset(frame % self.slots)
+        seq = _U64.unpack_from(self._buf, offset)[0]
+        # Ungerader Zähler: Slot wird gerade beschrieben
+        _U64.pack_into(self._buf, offset, seq + 1)
+        data_offset = offset + _SLOT_HEADER_SIZE
+        self._buf[data_offset:data_offset + length] = data
+        _SLOT_HEADER.pack_into(self._buf, offset, seq + 1, frame, length, time.time())
+        _U64.pack_into(self._buf, offset, seq + 2)
+        _U64.pack_into(self._buf, _LATEST_OFFSET, frame)
+        return frame
+
+    def read_frame(self, frame: Optional[int] = None) -> Optional[Tuple[int, bytes, float]]:
+        """Liest ein Bild (Standard: das neueste) mit genau einer Kopie
+
+        Returns:
+            (Bildnummer, JPEG-Daten, Zeitstempel) oder None, wenn kein
+            (bzw. das gewünschte Bild nicht mehr) im Puffer ist
+        """
+        self.touch()
+        if frame is None:
+            frame = self.latest_frame()
+        if frame == 0:
+            return None
+        offset = self._slot_offset(frame % self.slots)
+        for _ in range(_READ_RETRIES):
+            seq_before, slot_frame, length, timestamp = _SLOT_HEADER.unpack_from(self._buf, offset)
+            if seq_before & 1:
+                # Schreiber ist gerade in diesem Slot
+                time.sleep(0)
+                continue
+            if slot_frame != frame or length > self.slot_size:
+                return None
+            data_offset = offset + _SLOT_HEADER_SIZE
+            data = bytes(self._buf[data_offset:data_offset + length])
+            if _U64.unpack_from(self._buf, offset)[0] == seq_before:
+                return frame, data, timestamp
+        return None
+
+    def wait_for_frame(self, after: int, timeout: float = 1.0,
+                       poll_interval: float = 0.005) -> Optional[Tuple[int, bytes, float]]:
+        """Wartet auf ein Bild, das neuer als after ist, und liest es"""
+        deadline = time.monotonic() + timeout
+        while True:
+            self.touch()
+            latest = self.latest_frame()
+            if latest > after:
+                result = self.read_frame(latest)
+                if result is not None:
+                    return result
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(poll_interval)
+
+    def touch(self) -> None:
+        """Vermerkt einen Lesezugriff (der Daemon erzeugt Bilder nur bei Bedarf)"""
+        if not self._owner:
+            _F64.pack_into(self._buf, _HEARTBEAT_OFFSET, time.time())
+
+    def has_readers(self, within: float = 2.0) -> bool:
+        """Gibt zurück, ob in den letzten within Sekunden gelesen wurde"""
+        return time.time() - _F64.unpack_from(self._buf, _HEARTBEAT_OFFSET)[0] < within
+
+    def close(self) -> None:
+        """Gibt die Abbildung frei; der Besitzer entfernt zusätzlich das Segment"""
+        self._buf = None
+        try:
+            self._shm.close()
+        except BufferError:
+            # Noch exportierte memoryviews, das Segment bleibt bis zum Prozessende
+            return
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
@@ -3,21 +3,30 @@ Manage Settings-Modul für die Fotobox2 Backend-Anwendung
 
 Dieses Modul bietet Funktionen zum Laden, Validieren und Speichern von Einstellungen.
 Es fungiert als zentrale Schnittstelle für alle einstellungsbezogenen Operationen.
-"""
 
-# TODO: Integration mit manage_settings.sh
-# - Wrapper-Funktionen für die wichtigsten Bash-Funktionen implementieren (get_config_value, set_config_value, etc.)
-# - Kompatibilitätsschicht zwischen alter und neuer API
-# - Unterstützung für hierarchische Schlüssel und Gruppen-IDs
-# - Fehlerbehandlung und Status-Mapping zwischen Bash und Python
-# - Siehe detaillierte Anforderungen in 2025-07-02 Konfigurationswerte_neu.todo
+Einstellungen werden mit hierarchischen Schlüsseln (z.B. "system.event_name",
+"camera.image_quality") einzeln in der Tabelle 'settings' der Einstellungs-
+datenbank (manage_database) gespeichert. Jede Änderung betrifft nur die Zeilen
+der geänderten Schlüssel; mehrere Schlüssel werden in einer Transaktion
+geschrieben. Eine vorhandene settings.json wird beim ersten Zugriff einmalig
+importiert.
+"""
 
 import os
+import re
 import json
+import sqlite3
 import logging
 import shutil
+import time
+import copy
+import queue
+import threading
+from types import MappingProxyType
 from datetime import datetime
-from typing import Dict, Any, List, Union, Optional, Tuple
+from typing import Dict, Any, List, Union, Optional, Tuple, Mapping, Callable, Iterable, Iterator
+
+import manage_database
 
 # Logger einrichten
 logger = logging.getLogger(__name__)
@@ -45,18 +54,28 @@ except ImportError as e:
     PHOTOS_DIR = "/opt/fotobox/frontend/photos"
     logger.warning(f"Verwende Standardpfade: DATA_DIR={DATA_DIR}")
 
-# Stelle sicher, dass die Verzeichnisse existieren
-for directory in [DATA_DIR, CONFIG_DIR, BACKUP_DIR, LOG_DIR, PHOTOS_DIR]:
-    os.makedirs(directory, mode=0o755, exist_ok=True)
-    # Setze Benutzer/Gruppe auf fotobox
-    try:
-        shutil.chown(directory, user='fotobox', group='fotobox')
-    except Exception as e:
-        logger.warning(f"Konnte Berechtigungen für {directory} nicht setzen: {e}")
+def ensure_directories() -> None:
+    """Legt die Verzeichnisse der Einstellungen an und setzt Benutzer/Gruppe auf fotobox
+
+    Wird einmalig im Startschritt "settings" (manage_startup) ausgeführt,
+    nicht beim Import in jedem Worker-Prozess.
+    """
+    for directory in [DATA_DIR, CONFIG_DIR, BACKUP_DIR, LOG_DIR, PHOTOS_DIR]:
+        os.makedirs(directory, mode=0o755, exist_ok=True)
+        try:
+            shutil.chown(directory, user='fotobox', group='fotobox')
+        except Exception as e:
+            logger.warning(f"Konnte Berechtigungen für {directory} nicht setzen: {e}")
 
-# Pfad zur Einstellungsdatei
+# Pfad zur alten Einstellungsdatei (wird einmalig in die Datenbank importiert)
 SETTINGS_FILE = os.path.join(DATA_DIR, "settings.json")
 
+# Marker-Schlüssel für den abgeschlossenen Import von settings.json
+IMPORT_MARKER_KEY = "meta.settings_json_imported"
+
+# Gültiges Format für hierarchische Schlüssel (analog zu _validate_key in manage_settings.sh)
+KEY_PATTERN = re.compile(r'^[a-zA-Z0-9-]+(?:[._][a-zA-Z0-9-]+)*$')
+
 # Standard-Einstellungen (als Fallback)
 DEFAULT_SETTINGS = {
     "system": {
@@ -73,6 +92,7 @@ DEFAULT_SETTINGS = {
     },
     "camera": {
         "camera_id": "auto",
+        "config_id": None,  # Aktive Kamera-Konfiguration (manage_camera_config)
         "flash_mode": "auto",
         "image_format": "jpeg",
         "image_quality": 95
@@ -85,11 +105,30 @@ DEFAULT_SETTINGS = {
 }
 
 # Validierungsregeln
+# Unterstützte Regeln: required, type (string, number, integer, boolean, object, array),
+# min, max, min_length, max_length, enum, pattern (regulärer Ausdruck, vollständige
+# Übereinstimmung) und properties (Regeln für die Felder eines Objekts)
 VALIDATION_RULES = {
     "system.event_name": {
         "required": True,
+        "type": "string",
         "max_length": 50
     },
+    "system.event_date": {
+        "type": "string",
+        "pattern": r"\d{4}-\d{2}-\d{2}"
+    },
+    "system.color_mode": {
+        "type": "string",
+        "enum": ["light", "dark", "system"]
+    },
+    "system.language": {
+        "type": "string",
+        "pattern": r"[a-z]{2}_[A-Z]{2}"
+    },
+    "system.debug_mode": {
+        "type": "boolean"
+    },
     "interface.screensaver_timeout": {
         "required": True,
         "type": "number",
@@ -108,31 +147,607 @@ VALIDATION_RULES = {
         "min": 1,
         "max": 10
     },
+    "camera.camera_id": {
+        "type": "string",
+        "min_length": 1
+    },
+    "camera.config_id": {
+        "type": "string"
+    },
+    "camera.flash_mode": {
+        "type": "string",
+        "enum": ["auto", "on", "off"]
+    },
+    "camera.image_format": {
+        "type": "string",
+        "enum": ["jpeg", "png"]
+    },
     "camera.image_quality": {
         "required": True,
         "type": "number",
         "min": 1,
         "max": 100
+    },
+    "storage.backup_enabled": {
+        "type": "boolean"
+    },
+    "storage.auto_cleanup": {
+        "type": "boolean"
+    },
+    "storage.min_free_space": {
+        "type": "number",
+        "min": 0
     }
 }
 
-def ensure_settings_backup() -> bool:
+# Gruppen (erste Hierarchieebene) der Einstellungen
+SETTINGS_GROUPS = tuple(DEFAULT_SETTINGS.keys())
+
+class SettingsKeyError(ValueError):
+    """Ungültiger oder unbekannter Einstellungsschlüssel"""
+
+    def __init__(self, message: str, key: Optional[str] = None):
+        super().__init__(message)
+        self.key = key
+
+def _is_object_setting(key: str) -> bool:
+    """True, wenn der Wert der Einstellung selbst ein Objekt ist (nicht weiter zerlegen)"""
+    return VALIDATION_RULES.get(key, {}).get("type") == "object"
+
+def _key_conflicts(keys: Iterable[str]) -> Dict[str, str]:
+    """Findet Schlüssel, die zugleich Elternschlüssel eines anderen Schlüssels sind
+    
+    Returns:
+        Dict[str, str]: Schlüssel -> Fehlermeldung
+    """
+    key_set = set(keys)
+    conflicts = {}
+    for key in key_set:
+        parts = key.split(".")
+        for depth in range(1, len(parts)):
+            parent = ".".join(parts[:depth])
+            if parent in key_set:
+                conflicts[key] = f"Schlüssel {key} überschneidet sich mit {parent}"
+                break
+    return conflicts
+
+def flatten_settings(settings: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """Wandelt verschachtelte Einstellungen in hierarchische Schlüssel um
+    
+    Werte von Einstellungen mit Regeltyp "object" bleiben als Ganzes erhalten.
+    
+    Args:
+        settings (Dict[str, Any]): Verschachtelte oder bereits flache Einstellungen
+        prefix (str, optional): Präfix für die erzeugten Schlüssel
+    
+    Returns:
+        Dict[str, Any]: Flaches Dictionary, z.B. {"system.event_name": "..."}
+    
+    Raises:
+        SettingsKeyError: Wenn ein Schlüssel doppelt vorkommt oder sich mit
+            einem Eltern- bzw. Kindschlüssel überschneidet
+    """
+    flat = {}
+    for key, value in settings.items():
+        full_key = f"{prefix}.{key}" if prefix else str(key)
+        if (isinstance(value, dict) and (full_key in SETTINGS_GROUPS or prefix)
+                and not _is_object_setting(full_key)):
+            entries = flatten_settings(value, full_key).items()
+        else:
+            entries = ((full_key, value),)
+        for flat_key, flat_value in entries:
+            if flat_key in flat:
+                raise SettingsKeyError(f"Schlüssel doppelt angegeben: {flat_key}", flat_key)
+            flat[flat_key] = flat_value
+    if not prefix:
+        for key, message in _key_conflicts(flat).items():
+            raise SettingsKeyError(message, key)
+    return flat
+
+def unflatten_settings(flat: Dict[str, Any]) -> Dict[str, Any]:
+    """Wandelt hierarchische Schlüssel in ein verschachteltes Dictionary um
+    
+    Die Werte werden kopiert; Änderungen am Ergebnis wirken nicht auf flat zurück.
+    
+    Args:
+        flat (Dict[str, Any]): Flaches Dictionary mit hierarchischen Schlüsseln
+    
+    Returns:
+        Dict[str, Any]: Verschachteltes Dictionary
+    
+    Raises:
+        SettingsKeyError: Wenn sich Schlüssel mit einem Elternschlüssel überschneiden
+    """
+    for key, message in _key_conflicts(flat).items():
+        raise SettingsKeyError(message, key)
+    nested: Dict[str, Any] = {}
+    for key in sorted(flat):
+        node = nested
+        parts = key.split(".")
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        value = flat[key]
+        node[parts[-1]] = copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+    return nested
+
+# Standardwerte mit hierarchischen Schlüsseln
+DEFAULT_VALUES = flatten_settings(DEFAULT_SETTINGS)
+
+# Zuordnung alter, flacher Schlüssel (z.B. "event_name") zu hierarchischen Schlüsseln
+LEGACY_KEYS = {key.split(".", 1)[1]: key for key in DEFAULT_VALUES}
+
+def normalize_key(key: str) -> str:
+    """Prüft einen Schlüssel und gibt seine hierarchische Form zurück
+    
+    Alte, flache Schlüssel wie "event_name" werden auf ihren hierarchischen
+    Schlüssel ("system.event_name") abgebildet.
+    
+    Args:
+        key (str): Schlüssel der Einstellung
+    
+    Returns:
+        str: Hierarchischer Schlüssel
+    
+    Raises:
+        SettingsKeyError: Wenn der Schlüssel ungültig ist oder zu keiner Gruppe gehört
+    """
+    if key in LEGACY_KEYS:
+        return LEGACY_KEYS[key]
+    if not isinstance(key, str) or not KEY_PATTERN.match(key):
+        raise SettingsKeyError(f"Ungültiger Schlüssel: {key}")
+    if key.split(".", 1)[0] not in SETTINGS_GROUPS:
+        raise SettingsKeyError(f"Unbekannte Einstellungsgruppe: {key}")
+    return key
+
+def _normalize_payload(settings: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """Wandelt eine Nutzlast in hierarchische Schlüssel um
+    
+    Returns:
+        Tuple[Dict[str, Any], Dict[str, str]]: (Einstellungen, Fehlermeldungen)
     """
-    Erstellt ein Backup der Einstellungsdatei falls nötig
+    normalized = {}
+    errors = {}
+    try:
+        flat = flatten_settings(settings)
+    except SettingsKeyError as e:
+        return normalized, {e.key or "": str(e)}
+    for key, value in flat.items():
+        try:
+            normalized_key = normalize_key(key)
+        except SettingsKeyError as e:
+            errors[key] = str(e)
+            continue
+        # Alter und hierarchischer Schlüssel für dieselbe Einstellung
+        if normalized_key in normalized:
+            errors[key] = f"Schlüssel doppelt angegeben: {normalized_key}"
+            continue
+        normalized[normalized_key] = value
+    errors.update(_key_conflicts(normalized))
+    return normalized, errors
+
+def _group_condition(group: str) -> Tuple[str, Tuple[Any, ...]]:
+    """SQL-Bedingung für alle Schlüssel unterhalb einer Hierarchie"""
+    prefix = f"{group}."
+    return "substr(key, 1, ?) = ?", (len(prefix), prefix)
+
+def _settings_condition() -> Tuple[str, Tuple[Any, ...]]:
+    """SQL-Bedingung für alle Schlüssel der bekannten Einstellungsgruppen"""
+    clauses = []
+    params: List[Any] = []
+    for group in SETTINGS_GROUPS:
+        clause, group_params = _group_condition(group)
+        clauses.append(clause)
+        params.extend(group_params)
+    return "(" + " OR ".join(clauses) + ")", tuple(params)
+
+def _begin(conn: sqlite3.Connection) -> None:
+    """Startet eine schreibende Transaktion (sperrt sofort, verhindert Upgrade-Deadlocks)"""
+    conn.isolation_level = None
+    conn.execute("BEGIN IMMEDIATE")
+
+def _upsert_rows(conn: sqlite3.Connection, values: Dict[str, Any]) -> None:
+    """Schreibt die übergebenen Schlüssel einzeln per Upsert"""
+    conn.executemany(
+        """
+        INSERT INTO settings (key, value, updated_at)
+        VALUES (?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(key) DO UPDATE SET
+            value = excluded.value,
+            updated_at = excluded.updated_at
+        WHERE settings.value IS NOT excluded.value
+        """,
+        [(key, json.dumps(value, ensure_ascii=False)) for key, value in values.items()]
+    )
+
+_store_ready = False
+
+def import_settings_file(path: str = SETTINGS_FILE) -> int:
+    """Importiert eine vorhandene settings.json einmalig in die Datenbank
+    
+    Der Import wird über den Schlüssel IMPORT_MARKER_KEY markiert und die
+    Datei anschließend nach "<datei>.imported" umbenannt.
+    
+    Args:
+        path (str, optional): Pfad zur JSON-Datei. Defaults to SETTINGS_FILE.
     
     Returns:
-        bool: True wenn Backup erstellt oder nicht nötig, False bei Fehler
+        int: Anzahl importierter Schlüssel
+    """
+    if not os.path.exists(path):
+        return 0
+
+    try:
+        if manage_database.get_setting(IMPORT_MARKER_KEY):
+            return 0
+
+        with open(path, 'r', encoding='utf-8') as file:
+            raw_settings = json.load(file)
+
+        values, errors = _normalize_payload(raw_settings)
+        for key, message in errors.items():
+            logger.warning(f"Überspringe Schlüssel aus {path}: {message}")
+
+        conn = manage_database.get_connection()
+        try:
+            _begin(conn)
+            _upsert_rows(conn, values)
+            _upsert_rows(conn, {IMPORT_MARKER_KEY: datetime.now().isoformat()})
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            # BEGIN IMMEDIATE kann selbst fehlschlagen (z.B. database is locked)
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        try:
+            os.replace(path, f"{path}.imported")
+        except OSError as e:
+            logger.warning(f"Konnte {path} nach dem Import nicht umbenennen: {e}")
+
+        logger.info(f"{len(values)} Einstellungen aus {path} importiert")
+        return len(values)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        logger.error(f"Fehler beim Import von {path}: {e}")
+        return 0
+
+def _ensure_store() -> None:
+    """Führt beim ersten Zugriff den einmaligen Import aus"""
+    global _store_ready
+
+    if not _store_ready:
+        import_settings_file()
+        _store_ready = True
+
+# Zwischengespeicherter, unveränderlicher Stand aller Einstellungen (hierarchische Schlüssel).
+# Schreiber ersetzen die Referenz nur als Ganzes (Copy-on-Write), Leser sehen daher
+# immer einen vollständigen Stand und nie eine halb angewendete Änderung.
+_snapshot: Optional[Mapping[str, Any]] = None
+_snapshot_lock = threading.Lock()
+
+# Mindestabstand in Sekunden zwischen zwei Prüfungen auf Änderungen anderer Prozesse
+SNAPSHOT_CHECK_INTERVAL = 1.0
+
+_version_conn: Optional[sqlite3.Connection] = None
+_data_version: Optional[int] = None
+_last_version_check = 0.0
+
+def _current_data_version() -> Optional[int]:
+    """Liest PRAGMA data_version über eine dauerhaft geöffnete Verbindung
+    
+    Der Wert ändert sich, sobald eine andere Verbindung (anderer Thread,
+    Worker-Prozess oder Shell-Skript) eine Änderung an der Datenbank committet.
+    """
+    global _version_conn
+
+    try:
+        if _version_conn is None:
+            _version_conn = sqlite3.connect(manage_database.get_db_path(), check_same_thread=False)
+        return _version_conn.execute("PRAGMA data_version").fetchone()[0]
+    except sqlite3.Error as e:
+        logger.warning(f"Konnte Datenversion der Einstellungen nicht lesen: {e}")
+        _version_conn = None
+        return None
+
+def _get_snapshot() -> Mapping[str, Any]:
+    """Gibt den aktuellen Einstellungsstand zurück und lädt ihn nur bei Änderungen neu
+    
+    Innerhalb von SNAPSHOT_CHECK_INTERVAL wird der Stand ohne Datenbankzugriff
+    zurückgegeben. Danach wird über PRAGMA data_version geprüft, ob sich die
+    Datenbank geändert hat; nur dann werden die Einstellungen neu gelesen.
+    Geänderte Schlüssel werden anschließend an die Abonnenten gemeldet.
     """
-    if not os.path.exists(SETTINGS_FILE):
+    global _snapshot, _data_version, _last_version_check, _published_values, _event_sequence
+
+    snapshot = _snapshot
+    if snapshot is not None and time.monotonic() - _last_version_check < SNAPSHOT_CHECK_INTERVAL:
+        return snapshot
+
+    changes: Dict[str, Any] = {}
+    with _snapshot_lock:
+        if _snapshot is not None and time.monotonic() - _last_version_check < SNAPSHOT_CHECK_INTERVAL:
+            return _snapshot
+
+        # Version vor dem Lesen ermitteln: ein Commit dazwischen führt beim nächsten Mal zum Neuladen
+        version = _current_data_version()
+        _last_version_check = time.monotonic()
+        if _snapshot is not None and version is not None and version == _data_version:
+            return _snapshot
+
+        _ensure_store()
+        values = dict(DEFAULT_VALUES)
+        values.update(_read_values())
+        snapshot = _snapshot = MappingProxyType(values)
+        _data_version = version
+        logger.debug("Einstellungs-Snapshot neu geladen (%d Schlüssel)", len(values))
+
+        # Unterschiede zum zuletzt gemeldeten Stand ermitteln
+        if _published_values is not None:
+            changes = _diff_values(_published_values, snapshot)
+        _published_values = snapshot
+        if changes:
+            _event_sequence += 1
+            sequence = _event_sequence
+
+    if changes:
+        _publish(sequence, changes)
+    return snapshot
+
+def invalidate_settings_cache() -> None:
+    """Verwirft den zwischengespeicherten Einstellungsstand"""
+    global _snapshot
+
+    with _snapshot_lock:
+        _snapshot = None
+
+def refresh_settings() -> None:
+    """Lädt den Einstellungsstand sofort neu und benachrichtigt Abonnenten über Änderungen"""
+    invalidate_settings_cache()
+    _get_snapshot()
+
+# Abonnenten für Änderungsereignisse: ID -> (Schlüssel/Gruppen oder None für alle, Callback,
+# Callback erhält zusätzlich die Ereignisnummer)
+ChangeCallback = Callable[..., None]
+_subscribers: Dict[int, Tuple[Optional[Tuple[str, ...]], ChangeCallback, bool]] = {}
+_subscribers_lock = threading.Lock()
+_next_subscription_id = 1
+
+# Stand, zu dem zuletzt Ereignisse verschickt wurden, und fortlaufende Ereignisnummer
+_published_values: Optional[Mapping[str, Any]] = None
+_event_sequence = 0
+
+# Ereignisse werden nacheinander in der Reihenfolge ihrer Nummer verteilt: noch nicht
+# verteilte Ereignisse nach Nummer und die Nummer des zuletzt verteilten Ereignisses
+_publish_condition = threading.Condition(threading.RLock())
+_pending_events: Dict[int, Dict[str, Any]] = {}
+_delivered_sequence = 0
+# Gesetzt, während der Thread Ereignisse verteilt (Callbacks, die selbst Änderungen auslösen)
+_publishing = threading.local()
+
+# Hintergrund-Thread, der Änderungen anderer Prozesse (z.B. Shell-Skripte) erkennt
+_watcher_thread: Optional[threading.Thread] = None
+
+def _diff_values(old: Mapping[str, Any], new: Mapping[str, Any]) -> Dict[str, Any]:
+    """Ermittelt geänderte Schlüssel und ihre neuen Werte (None bei entfernten Schlüsseln)"""
+    changes = {}
+    for key in old.keys() | new.keys():
+        if old.get(key) != new.get(key) or (key in old) != (key in new):
+            changes[key] = new.get(key)
+    return changes
+
+def _matches(key: str, patterns: Optional[Tuple[str, ...]]) -> bool:
+    """Prüft, ob ein Schlüssel einem abonnierten Schlüssel oder einer Gruppe entspricht"""
+    if patterns is None:
         return True
-        
+    return any(key == pattern or key.startswith(pattern + ".") for pattern in patterns)
+
+def _publish(sequence: int, changes: Dict[str, Any]) -> None:
+    """Verteilt Änderungen an alle Abonnenten der betroffenen Schlüssel
+    
+    Ereignisse werden streng in der Reihenfolge ihrer Nummer verteilt, damit ein
+    älterer Stand nie nach einem neueren ankommt. Der Thread, der an der Reihe
+    ist, verteilt auch alle direkt folgenden, bereits eingetroffenen Ereignisse.
+    """
+    global _delivered_sequence
+
+    with _publish_condition:
+        _pending_events[sequence] = changes
+        if getattr(_publishing, 'active', False):
+            # Aus einem Callback heraus ausgelöst: wird von der laufenden Verteilung übernommen
+            return
+        while True:
+            next_sequence = _delivered_sequence + 1
+            if next_sequence in _pending_events:
+                next_changes = _pending_events.pop(next_sequence)
+                _publishing.active = True
+                try:
+                    _deliver(next_sequence, next_changes)
+                finally:
+                    _publishing.active = False
+                    _delivered_sequence = next_sequence
+                    _publish_condition.notify_all()
+            elif sequence not in _pending_events:
+                return
+            else:
+                _publish_condition.wait()
+
+def _deliver(sequence: int, changes: Dict[str, Any]) -> None:
+    with _subscribers_lock:
+        subscribers = list(_subscribers.values())
+
+    logger.debug("Einstellungsänderung #%d: %s", sequence, sorted(changes))
+    for patterns, callback, with_sequence in subscribers:
+        relevant = {key: value for key, value in changes.items() if _matches(key, patterns)}
+        if not relevant:
+            continue
+        try:
+            if with_sequence:
+                callback(relevant, sequence)
+            else:
+                callback(relevant)
+        except Exception as e:
+            logger.error(f"Fehler im Abonnenten für Einstellungsänderungen: {str(e)}")
+
+def _watch_loop() -> None:
+    """Prüft regelmäßig auf Änderungen anderer Prozesse, solange Abonnenten existieren"""
+    global _watcher_thread
+
+    while True:
+        time.sleep(SNAPSHOT_CHECK_INTERVAL)
+        with _subscribers_lock:
+            if not _subscribers:
+                _watcher_thread = None
+                return
+        try:
+            _get_snapshot()
+        except Exception as e:
+            logger.warning(f"Fehler bei der Prüfung auf Einstellungsänderungen: {str(e)}")
+
+def subscribe(callback: ChangeCallback, keys: Optional[List[str]] = None,
+              with_sequence: bool = False) -> int:
+    """Registriert einen Callback für Änderungen an Einstellungen
+    
+    Der Callback erhält ein Dict mit den geänderten hierarchischen Schlüsseln und
+    ihren neuen Werten. Er wird im Thread des Schreibers bzw. des Überwachungs-Threads
+    aufgerufen, nacheinander in der Reihenfolge der Ereignisse, und sollte daher
+    schnell zurückkehren.
+    
+    Args:
+        callback (ChangeCallback): Aufzurufende Funktion
+        keys (Optional[List[str]], optional): Schlüssel oder Gruppen (z.B. "camera"),
+            None für alle Einstellungen
+        with_sequence (bool, optional): Callback erhält als zweites Argument die
+            fortlaufende Ereignisnummer
+    
+    Returns:
+        int: ID des Abonnements (für unsubscribe)
+    
+    Raises:
+        SettingsKeyError: Wenn ein Schlüssel ungültig ist
+    """
+    global _next_subscription_id, _watcher_thread, _published_values
+
+    patterns = tuple(normalize_key(key) for key in keys) if keys is not None else None
+
+    # Ausgangsstand festlegen, damit spätere Änderungen erkannt werden
+    snapshot = _get_snapshot()
+    with _snapshot_lock:
+        if _published_values is None:
+            _published_values = snapshot
+
+    with _subscribers_lock:
+        subscription_id = _next_subscription_id
+        _next_subscription_id += 1
+        _subscribers[subscription_id] = (patterns, callback, with_sequence)
+
+        if _watcher_thread is None:
+            _watcher_thread = threading.Thread(target=_watch_loop, name="settings-watcher", daemon=True)
+            _watcher_thread.start()
+
+    return subscription_id
+
+def unsubscribe(subscription_id: int) -> bool:
+    """Entfernt ein Abonnement
+    
+    Args:
+        subscription_id (int): ID aus subscribe()
+    
+    Returns:
+        bool: True wenn das Abonnement existierte
+    """
+    with _subscribers_lock:
+        return _subscribers.pop(subscription_id, None) is not None
+
+def iter_change_events(keys: Optional[List[str]] = None, heartbeat: float = 15.0,
+                       max_pending: int = 100) -> Iterator[Optional[Dict[str, Any]]]:
+    """Liefert Änderungsereignisse als Generator (z.B. für Server-Sent Events)
+    
+    Als erstes Ereignis wird der aktuelle Stand der abonnierten Schlüssel geliefert.
+    Läuft die Warteschlange eines langsamen Empfängers über, werden die aufgelaufenen
+    Änderungen verworfen und stattdessen erneut der vollständige Stand geliefert.
+    Jedes Ereignis trägt die Ereignisnummer (sequence), zu der sein Stand gehört.
+    
+    Args:
+        keys (Optional[List[str]], optional): Schlüssel oder Gruppen, None für alle
+        heartbeat (float, optional): Sekunden ohne Ereignis, nach denen None geliefert wird
+        max_pending (int, optional): Maximale Anzahl wartender Ereignisse
+    
+    Yields:
+        Optional[Dict[str, Any]]: {'type': 'snapshot'|'change', 'sequence': n, 'settings': {...}}
+        oder None
+    """
+    pending: "queue.Queue[Tuple[int, Dict[str, Any]]]" = queue.Queue(maxsize=max_pending)
+    overflow = threading.Event()
+
+    def enqueue(changes: Dict[str, Any], sequence: int) -> None:
+        try:
+            pending.put_nowait((sequence, changes))
+        except queue.Full:
+            overflow.set()
+
+    subscription_id = subscribe(enqueue, keys, with_sequence=True)
+    patterns = _subscribers[subscription_id][0]
+
+    def current_state() -> Dict[str, Any]:
+        _get_snapshot()
+        # Zuletzt gemeldeter Stand und seine Nummer gehören zusammen
+        with _snapshot_lock:
+            values, sequence = _published_values or {}, _event_sequence
+        return {'type': 'snapshot', 'sequence': sequence, 'settings': {
+            key: value for key, value in values.items() if _matches(key, patterns)
+        }}
+
+    try:
+        yield current_state()
+        while True:
+            try:
+                sequence, changes = pending.get(timeout=heartbeat)
+            except queue.Empty:
+                yield None
+                continue
+
+            if overflow.is_set():
+                while not pending.empty():
+                    pending.get_nowait()
+                overflow.clear()
+                yield current_state()
+            else:
+                yield {'type': 'change', 'sequence': sequence, 'settings': changes}
+    finally:
+        unsubscribe(subscription_id)
+
+def _read_values(condition: str = "", params: Tuple[Any, ...] = ()) -> Dict[str, Any]:
+    """Liest gespeicherte Einstellungen (ohne Standardwerte) aus der Datenbank"""
+    base_condition, base_params = _settings_condition()
+    query = f"SELECT key, value FROM settings WHERE {base_condition}"
+    if condition:
+        query += f" AND {condition}"
+
+    rows = manage_database.execute_query(query, base_params + params, fetch=True) or []
+    values = {}
+    for row in rows:
+        try:
+            values[row['key']] = json.loads(row['value'])
+        except (TypeError, ValueError):
+            # Von Shell-Skripten gesetzte Werte sind nicht immer JSON-kodiert
+            values[row['key']] = row['value']
+    return values
+
+def ensure_settings_backup() -> bool:
+    """
+    Erstellt ein Backup der aktuellen Einstellungen als JSON-Datei
+    
+    Returns:
+        bool: True wenn Backup erstellt, False bei Fehler
+    """
     try:
-        # Erstelle Backup mit Zeitstempel
         backup_file = os.path.join(
             BACKUP_DIR,
             f"settings_{datetime.now():%Y%m%d_%H%M%S}.json"
         )
-        shutil.copy2(SETTINGS_FILE, backup_file)
+        with open(backup_file, 'w', encoding='utf-8') as file:
+            json.dump(load_settings(), file, indent=2, ensure_ascii=False)
         logger.info(f"Einstellungs-Backup erstellt: {backup_file}")
         return True
     except Exception as e:
@@ -140,97 +755,123 @@ def ensure_settings_backup() -> bool:
         return False
 
 def load_settings() -> Dict[str, Any]:
-    """Lädt alle Einstellungen aus der Datenbank oder Datei
+    """Lädt alle Einstellungen aus dem zwischengespeicherten Stand
     
     Returns:
-        Dict[str, Any]: Ein Dictionary mit allen Einstellungen
+        Dict[str, Any]: Ein verschachteltes Dictionary mit allen Einstellungen,
+        fehlende Schlüssel werden mit Standardwerten ergänzt
     """
     logger.debug("Lade alle Einstellungen")
     
     try:
-        # Versuche, die Einstellungen aus der Datei zu laden
-        if os.path.exists(SETTINGS_FILE):
-            with open(SETTINGS_FILE, 'r', encoding='utf-8') as file:
-                settings = json.load(file)
-                logger.info("Einstellungen erfolgreich geladen")
-                return settings
+        # unflatten_settings kopiert die Werte, Aufrufer verändern den gemeinsamen Stand nicht
+        return unflatten_settings(_get_snapshot())
     except Exception as e:
         logger.error(f"Fehler beim Laden der Einstellungen: {str(e)}")
     
     # Wenn nicht erfolgreich, gebe Standardeinstellungen zurück
     logger.warning("Keine Einstellungen gefunden, verwende Standardeinstellungen")
-    return DEFAULT_SETTINGS.copy()
+    return unflatten_settings(DEFAULT_VALUES)
 
 def load_single_setting(key: str, default_value: Any = None) -> Any:
-    """Lädt eine einzelne Einstellung
+    """Lädt eine einzelne Einstellung oder eine ganze Gruppe
+    
+    Der Wert wird aus dem zwischengespeicherten Stand gelesen und greift
+    daher im Normalfall weder auf Datei noch Datenbank zu.
     
     Args:
-        key (str): Schlüssel der Einstellung
+        key (str): Hierarchischer Schlüssel (z.B. "camera.image_quality") oder Gruppe ("camera")
         default_value (Any, optional): Standardwert, falls nicht gefunden. Defaults to None.
     
     Returns:
-        Any: Der Wert der Einstellung oder der Standardwert
+        Any: Der Wert der Einstellung, ein Dict bei Gruppen oder der Standardwert
     """
-    logger.debug(f"Lade Einstellung: {key}")
+    logger.debug("Lade Einstellung: %s", key)
     
     try:
-        # Lade alle Einstellungen
-        settings = load_settings()
+        key = normalize_key(key)
+        snapshot = _get_snapshot()
         
-        # Gebe den spezifischen Wert zurück, falls vorhanden
-        if key in settings:
-            return settings[key]
+        if key in snapshot:
+            value = snapshot[key]
+            return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
         
-        # Prüfe auf Standardwert in DEFAULT_SETTINGS
-        if key in DEFAULT_SETTINGS:
-            logger.debug(f"Verwende Standardwert für {key}")
-            return DEFAULT_SETTINGS[key]
+        # Gruppe oder Teilbaum: alle Schlüssel unterhalb zusammensetzen
+        subtree_prefix = f"{key}."
+        subtree = {k: v for k, v in snapshot.items() if k.startswith(subtree_prefix)}
+        if subtree:
+            nested = unflatten_settings(subtree)
+            for part in key.split("."):
+                nested = nested[part]
+            return nested
             
         # Fallback auf den übergebenen Standardwert
-        logger.debug(f"Kein Wert für {key} gefunden, verwende übergebenen Standardwert")
+        logger.debug("Kein Wert für %s gefunden, verwende übergebenen Standardwert", key)
+        return default_value
+    except SettingsKeyError as e:
+        logger.warning(str(e))
         return default_value
     except Exception as e:
         logger.error(f"Fehler beim Laden der Einstellung {key}: {str(e)}")
-        
-        # Verwende Standardwerte als Fallback
-        if key in DEFAULT_SETTINGS:
-            return DEFAULT_SETTINGS[key]
-        
-        return default_value
+        return DEFAULT_VALUES.get(key, default_value)
+
+def get_last_modified() -> Optional[str]:
+    """Gibt den Zeitpunkt der letzten Änderung einer Einstellung zurück
+    
+    Returns:
+        Optional[str]: Zeitstempel der letzten Änderung oder None
+    """
+    try:
+        condition, params = _settings_condition()
+        rows = manage_database.execute_query(
+            f"SELECT MAX(updated_at) AS last_modified FROM settings WHERE {condition}",
+            params,
+            fetch=True
+        )
+        return rows[0]['last_modified'] if rows else None
+    except Exception as e:
+        logger.error(f"Fehler beim Ermitteln der letzten Änderung: {str(e)}")
+        return None
 
 def update_settings(settings: Dict[str, Any]) -> bool:
-    """Aktualisiert mehrere Einstellungen auf einmal
+    """Aktualisiert mehrere Einstellungen atomar in einer Transaktion
     
     Args:
-        settings (Dict[str, Any]): Dictionary mit zu aktualisierenden Einstellungen
+        settings (Dict[str, Any]): Einstellungen mit hierarchischen Schlüsseln
+            (verschachtelte Gruppen und alte, flache Schlüssel werden umgewandelt)
     
     Returns:
         bool: True wenn erfolgreich, sonst False
     """
     logger.debug(f"Aktualisiere Einstellungen: {settings}")
+    _ensure_store()
+    
+    values, key_errors = _normalize_payload(settings)
+    if key_errors:
+        logger.error(f"Ungültige Schlüssel: {key_errors}")
+        return False
     
     # Validiere alle übergebenen Einstellungen
-    validation_result, validation_errors = validate_settings(settings)
+    validation_result, validation_errors = validate_settings(values)
     if not validation_result:
         logger.error(f"Validierung fehlgeschlagen: {validation_errors}")
         return False
     
     try:
-        # Lade aktuelle Einstellungen
-        current_settings = load_settings()
-        
-        # Aktualisiere nur die übergebenen Einstellungen
-        for key, value in settings.items():
-            current_settings[key] = value
+        conn = manage_database.get_connection()
+        try:
+            _begin(conn)
+            _upsert_rows(conn, values)
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
         
-        # Stelle sicher, dass das Verzeichnis existiert
-        os.makedirs(os.path.dirname(SETTINGS_FILE), exist_ok=True)
-        
-        # Speichere die aktualisierten Einstellungen
-        with open(SETTINGS_FILE, 'w', encoding='utf-8') as file:
-            json.dump(current_settings, file, indent=2, ensure_ascii=False)
-        
-        logger.info("Einstellungen erfolgreich aktualisiert")
+        refresh_settings()
+        logger.info(f"{len(values)} Einstellungen erfolgreich aktualisiert")
         return True
     except Exception as e:
         logger.error(f"Fehler beim Aktualisieren der Einstellungen: {str(e)}")
@@ -248,100 +889,237 @@ def update_single_setting(key: str, value: Any) -> bool:
     """
     logger.debug(f"Aktualisiere Einstellung {key}: {value}")
     
-    # Erstelle ein Dictionary mit der einzelnen Einstellung
-    setting_dict = {key: value}
-    
-    # Validiere nur diese eine Einstellung
-    validation_result, validation_errors = validate_settings(setting_dict, [key])
-    if not validation_result:
-        logger.error(f"Validierung für {key} fehlgeschlagen: {validation_errors}")
+    # Verwende die allgemeine update_settings Funktion (validiert und schreibt genau eine Zeile)
+    return update_settings({key: value})
+
+# Validator-Signatur: (Wert, Fehler-Dict) -> None, Fehler werden unter ihrem Schlüssel eingetragen
+ValidatorType = Callable[[Any, Dict[str, str]], None]
+
+def _is_number(value: Any) -> bool:
+    """Prüft, ob ein Wert als Zahl interpretiert werden kann (bool zählt nicht)"""
+    if isinstance(value, bool):
+        return False
+    try:
+        float(value)
+        return True
+    except (ValueError, TypeError):
         return False
+
+# Typprüfungen und zugehörige Fehlermeldungen
+_TYPE_CHECKS: Dict[str, Tuple[Callable[[Any], bool], str]] = {
+    "string": (lambda v: isinstance(v, str), "muss ein Text sein"),
+    "number": (_is_number, "muss eine Zahl sein"),
+    "integer": (lambda v: _is_number(v) and float(v).is_integer(), "muss eine ganze Zahl sein"),
+    "boolean": (lambda v: isinstance(v, bool), "muss ein Wahrheitswert sein"),
+    "object": (lambda v: isinstance(v, dict), "muss ein Objekt sein"),
+    "array": (lambda v: isinstance(v, list), "muss eine Liste sein")
+}
+
+def compile_rule(key: str, rules: Dict[str, Any]) -> ValidatorType:
+    """Übersetzt die Regeln eines Schlüssels einmalig in eine Validator-Funktion
+    
+    Args:
+        key (str): Hierarchischer Schlüssel (für Fehlermeldungen)
+        rules (Dict[str, Any]): Regeln aus VALIDATION_RULES
     
-    # Verwende die allgemeine update_settings Funktion
-    return update_settings(setting_dict)
+    Returns:
+        ValidatorType: Funktion, die Fehler in das übergebene Dict einträgt
+    
+    Raises:
+        ValueError: Bei unbekanntem Typ oder ungültigem regulären Ausdruck
+    """
+    checks: List[Callable[[Any], Optional[str]]] = []
+    required = rules.get("required", False)
+    rule_type = rules.get("type")
+
+    if rule_type is not None:
+        if rule_type not in _TYPE_CHECKS:
+            raise ValueError(f"Unbekannter Typ '{rule_type}' für {key}")
+        type_check, type_message = _TYPE_CHECKS[rule_type]
+        checks.append(lambda v: None if type_check(v) else f"{key} {type_message}")
+
+    if "min" in rules:
+        minimum = rules["min"]
+        checks.append(lambda v: f"{key} muss mindestens {minimum} sein"
+                      if _is_number(v) and float(v) < minimum else None)
+    if "max" in rules:
+        maximum = rules["max"]
+        checks.append(lambda v: f"{key} darf höchstens {maximum} sein"
+                      if _is_number(v) and float(v) > maximum else None)
+    if "min_length" in rules:
+        min_length = rules["min_length"]
+        checks.append(lambda v: f"{key} muss mindestens {min_length} Zeichen enthalten"
+                      if isinstance(v, (str, list)) and len(v) < min_length else None)
+    if "max_length" in rules:
+        max_length = rules["max_length"]
+        checks.append(lambda v: f"{key} darf höchstens {max_length} Zeichen enthalten"
+                      if isinstance(v, (str, list)) and len(v) > max_length else None)
+    if "enum" in rules:
+        allowed = tuple(rules["enum"])
+        checks.append(lambda v: None if v in allowed
+                      else f"{key} muss einer der Werte {', '.join(map(str, allowed))} sein")
+    if "pattern" in rules:
+        pattern = re.compile(rules["pattern"])
+        checks.append(lambda v: f"{key} hat ein ungültiges Format"
+                      if isinstance(v, str) and not pattern.fullmatch(v) else None)
+
+    properties = {
+        name: compile_rule(f"{key}.{name}", sub_rules)
+        for name, sub_rules in rules.get("properties", {}).items()
+    }
+
+    def validate(value: Any, errors: Dict[str, str]) -> None:
+        if value is None or value == "":
+            if required:
+                errors[key] = f"{key} ist ein Pflichtfeld"
+            return
+        for check in checks:
+            message = check(value)
+            if message:
+                errors[key] = message
+                return
+        if properties and isinstance(value, dict):
+            for name, validator in properties.items():
+                validator(value.get(name), errors)
+
+    return validate
+
+def compile_validation_rules(rules: Dict[str, Dict[str, Any]]) -> Dict[str, ValidatorType]:
+    """Übersetzt alle Validierungsregeln in Validator-Funktionen je Schlüssel"""
+    return {key: compile_rule(key, key_rules) for key, key_rules in rules.items()}
+
+def _rule_to_schema(rules: Dict[str, Any], default: Any = None) -> Dict[str, Any]:
+    """Übersetzt die Regeln eines Schlüssels in ein JSON-Schema-Fragment"""
+    schema: Dict[str, Any] = {}
+    if "type" in rules:
+        schema["type"] = rules["type"]
+    if "min" in rules:
+        schema["minimum"] = rules["min"]
+    if "max" in rules:
+        schema["maximum"] = rules["max"]
+    length_prefix = "Items" if rules.get("type") == "array" else "Length"
+    if "min_length" in rules:
+        schema[f"min{length_prefix}"] = rules["min_length"]
+    elif rules.get("required") and rules.get("type") == "string":
+        schema["minLength"] = 1
+    if "max_length" in rules:
+        schema[f"max{length_prefix}"] = rules["max_length"]
+    if "enum" in rules:
+        schema["enum"] = list(rules["enum"])
+    if "pattern" in rules:
+        schema["pattern"] = f"^(?:{rules['pattern']})$"
+    if "properties" in rules:
+        schema["properties"] = {
+            name: _rule_to_schema(sub_rules)
+            for name, sub_rules in rules["properties"].items()
+        }
+        schema["required"] = [
+            name for name, sub_rules in rules["properties"].items() if sub_rules.get("required")
+        ]
+    if default is not None:
+        schema["default"] = default
+    return schema
+
+def build_validation_schema(rules: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Erzeugt ein JSON-Schema (Draft 7) der Einstellungen für die clientseitige Validierung
+    
+    Die hierarchischen Schlüssel werden als verschachtelte Objekte abgebildet.
+    Pflichtfelder werden als nicht leer abgebildet, aber nicht als "required",
+    da Aktualisierungen auch nur einzelne Schlüssel enthalten dürfen.
+    """
+    schema: Dict[str, Any] = {
+        "$schema": "http://json-schema.org/draft-07/schema#",
+        "title": "Fotobox-Einstellungen",
+        "type": "object",
+        "properties": {}
+    }
+    for key in sorted(set(rules) | set(DEFAULT_VALUES)):
+        node = schema
+        parts = key.split(".")
+        for part in parts[:-1]:
+            node = node["properties"].setdefault(part, {"type": "object", "properties": {}})
+        node["properties"][parts[-1]] = _rule_to_schema(rules.get(key, {}), DEFAULT_VALUES.get(key))
+    return schema
+
+# Regeln einmalig übersetzen
+_VALIDATORS = compile_validation_rules(VALIDATION_RULES)
+_VALIDATION_SCHEMA = build_validation_schema(VALIDATION_RULES)
+
+def get_validation_schema() -> Dict[str, Any]:
+    """Gibt das JSON-Schema der Einstellungen zurück
+    
+    Returns:
+        Dict[str, Any]: JSON-Schema (Draft 7)
+    """
+    return copy.deepcopy(_VALIDATION_SCHEMA)
 
 def validate_settings(settings: Dict[str, Any], keys: Optional[List[str]] = None) -> Tuple[bool, Dict[str, str]]:
-    """Validiert Einstellungen basierend auf definierten Regeln
+    """Validiert Einstellungen mit den vorab übersetzten Validierungsregeln
+    
+    Es werden alle Schlüssel geprüft und sämtliche Fehler zurückgegeben.
     
     Args:
-        settings (Dict[str, Any]): Zu validierende Einstellungen
+        settings (Dict[str, Any]): Zu validierende Einstellungen (hierarchische Schlüssel)
         keys (Optional[List[str]], optional): Optionale Liste von Schlüsseln, die validiert werden sollen
 
     Returns:
         Tuple[bool, Dict[str, str]]: (Erfolg, Fehlermeldungen)
     """
-    errors = {}
+    settings, errors = _normalize_payload(settings)
+    if keys is not None:
+        keys = [LEGACY_KEYS.get(key, key) for key in keys]
     keys_to_validate = keys if keys is not None else list(settings.keys())
     
     for key in keys_to_validate:
         if key not in settings:
             continue
-            
-        value = settings[key]
         
-        # Prüfe, ob es Validierungsregeln für diesen Schlüssel gibt
-        if key not in VALIDATION_RULES:
-            continue
-            
-        rules = VALIDATION_RULES[key]
-        
-        # Pflichtfeld-Prüfung
-        if rules.get("required", False) and (value is None or value == ""):
-            errors[key] = f"{key} ist ein Pflichtfeld"
-            continue
-            
-        # Zahlen-Validierung
-        if rules.get("type") == "number" and value is not None:
-            try:
-                num_value = float(value)
-                
-                # Minimalwert-Prüfung
-                if "min" in rules and num_value < rules["min"]:
-                    errors[key] = f"{key} muss mindestens {rules['min']} sein"
-                    continue
-                    
-                # Maximalwert-Prüfung
-                if "max" in rules and num_value > rules["max"]:
-                    errors[key] = f"{key} darf höchstens {rules['max']} sein"
-                    continue
-            except (ValueError, TypeError):
-                errors[key] = f"{key} muss eine Zahl sein"
-                continue
-                
-        # Textlängen-Validierung
-        if isinstance(value, str) and "max_length" in rules and len(value) > rules["max_length"]:
-            errors[key] = f"{key} darf höchstens {rules['max_length']} Zeichen enthalten"
-            continue
+        # Nur Schlüssel mit Validierungsregeln werden geprüft
+        validator = _VALIDATORS.get(key)
+        if validator is not None:
+            validator(settings[key], errors)
     
     return len(errors) == 0, errors
 
 def reset_to_defaults(keys: Optional[List[str]] = None) -> bool:
     """Setzt Einstellungen auf Standardwerte zurück
     
+    Gespeicherte Werte werden gelöscht, sodass wieder die Standardwerte gelten.
+    
     Args:
-        keys (Optional[List[str]], optional): Optionale Liste von Schlüsseln, die zurückgesetzt werden sollen
+        keys (Optional[List[str]], optional): Optionale Liste von Schlüsseln oder Gruppen,
+            die zurückgesetzt werden sollen
     
     Returns:
         bool: True wenn erfolgreich, sonst False
     """
     logger.debug("Setze Einstellungen auf Standardwerte zurück")
+    _ensure_store()
     
     try:
-        # Lade aktuelle Einstellungen
-        current_settings = load_settings()
-        
-        # Definiere, welche Schlüssel zurückgesetzt werden sollen
-        keys_to_reset = keys if keys is not None else list(DEFAULT_SETTINGS.keys())
-        
-        # Setze die ausgewählten Schlüssel auf die Standardwerte zurück
-        for key in keys_to_reset:
-            if key in DEFAULT_SETTINGS:
-                current_settings[key] = DEFAULT_SETTINGS[key]
+        if keys is None:
+            conditions = [_settings_condition()]
+        else:
+            conditions = []
+            for key in keys:
+                key = normalize_key(key)
+                group_clause, group_params = _group_condition(key)
+                conditions.append((f"(key = ? OR {group_clause})", (key,) + group_params))
         
-        # Speichere die aktualisierten Einstellungen
-        with open(SETTINGS_FILE, 'w', encoding='utf-8') as file:
-            json.dump(current_settings, file, indent=2, ensure_ascii=False)
+        conn = manage_database.get_connection()
+        try:
+            _begin(conn)
+            for clause, params in conditions:
+                conn.execute(f"DELETE FROM settings WHERE {clause}", params)
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
         
+        refresh_settings()
         logger.info("Einstellungen erfolgreich auf Standardwerte zurückgesetzt")
         return True
     except Exception as e:
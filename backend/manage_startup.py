@@ -0,0 +1,237 @@
+"""
+manage_startup.py - Startablauf des Fotobox2-Backends
+
+Die Module führen beim Import keine aufwendigen Arbeiten mehr aus (Shell-Aufrufe,
+Datenbankschemas, Verzeichnisrechte, Kameraerkennung); ihre Instanzen entstehen
+beim ersten Zugriff. Dieses Modul legt fest, welche Schritte ein Prozess beim
+Start ausführt, in welcher Reihenfolge, und misst deren Dauer:
+
+    server  - Hauptprozess (fotobox_server.py, app.py): Verzeichnisstruktur,
+              Einstellungen, geplante Datenbankwartung (einmal für alle Worker)
+    app     - jede Flask-App (Worker): Datenbank, Authentifizierung,
+              Foto-Verzeichnisse; ohne Kamera-Daemon zusätzlich die
+              Kameraerkennung im Hintergrund
+    camera  - Kamera-Daemon: Kameraerkennung im Hintergrund
+
+Der Startbericht (get_startup_report) enthält die Dauer jedes Schritts und die
+Zeit vom Prozessstart bis zur Bereitschaft. Er wird beim Start protokolliert,
+als Metrik exportiert und über /api/service/startup ausgeliefert.
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import manage_metrics
+
+# Logger konfigurieren
+logger = logging.getLogger(__name__)
+
+STARTUP_STEP_DURATION = manage_metrics.gauge(
+    'fotobox_startup_step_duration_seconds', 'Dauer der Startschritte', ('step',))
+STARTUP_READY = manage_metrics.gauge(
+    'fotobox_startup_ready_seconds', 'Zeit vom Prozessstart bis zur Bereitschaft')
+
+def _init_folders() -> None:
+    import manage_folders
+    manage_folders.ensure_folder_structure()
+
+def _init_settings() -> None:
+    import manage_settings
+    manage_settings.ensure_directories()
+    manage_settings.load_settings()
+
+def _init_database() -> None:
+    import manage_database
+    manage_database.get_db_manager()
+
+def _init_auth() -> None:
+    import manage_auth
+    manage_auth.get_auth_manager()
+
+def _init_files() -> None:
+    import manage_files
+    manage_files.ensure_directories_exist()
+
+def _init_maintenance() -> None:
+    import manage_database
+    # Nur im Hauptprozess (Rolle server), nicht in jedem Worker
+    manage_database.start_maintenance_scheduler()
+
+def _init_camera() -> None:
+    import manage_camera
+    manage_camera.start_initialization().join()
+
+# Verfügbare Startschritte
+STEPS: Dict[str, Callable[[], None]] = {
+    'folders': _init_folders,
+    'settings': _init_settings,
+    'database': _init_database,
+    'auth': _init_auth,
+    'files': _init_files,
+    'camera': _init_camera,
+    'maintenance': _init_maintenance,
+}
+
+# Schritte, deren Fehler protokolliert werden, den Start aber nicht abbrechen
+# (z.B. fehlende Rechte für chown bei einem Entwicklungsstart ohne fotobox-Benutzer)
+OPTIONAL_STEPS = ('files', 'camera', 'maintenance')
+
+# Schritte im Vordergrund je Rolle (siehe startup)
+SERVER_STEPS = ('folders', 'settings', 'maintenance')
+APP_STEPS = ('database', 'auth', 'files')
+
+class StartupStep:
+    """Ergebnis eines Startschritts"""
+
+    __slots__ = ('name', 'background', 'started', 'duration_ms', 'error')
+
+    def __init__(self, name: str, background: bool):
+        self.name = name
+        self.background = background
+        self.started = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'background': self.background,
+            'pending': self.duration_ms is None,
+            'duration_ms': round(self.duration_ms, 3) if self.duration_ms is not None else None,
+            'success': self.duration_ms is not None and self.error is None,
+            'error': self.error
+        }
+
+_steps: List[StartupStep] = []
+_steps_lock = threading.Lock()
+_import_ms: Optional[float] = None
+_ready_ms: Optional[float] = None
+_module_loaded = time.perf_counter()
+
+def _reset_after_fork() -> None:
+    # gunicorn-Worker erben die Schritte des Hauptprozesses, messen ihre Zeiten aber selbst
+    global _import_ms, _ready_ms, _steps_lock
+    _import_ms = None
+    _ready_ms = None
+    _steps_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+def _process_uptime_ms() -> Optional[float]:
+    """Zeit seit dem Start des Prozesses (Linux, sonst None)"""
+    try:
+        with open('/proc/self/stat', 'rb') as f:
+            # Feld 22 (starttime) nach dem Programmnamen in Klammern
+            fields = f.read().rsplit(b')', 1)[1].split()
+        with open('/proc/uptime', 'rb') as f:
+            uptime = float(f.read().split()[0])
+        started = int(fields[19]) / os.sysconf('SC_CLK_TCK')
+        return max(0.0, (uptime - started) * 1000)
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _elapsed_ms() -> float:
+    """Zeit seit Prozessstart bzw. ersatzweise seit dem Import dieses Moduls"""
+    uptime = _process_uptime_ms()
+    if uptime is not None:
+        return uptime
+    return (time.perf_counter() - _module_loaded) * 1000
+
+def _is_done(name: str) -> bool:
+    with _steps_lock:
+        return any(step.name == name for step in _steps)
+
+def _run_step(step: StartupStep, func: Callable[[], None]) -> None:
+    try:
+        func()
+    except Exception as e:
+        step.error = str(e) or type(e).__name__
+        if step.name not in OPTIONAL_STEPS:
+            raise
+        logger.error(f"Startschritt {step.name} fehlgeschlagen: {step.error}")
+    finally:
+        step.duration_ms = (time.perf_counter() - step.started) * 1000
+        STARTUP_STEP_DURATION.set(step.duration_ms / 1000, step=step.name)
+
+def _run_background_step(step: StartupStep, func: Callable[[], None]) -> None:
+    try:
+        _run_step(step, func)
+    except Exception as e:
+        logger.error(f"Startschritt {step.name} im Hintergrund fehlgeschlagen: {e}")
+        return
+    logger.info(f"Startschritt {step.name} im Hintergrund abgeschlossen ({step.duration_ms:.0f} ms)")
+
+def run_startup(steps: Iterable[str], background: Iterable[str] = ()) -> Dict[str, Any]:
+    """Führt Startschritte aus und gibt den Startbericht zurück
+
+    Bereits ausgeführte Schritte werden übersprungen, der Aufruf ist daher
+    auch mehrfach (z.B. Hauptprozess und eingebauter Server) unbedenklich.
+
+    Args:
+        steps: Namen der Schritte, die nacheinander im Vordergrund laufen
+        background: Namen der Schritte, die in eigenen Threads laufen
+
+    Raises:
+        KeyError: Bei einem unbekannten Schritt
+        Exception: Fehler eines nicht optionalen Schritts
+    """
+    global _import_ms, _ready_ms
+
+    if _import_ms is None:
+        _import_ms = _elapsed_ms()
+
+    for name in background:
+        func = STEPS[name]
+        if _is_done(name):
+            continue
+        step = StartupStep(name, background=True)
+        with _steps_lock:
+            _steps.append(step)
+        threading.Thread(target=_run_background_step, args=(step, func),
+                         name=f"fotobox-startup-{name}", daemon=True).start()
+
+    for name in steps:
+        func = STEPS[name]
+        if _is_done(name):
+            continue
+        step = StartupStep(name, background=False)
+        with _steps_lock:
+            _steps.append(step)
+        _run_step(step, func)
+
+    _ready_ms = _elapsed_ms()
+    STARTUP_READY.set(_ready_ms / 1000)
+    report = get_startup_report()
+    summary = ', '.join(f"{step['name']} {step['duration_ms']:.0f} ms"
+                        for step in report['steps'] if not step['pending'])
+    logger.info(f"Backend bereit nach {_ready_ms:.0f} ms (Import {_import_ms:.0f} ms"
+                f"{'; ' + summary if summary else ''})")
+    return report
+
+def startup(role: str) -> Dict[str, Any]:
+    """Führt die Startschritte einer Rolle aus ('server', 'app' oder 'camera')"""
+    if role == 'server':
+        return run_startup(SERVER_STEPS)
+    if role == 'app':
+        import manage_camera_client
+        # Ohne Kamera-Daemon gehören die Kameras diesem Prozess
+        background = () if manage_camera_client.is_daemon_mode() else ('camera',)
+        return run_startup(APP_STEPS, background=background)
+    if role == 'camera':
+        return run_startup((), background=('camera',))
+    raise ValueError(f"Unbekannte Startrolle: {role}")
+
+def get_startup_report() -> Dict[str, Any]:
+    """Gibt den Startbericht des aktuellen Prozesses zurück"""
+    with _steps_lock:
+        steps = [step.to_dict() for step in _steps]
+    return {
+        'pid': os.getpid(),
+        'import_ms': round(_import_ms, 3) if _import_ms is not None else None,
+        'ready_ms': round(_ready_ms, 3) if _ready_ms is not None else None,
+        'steps': steps
+    }
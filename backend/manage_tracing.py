@@ -0,0 +1,175 @@
+"""
+manage_tracing.py - Leichtgewichtiges Tracing für Fotobox2
+
+Dieses Modul zeichnet die Dauer einzelner Schritte (Spans) eines Ablaufs auf,
+z.B. einer Bildaufnahme vom Auslösen bis zum fertigen Thumbnail. Der aktive
+Trace wird über contextvars weitergereicht, sodass aufgerufene Module
+(manage_camera, manage_files) nur span() verwenden müssen, ohne den Trace
+als Parameter zu erhalten. Außerhalb eines Traces ist span() wirkungslos.
+
+Abgeschlossene Traces landen in einem Ringpuffer fester Größe.
+"""
+
+import os
+import time
+import uuid
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+# Anzahl der vorgehaltenen abgeschlossenen Traces
+TRACE_BUFFER_SIZE = int(os.environ.get('FOTOBOX_TRACE_BUFFER_SIZE', 100))
+
+class Span:
+    """Ein zeitlich gemessener Schritt innerhalb eines Traces"""
+
+    __slots__ = ('name', 'parent', 'start', 'end', 'attributes', 'error')
+
+    def __init__(self, name: str, parent: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.parent = parent
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        end = self.end if self.end is not None else time.perf_counter()
+        return {
+            'name': self.name,
+            'parent': self.parent,
+            'start_ms': round((self.start - origin) * 1000, 3),
+            'duration_ms': round((end - self.start) * 1000, 3),
+            'attributes': self.attributes,
+            'error': self.error
+        }
+
+class Trace:
+    """Ein vollständiger Ablauf aus mehreren Spans"""
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attributes = attributes
+        self.started_at = datetime.now().isoformat()
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.spans: List[Span] = []
+        self.error: Optional[str] = None
+        # Namen der gerade offenen Spans (für die Eltern-Zuordnung)
+        self._stack: List[str] = []
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, duration_ms: float, **attributes: Any) -> None:
+        """Fügt einen extern gemessenen Schritt hinzu (z.B. den Countdown im Frontend)
+
+        Der Schritt wird so eingetragen, dass er unmittelbar vor Beginn des Traces endet.
+        """
+        span = Span(name, None, attributes)
+        span.end = self.start
+        span.start = self.start - duration_ms / 1000
+        with self._lock:
+            self.spans.insert(0, span)
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.end if self.end is not None else time.perf_counter()
+        with self._lock:
+            spans = list(self.spans)
+        origin = min([self.start] + [span.start for span in spans])
+        return {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'started_at': self.started_at,
+            'duration_ms': round((end - origin) * 1000, 3),
+            'attributes': self.attributes,
+            'error': self.error,
+            'spans': [span.to_dict(origin) for span in spans]
+        }
+
+# Aktiver Trace des aktuellen Kontexts (Thread bzw. Request)
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar('fotobox_trace', default=None)
+
+# Ringpuffer der abgeschlossenen Traces
+_traces: deque = deque(maxlen=TRACE_BUFFER_SIZE)
+_traces_lock = threading.Lock()
+
+def current_trace() -> Optional[Trace]:
+    """Gibt den aktiven Trace zurück oder None"""
+    return _current_trace.get()
+
+@contextmanager
+def start_trace(name: str, **attributes: Any) -> Iterator[Trace]:
+    """Startet einen neuen Trace für den Block
+
+    Ist bereits ein Trace aktiv, wird dieser weiterverwendet und der Block
+    als Span darin erfasst.
+
+    Args:
+        name: Name des Ablaufs (z.B. "capture")
+        **attributes: Zusätzliche Angaben (z.B. Kameratyp)
+    """
+    active = _current_trace.get()
+    if active is not None:
+        with span(name, **attributes):
+            yield active
+        return
+
+    trace = Trace(name, attributes)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    except BaseException as e:
+        trace.error = str(e) or type(e).__name__
+        raise
+    finally:
+        trace.end = time.perf_counter()
+        _current_trace.reset(token)
+        with _traces_lock:
+            _traces.append(trace)
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Misst die Dauer des Blocks als Span des aktiven Traces
+
+    Ohne aktiven Trace wird nichts aufgezeichnet.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    with trace._lock:
+        current = Span(name, trace._stack[-1] if trace._stack else None, attributes)
+        trace.spans.append(current)
+        trace._stack.append(name)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = str(e) or type(e).__name__
+        raise
+    finally:
+        current.end = time.perf_counter()
+        with trace._lock:
+            trace._stack.pop()
+
+def get_traces(limit: int = 20, name: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Gibt die zuletzt abgeschlossenen Traces zurück (neueste zuerst)
+
+    Args:
+        limit: Maximale Anzahl der Traces
+        name: Optional nur Traces dieses Namens
+    """
+    with _traces_lock:
+        traces = list(_traces)
+    traces.reverse()
+    if name:
+        traces = [trace for trace in traces if trace.name == name]
+    return [trace.to_dict() for trace in traces[:max(0, limit)]]
+
+def clear_traces() -> None:
+    """Leert den Ringpuffer"""
+    with _traces_lock:
+        _traces.clear()
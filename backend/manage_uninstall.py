@@ -13,14 +13,14 @@ from typing import Dict, Any, Optional, List, Tuple
 from pathlib import Path
 import shutil
 
-from manage_folders import FolderManager
+from manage_folders import get_folder_manager
 import logging
 
 # Logger konfigurieren
 logger = logging.getLogger(__name__)
 
 # FolderManager Instanz
-folder_manager = FolderManager()
+folder_manager = get_folder_manager()
 
 class UninstallError(Exception):
     """Basisklasse für Deinstallationsfehler"""
@@ -27,11 +27,11 @@ logger = logging.getLogger(__name__)
 # Versuche, die manage_folders-Funktionen zu verwenden
 try:
     from manage_folders import (
-        FolderManager, get_backup_dir, get_log_dir, 
+        get_folder_manager, get_backup_dir, get_log_dir, 
         get_data_dir, get_config_dir, get_script_dir
     )
     
-    folder_manager = FolderManager()
+    folder_manager = get_folder_manager()
     BACKUP_DIR = get_backup_dir()
     LOG_DIR = get_log_dir()
     DATA_DIR = get_data_dir()
@@ -1907,6 +1907,69 @@ ensure_folder_structure() {
     return 0
 }
 
+# write_folder_config
+write_folder_config_debug_0001="INFO: Schreibe Ordnerstruktur nach '%s'"
+write_folder_config_debug_0002="ERROR: Verzeichnis für Typ '%s' konnte nicht ermittelt werden"
+write_folder_config_debug_0003="SUCCESS: Ordnerstruktur gespeichert: '%s'"
+write_folder_config_debug_0004="ERROR: Ordnerstruktur konnte nicht nach '%s' geschrieben werden"
+
+# Verzeichnistypen, die in folders.json aufgenommen werden (get_<typ>_dir)
+FOLDER_CONFIG_TYPES="install backend script venv backup data_backup nginx_backup https_backup systemd_backup config camera_conf https_conf nginx_conf template data frontend frontend_css frontend_fonts frontend_js photos photos_originals photos_gallery frontend_picture log tmp"
+FOLDER_CONFIG_VERSION=1
+
+write_folder_config() {
+    # -----------------------------------------------------------------------
+    # write_folder_config
+    # -----------------------------------------------------------------------
+    # Funktion: Ermittelt alle Verzeichnisse einmalig und speichert sie als
+    # .........  JSON (folders.json im Konfigurationsverzeichnis). Das Python-
+    # .........  Backend liest die Pfade aus dieser Datei, statt für jeden
+    # .........  Pfad eine Shell zu starten.
+    # Parameter: $1 - (Optional) Zieldatei, "-" für die Standardausgabe
+    # .........       (Default: $CONF_DIR/folders.json)
+    # Rückgabe.: 0 = Erfolg
+    # .........  1 = Verzeichnis nicht ermittelbar oder Datei nicht schreibbar
+    # -----------------------------------------------------------------------
+    local config_file="${1:-}"
+    local type dir escaped json first=1
+    local nl=$'\n'
+
+    if [ -z "$config_file" ]; then
+        config_file="$(get_config_dir)/folders.json" || return 1
+    fi
+    debug "$(printf "$write_folder_config_debug_0001" "$config_file")"
+
+    json="{${nl}    \"version\": $FOLDER_CONFIG_VERSION,${nl}    \"generated\": \"$(date '+%Y-%m-%dT%H:%M:%S')\",${nl}    \"paths\": {"
+    for type in $FOLDER_CONFIG_TYPES; do
+        dir=$("get_${type}_dir")
+        if [ -z "$dir" ]; then
+            debug "$(printf "$write_folder_config_debug_0002" "$type")"
+            return 1
+        fi
+        # Backslashes und Anführungszeichen für JSON maskieren
+        escaped=$(printf '%s' "$dir" | sed 's/\\/\\\\/g; s/"/\\"/g')
+        [ $first -eq 1 ] || json="$json,"
+        json="$json${nl}        \"$type\": \"$escaped\""
+        first=0
+    done
+    json="$json${nl}    }${nl}}"
+
+    if [ "$config_file" = "-" ]; then
+        printf '%s\n' "$json"
+        return 0
+    fi
+
+    # Atomar ersetzen, damit das Backend nie eine halbe Datei liest
+    if printf '%s\n' "$json" > "$config_file.tmp" && mv -f "$config_file.tmp" "$config_file"; then
+        chmod 644 "$config_file" 2>/dev/null || true
+        debug "$(printf "$write_folder_config_debug_0003" "$config_file")"
+        return 0
+    fi
+    rm -f "$config_file.tmp" 2>/dev/null
+    debug "$(printf "$write_folder_config_debug_0004" "$config_file")"
+    return 1
+}
+
 # ===========================================================================
 # Get- und Set-Funktionen für Systempfade
 # ===========================================================================
@@ -412,6 +412,10 @@ set_structure() {
         return 1
     fi
     debug "Ordnerstruktur erfolgreich geprüft"
+    # Pfade für das Python-Backend zwischenspeichern (conf/folders.json)
+    if ! write_folder_config; then
+        print_warning "Ordnerstruktur konnte nicht in folders.json gespeichert werden, das Backend ermittelt sie beim Start."
+    fi
     return 0
 }
 